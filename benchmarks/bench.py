@@ -0,0 +1,240 @@
+"""
+Pipeline benchmarks with baseline regression checks.
+
+Every step (each method) and a few ``run-all`` configurations are timed
+and memory-profiled through ``my_pipeline.profiler`` on synthetic data
+(see ``generate.py``) at each ``--rows`` size. The best of ``--repeat``
+runs is kept.
+
+    python benchmarks/bench.py --rows 1e4 --rows 1e5 --save-baseline
+    python benchmarks/bench.py --rows 1e4 --rows 1e5            # compare
+
+Results are compared with the baseline JSON; the script exits with status
+1 when a case got slower (or allocated more) than the baseline by more
+than the threshold. Baselines are machine-specific: record them on the
+machine that runs the comparison.
+
+Sizes above ``--max-memory-rows`` are written to a CSV in chunks and only
+run through the streaming (``--chunksize``) configuration.
+"""
+
+import contextlib
+import io
+import json
+import logging
+import platform
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+import click
+
+from generate import DEFAULTS, make_frame, write_csv
+
+from my_pipeline.cli import RUN_ALL_STEPS, execute_steps, merge_params
+from my_pipeline.fit import apply_step
+from my_pipeline.profiler import profile_session, profile_step
+from my_pipeline.stream import stream_pipeline
+
+DEFAULT_BASELINE = Path(__file__).with_name("baselines.json")
+
+# (step, params) of every step benchmark, named "<step>/<method>"
+STEP_CASES = {
+    "transform/mean": ("transform", {"missing_method": "mean"}),
+    "transform/median": ("transform", {"missing_method": "median"}),
+    "transform/mode": ("transform", {"missing_method": "mode"}),
+    "transform/drop": ("transform", {"missing_method": "drop"}),
+    "outliers/iqr": ("outliers", {"outlier_method": "iqr"}),
+    "outliers/zscore": ("outliers", {"outlier_method": "zscore", "threshold": 3.0}),
+    "normalize/minmax": ("normalize", {"normalize_method": "minmax"}),
+    "normalize/zscore": ("normalize", {"normalize_method": "zscore"}),
+    "normalize/robust": ("normalize", {"normalize_method": "robust"}),
+    "encode/label": ("encode", {"encode_method": "label"}),
+    "encode/onehot": ("encode", {"encode_method": "onehot"}),
+    "encode/target": ("encode", {"encode_method": "target", "target_column": "price"}),
+    "encode/hashing": ("encode", {"encode_method": "hashing"}),
+}
+
+# CLI overrides of every run-all benchmark
+RUN_ALL_CASES = {
+    "run-all/default": {"missing_method": "mean", "outlier_method": "iqr",
+                        "normalize_method": "minmax", "encode_method": "label"},
+    "run-all/robust-target": {"missing_method": "median", "outlier_method": "zscore",
+                              "threshold": 3.0, "normalize_method": "robust",
+                              "encode_method": "target", "target_column": "price"},
+    "run-all/streaming": {"missing_method": "mean", "outlier_method": "iqr",
+                          "normalize_method": "minmax", "encode_method": "label",
+                          "chunksize": "auto"},
+    "run-all/arrow-csv": {"missing_method": "mean", "outlier_method": "iqr",
+                          "normalize_method": "minmax", "encode_method": "label",
+                          "extract": {"engine": "pyarrow", "memory_map": True}},
+}
+
+
+def _pipeline_params(overrides, input_path, output_path, rows):
+    # an "extract" entry is a config section (the reader options have no CLI flags)
+    config = {"extract": overrides["extract"]} if "extract" in overrides else {}
+    cli_params = {"input_path": str(input_path), "output_path": str(output_path),
+                  "no_cache": True, **{k: v for k, v in overrides.items() if k != "extract"}}
+    if cli_params.get("chunksize") == "auto":
+        cli_params["chunksize"] = max(int(rows) // 10, 1000)
+    return merge_params(cli_params, config)
+
+
+def _measure(name, func, make_args, repeat=3, **kwargs):
+    """
+    Best-of-``repeat`` timings of ``func(*make_args())``, plus the
+    allocations of one extra run with ``tracemalloc`` on (tracing slows
+    Python allocations down, so it is kept out of the timed runs).
+    """
+    runs = []
+    for trace_memory in [False] * repeat + [True]:
+        args = make_args()
+        with profile_session(collect=True, trace_memory=trace_memory) as session, _quiet():
+            profile_step(name, func, *args, **kwargs)
+        runs.append(session.records[-1])
+    timed, traced = runs[:-1], runs[-1]
+    return {
+        "wall_s": min(r["wall_s"] for r in timed),
+        "cpu_s": min(r["cpu_s"] for r in timed),
+        "rows_per_s": max(r["rows_per_s"] or 0.0 for r in timed),
+        "alloc_peak_mb": traced["alloc_peak_mb"],
+        "peak_rss_mb": traced["peak_rss_mb"],
+    }
+
+
+@contextlib.contextmanager
+def _quiet():
+    """Progress bars and summaries go to stdout; keep them out of the benchmark output."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def run_suite(rows_list, knobs, repeat=3, max_memory_rows=1e7, only=None, seed=0):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for rows in rows_list:
+            rows = int(rows)
+            in_memory = rows <= max_memory_rows
+            input_path = tmp / f"bench_{rows}.csv"
+            output_path = tmp / f"out_{rows}.csv"
+            click.echo(f"Generating {rows:,} rows ...")
+            if in_memory:
+                df = make_frame(rows, seed=seed, **knobs)
+                df.to_csv(input_path, index=False)
+            else:
+                write_csv(input_path, rows, seed=seed, **knobs)
+
+            if in_memory and only in (None, "steps"):
+                for name, (step, overrides) in STEP_CASES.items():
+                    params = _pipeline_params(overrides, input_path, output_path, rows)
+                    results[f"{rows}/{name}"] = _measure(
+                        name, apply_step, lambda: (step, df.copy(), params),
+                        repeat=repeat, inplace=True)
+                    _report(rows, name, results[f"{rows}/{name}"])
+
+            if only in (None, "run-all"):
+                for name, overrides in RUN_ALL_CASES.items():
+                    params = _pipeline_params(overrides, input_path, output_path, rows)
+                    if params["chunksize"]:
+                        func, args = stream_pipeline, (params, RUN_ALL_STEPS, params["chunksize"])
+                    elif in_memory:
+                        func, args = execute_steps, (params, RUN_ALL_STEPS)
+                    else:
+                        continue
+                    results[f"{rows}/{name}"] = _measure(name, func, lambda: args,
+                                                         repeat=repeat)
+                    _report(rows, name, results[f"{rows}/{name}"])
+    return results
+
+
+def _report(rows, name, metrics):
+    click.echo(f"  {rows:>11,} {name:<24} {metrics['wall_s'] * 1e3:10.1f} ms"
+               f" {metrics['rows_per_s']:14,.0f} rows/s {metrics['alloc_peak_mb']:9.1f} MB alloc")
+
+
+def compare(results, baseline, threshold, memory_threshold, min_seconds=0.005):
+    """Regressions as ``(case, metric, baseline, current)`` tuples."""
+    regressions = []
+    for case, current in results.items():
+        base = baseline.get(case)
+        if base is None:
+            continue
+        if (current["wall_s"] > base["wall_s"] * (1 + threshold)
+                and current["wall_s"] - base["wall_s"] > min_seconds):
+            regressions.append((case, "wall_s", base["wall_s"], current["wall_s"]))
+        if (base.get("alloc_peak_mb") and
+                current["alloc_peak_mb"] > base["alloc_peak_mb"] * (1 + memory_threshold)
+                and current["alloc_peak_mb"] - base["alloc_peak_mb"] > 1.0):
+            regressions.append((case, "alloc_peak_mb", base["alloc_peak_mb"],
+                                current["alloc_peak_mb"]))
+    return regressions
+
+
+@click.command()
+@click.option("--rows", "rows_list", type=float, multiple=True, default=[1e4, 1e5], show_default=True,
+              help="Row counts to benchmark (repeatable, e.g. --rows 1e4 --rows 1e6)")
+@click.option("--numeric", "n_numeric", type=int, default=DEFAULTS["n_numeric"], show_default=True)
+@click.option("--categorical", "n_categorical", type=int, default=DEFAULTS["n_categorical"], show_default=True)
+@click.option("--nulls", "null_ratio", type=float, default=DEFAULTS["null_ratio"], show_default=True)
+@click.option("--cardinality", type=int, default=DEFAULTS["cardinality"], show_default=True)
+@click.option("--outliers", "outlier_rate", type=float, default=DEFAULTS["outlier_rate"], show_default=True)
+@click.option("--repeat", type=int, default=3, show_default=True, help="Runs per case (best is kept)")
+@click.option("--only", type=click.Choice(["steps", "run-all"]), help="Run only one group of cases")
+@click.option("--max-memory-rows", type=float, default=1e7, show_default=True,
+              help="Above this size only the streaming configuration runs")
+@click.option("--baseline", "baseline_path", default=str(DEFAULT_BASELINE), show_default=True)
+@click.option("--save-baseline", is_flag=True, help="Store these results as the new baseline")
+@click.option("--threshold", type=float, default=0.25, show_default=True,
+              help="Allowed slowdown vs. the baseline (0.25 = 25%)")
+@click.option("--memory-threshold", type=float, default=0.25, show_default=True,
+              help="Allowed growth of peak allocations vs. the baseline")
+@click.option("--output", "output_path", help="Also write these results to a JSON file")
+def main(rows_list, repeat, only, max_memory_rows, baseline_path, save_baseline,
+         threshold, memory_threshold, output_path, **knobs):
+    """Benchmark every step and run-all configuration against a baseline."""
+    for name in ("Profiler", "Steps"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    results = run_suite(rows_list, knobs, repeat=repeat, max_memory_rows=max_memory_rows,
+                        only=only)
+    document = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "processor": platform.processor()},
+        "knobs": knobs,
+        "results": results,
+    }
+    if output_path:
+        Path(output_path).write_text(json.dumps(document, indent=1))
+
+    baseline_file = Path(baseline_path)
+    if save_baseline:
+        if baseline_file.exists():
+            # keep the cases of sizes not run this time
+            previous = json.loads(baseline_file.read_text())
+            document["results"] = {**previous.get("results", {}), **results}
+        baseline_file.write_text(json.dumps(document, indent=1))
+        click.echo(f"Saved baseline of {len(results)} cases to {baseline_file}")
+        return
+
+    if not baseline_file.exists():
+        click.echo(f"No baseline at {baseline_file}; run with --save-baseline first")
+        return
+
+    baseline = json.loads(baseline_file.read_text())
+    if baseline.get("knobs") != knobs:
+        click.echo("Warning: baseline was recorded with different generator knobs")
+    regressions = compare(results, baseline["results"], threshold, memory_threshold)
+    for case, metric, base, current in regressions:
+        click.echo(f"REGRESSION {case} {metric}: {base:.4f} -> {current:.4f} "
+                   f"({current / base - 1:+.0%})")
+    if regressions:
+        sys.exit(1)
+    click.echo(f"No regressions beyond {threshold:.0%} against {baseline_file}")
+
+
+if __name__ == "__main__":
+    main()
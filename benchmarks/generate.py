@@ -0,0 +1,119 @@
+"""
+Synthetic benchmark data modeled on ``data/raw/input.csv`` (housing prices).
+
+The first columns follow the real schema: ``price`` (the target, never
+missing), ``area``, ``bedrooms``, ``bathrooms``, ``stories``, ``parking``
+and the yes / no and furnishing-status categoricals. Extra numeric columns
+are ``num_<i>``; extra categorical columns are ``cat_<i>`` with
+``cardinality`` Zipf-distributed levels (the first one is always added,
+so the cardinality knob is exercised with the default column counts).
+
+    python benchmarks/generate.py 1e6 data/raw/bench_1e6.csv --nulls 0.05
+"""
+
+import click
+import numpy as np
+import pandas as pd
+
+BASE_NUMERIC = ["price", "area", "bedrooms", "bathrooms", "stories", "parking"]
+BASE_CATEGORICAL = ["mainroad", "guestroom", "basement", "hotwaterheating",
+                    "airconditioning", "prefarea", "furnishingstatus"]
+DEFAULTS = {
+    "n_numeric": len(BASE_NUMERIC),
+    "n_categorical": len(BASE_CATEGORICAL) + 1,
+    "null_ratio": 0.02,
+    "cardinality": 50,
+    "outlier_rate": 0.01,
+}
+
+
+def _numeric(name, rows, rng):
+    if name == "price":
+        return np.clip(rng.lognormal(15.3, 0.35, rows), 1.75e6, 1.33e7).round(-3).astype("int64")
+    if name == "area":
+        return np.clip(rng.lognormal(8.5, 0.35, rows), 1650, 16200).round()
+    if name == "bedrooms":
+        return rng.choice([1, 2, 3, 4, 5, 6], rows, p=[.01, .25, .55, .17, .015, .005]).astype("float64")
+    if name == "bathrooms":
+        return rng.choice([1, 2, 3, 4], rows, p=[.74, .24, .018, .002]).astype("float64")
+    if name == "stories":
+        return rng.choice([1, 2, 3, 4], rows, p=[.42, .44, .07, .07]).astype("int64")
+    if name == "parking":
+        return rng.choice([0, 1, 2, 3], rows, p=[.55, .23, .2, .02]).astype("int64")
+    return rng.normal(100.0, 15.0, rows)
+
+
+def _categorical(name, rows, rng, cardinality):
+    if name == "furnishingstatus":
+        levels, p = ["furnished", "semi-furnished", "unfurnished"], [.26, .42, .32]
+    elif name in BASE_CATEGORICAL:
+        levels, p = ["yes", "no"], [.5, .5]
+    else:
+        levels = [f"{name}_{i}" for i in range(cardinality)]
+        weights = 1.0 / np.arange(1, cardinality + 1)
+        p = weights / weights.sum()
+    return np.asarray(levels, dtype=object)[rng.choice(len(levels), rows, p=p)]
+
+
+def make_frame(rows, n_numeric=DEFAULTS["n_numeric"], n_categorical=DEFAULTS["n_categorical"],
+               null_ratio=DEFAULTS["null_ratio"], cardinality=DEFAULTS["cardinality"],
+               outlier_rate=DEFAULTS["outlier_rate"], seed=0) -> pd.DataFrame:
+    """
+    Synthetic frame of ``rows`` rows.
+
+    ``null_ratio`` of every column but ``price`` is missing and
+    ``outlier_rate`` of every numeric value but ``price`` is scaled by 10-50x.
+    """
+    rows = int(rows)
+    rng = np.random.default_rng(seed)
+    numeric = BASE_NUMERIC[:n_numeric] + [f"num_{i}" for i in range(n_numeric - len(BASE_NUMERIC))]
+    categorical = BASE_CATEGORICAL[:max(n_categorical - 1, 0)]
+    categorical = categorical + [f"cat_{i}" for i in range(n_categorical - len(categorical))]
+
+    data = {}
+    for name in numeric:
+        values = _numeric(name, rows, rng)
+        if name != "price":
+            values = values.astype("float64")
+            outliers = rng.random(rows) < outlier_rate
+            values[outliers] *= rng.uniform(10, 50, outliers.sum())
+            values[rng.random(rows) < null_ratio] = np.nan
+        data[name] = values
+    for name in categorical:
+        values = _categorical(name, rows, rng, cardinality)
+        values[rng.random(rows) < null_ratio] = None
+        data[name] = values
+    return pd.DataFrame(data)
+
+
+def write_csv(path, rows, chunk_rows=1_000_000, seed=0, **knobs) -> int:
+    """Write ``make_frame`` output to CSV ``chunk_rows`` at a time (for 1e8 rows)."""
+    rows = int(rows)
+    written = 0
+    part = 0
+    while written < rows:
+        n = min(chunk_rows, rows - written)
+        make_frame(n, seed=seed + part, **knobs).to_csv(
+            path, mode="w" if part == 0 else "a", header=part == 0, index=False)
+        written += n
+        part += 1
+    return written
+
+
+@click.command()
+@click.argument("rows", type=float)
+@click.argument("output_path")
+@click.option("--numeric", "n_numeric", type=int, default=DEFAULTS["n_numeric"], show_default=True)
+@click.option("--categorical", "n_categorical", type=int, default=DEFAULTS["n_categorical"], show_default=True)
+@click.option("--nulls", "null_ratio", type=float, default=DEFAULTS["null_ratio"], show_default=True)
+@click.option("--cardinality", type=int, default=DEFAULTS["cardinality"], show_default=True)
+@click.option("--outliers", "outlier_rate", type=float, default=DEFAULTS["outlier_rate"], show_default=True)
+@click.option("--seed", type=int, default=0, show_default=True)
+def main(rows, output_path, **knobs):
+    """Write ROWS synthetic rows (e.g. 1e6) to OUTPUT_PATH as CSV."""
+    n = write_csv(output_path, rows, **knobs)
+    click.echo(f"Wrote {n} rows to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+CLI startup benchmarks.
+
+Every case starts a fresh interpreter, as a cron job calling
+``datapipeline`` does, and is timed ``--repeat`` times (the best run is
+kept, the median is shown for reference):
+
+    python benchmarks/startup.py --save-baseline
+    python benchmarks/startup.py                    # compare
+
+The script also checks that importing the CLI loads none of
+``HEAVY_MODULES`` and creates no ``logs/`` directory, and exits with
+status 1 when it does or when a case got slower than the baseline by more
+than the threshold. ``import-steps`` (the package with pandas and every
+step module) is the reference for what a lazy import saves.
+"""
+
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import click
+
+from bench import compare
+
+DEFAULT_BASELINE = Path(__file__).with_name("startup_baseline.json")
+
+# modules a bare ``datapipeline`` invocation must not import
+HEAVY_MODULES = ("pandas", "numpy", "sklearn", "pyarrow")
+
+# interpreter arguments of every case
+CASES = {
+    "startup/import": ["-c", "import my_pipeline"],
+    "startup/help": ["-m", "my_pipeline.cli", "--help"],
+    "startup/run-help": ["-m", "my_pipeline.cli", "run", "--help"],
+    "startup/import-steps": ["-c", "import my_pipeline.cli, my_pipeline.fit, my_pipeline.plan"],
+}
+
+
+def time_case(args, repeat, cwd):
+    """Wall times of ``repeat`` fresh interpreters running ``args``."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=cwd, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def import_footprint(cwd):
+    """Heavy modules loaded by ``import my_pipeline.cli`` and whether it made ``logs/``."""
+    code = ("import sys, my_pipeline.cli; "
+            f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=cwd, check=True,
+                         capture_output=True, text=True).stdout
+    return out.split(), (Path(cwd) / "logs").exists()
+
+
+@click.command()
+@click.option("--repeat", type=int, default=10, show_default=True, help="Runs per case (best is kept)")
+@click.option("--baseline", "baseline_path", default=str(DEFAULT_BASELINE), show_default=True)
+@click.option("--save-baseline", is_flag=True, help="Store these results as the new baseline")
+@click.option("--threshold", type=float, default=0.25, show_default=True,
+              help="Allowed slowdown vs. the baseline (0.25 = 25%)")
+def main(repeat, baseline_path, save_baseline, threshold):
+    """Time fresh-process CLI startup and check the lazy import path."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        heavy, made_logs = import_footprint(tmp)
+        for name, args in CASES.items():
+            times = time_case(args, repeat, tmp)
+            results[name] = {"wall_s": min(times), "median_s": statistics.median(times)}
+            click.echo(f"  {name:<24} {min(times) * 1e3:8.1f} ms best"
+                       f" {statistics.median(times) * 1e3:8.1f} ms median")
+
+    failed = False
+    if heavy:
+        click.echo(f"FAIL importing the CLI loads {', '.join(heavy)}")
+        failed = True
+    if made_logs:
+        click.echo("FAIL importing the CLI creates a logs/ directory")
+        failed = True
+
+    baseline_file = Path(baseline_path)
+    if save_baseline:
+        document = {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                        "processor": platform.processor()},
+            "results": results,
+        }
+        baseline_file.write_text(json.dumps(document, indent=1))
+        click.echo(f"Saved baseline of {len(results)} cases to {baseline_file}")
+    elif not baseline_file.exists():
+        click.echo(f"No baseline at {baseline_file}; run with --save-baseline first")
+    else:
+        baseline = json.loads(baseline_file.read_text())
+        regressions = compare(results, baseline["results"], threshold, memory_threshold=0.0)
+        for case, metric, base, current in regressions:
+            click.echo(f"REGRESSION {case} {metric}: {base:.4f} -> {current:.4f} "
+                       f"({current / base - 1:+.0%})")
+        failed = failed or bool(regressions)
+        if not regressions:
+            click.echo(f"No regressions beyond {threshold:.0%} against {baseline_file}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,25 @@
 """
 my_pipeline package initializer.
+
+The public functions are imported on first use (PEP 562), so importing the
+package, or running ``datapipeline --help``, does not load pandas and the
+step modules.
 """
 
-from .extract import extract_data
-from .transform import transform_data
-from .load import save_data
-from .normalize import normalize_data
-from .outliers import remove_outliers
-from .encode import encode_categorical
-from .profiler import profile_step
-from .cli import cli
-from .load import save_data
-from .logger import get_logger
+import importlib
+
+# public name -> module that defines it (the click group is ``my_pipeline.cli.cli``;
+# ``my_pipeline.cli`` itself is the submodule)
+_EXPORTS = {
+    "extract_data": "extract",
+    "transform_data": "transform",
+    "save_data": "load",
+    "normalize_data": "normalize",
+    "remove_outliers": "outliers",
+    "encode_categorical": "encode",
+    "profile_step": "profiler",
+    "get_logger": "logger",
+}
 
 __all__ = [
     "extract_data",
@@ -22,3 +30,15 @@ __all__ = [
     "encode_categorical",
     "profile_step",
 ]
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
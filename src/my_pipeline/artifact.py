@@ -0,0 +1,75 @@
+"""
+Persist fitted pipeline state ("fit once, transform many").
+
+An artifact is a small JSON document holding the step order, the step
+methods they were fitted with and the frozen per-step parameters produced
+by ``fit.fit_pipeline`` / ``fit.fit_frame``. Loading it and handing the
+state to ``fit.apply_step`` reproduces the training-time transformation
+on new data without recomputing any statistic.
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+from .fit import STEP_PARAM_KEYS
+
+ARTIFACT_VERSION = 1
+
+# merged params that define *how* the steps behave (input / output are per run)
+STEP_PARAMS = [key for step, keys in STEP_PARAM_KEYS.items() if step != "extract" for key in keys]
+
+
+# state only valid for the rows it was fitted on (out-of-fold target statistics)
+RUN_ONLY_STATE = ("fold_stats",)
+
+
+def _portable(state: dict) -> dict:
+    return {step: {key: value for key, value in fitted.items() if key not in RUN_ONLY_STATE}
+            for step, fitted in state.items()}
+
+
+def _to_json(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot serialize {type(value).__name__} in pipeline artifact")
+
+
+def save_artifact(state: dict, steps, params: dict, artifact_path: str, extra: dict = None) -> None:
+    """
+    Write fitted ``state`` plus the steps/params it belongs to as JSON.
+
+    ``extra`` adds top-level keys (e.g. the watermark of incremental runs).
+    Entries of ``RUN_ONLY_STATE`` are left out: applied to new data, target
+    encoding uses the means of all folds.
+    """
+    artifact_path = Path(artifact_path)
+    artifact_path.parent.mkdir(parents=True, exist_ok=True)
+
+    artifact = {
+        "version": ARTIFACT_VERSION,
+        "steps": list(steps),
+        "params": {key: params.get(key) for key in STEP_PARAMS},
+        "state": _portable(state),
+        **(extra or {}),
+    }
+    with open(artifact_path, "w") as f:
+        json.dump(artifact, f, default=_to_json, separators=(",", ":"))
+
+
+def load_artifact(artifact_path: str) -> dict:
+    """Read an artifact written by ``save_artifact``."""
+    artifact_path = Path(artifact_path)
+    if not artifact_path.exists():
+        raise FileNotFoundError(f"Pipeline artifact not found: {artifact_path}")
+
+    with open(artifact_path) as f:
+        artifact = json.load(f)
+
+    if artifact.get("version") != ARTIFACT_VERSION:
+        raise ValueError(
+            f"Unsupported artifact version {artifact.get('version')!r} "
+            f"(expected {ARTIFACT_VERSION})"
+        )
+    return artifact
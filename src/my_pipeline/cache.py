@@ -0,0 +1,152 @@
+"""
+Content-addressed cache of intermediate step results.
+
+Every step output is stored under a key that hashes the input file
+(its content or its size + mtime), the step name, the params the step
+reads and the key of the step before it. Changing a setting therefore
+only invalidates that step and the ones after it, and a re-run resumes
+from the longest prefix of the pipeline that is still cached.
+
+Entries are written as Parquet when pyarrow is available (pickle
+otherwise) and evicted least-recently-used once the cache directory grows
+beyond ``max_bytes``.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+import pandas as pd
+
+from .fit import STEP_PARAM_KEYS
+from .extract import expand_input
+
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = ".pipeline_cache"
+DEFAULT_MAX_MB = 2048
+
+
+def _digest(*parts) -> str:
+    payload = json.dumps(parts, sort_keys=True, default=str).encode()
+    return hashlib.sha256(payload).hexdigest()
+
+
+def input_key(input_path: str, mode: str = "mtime") -> str:
+    """
+    Key for the raw input file (or the set of files of a directory / glob).
+
+    ``mode="mtime"`` hashes path, size and modification time (cheap);
+    ``mode="content"`` hashes the file bytes (survives ``touch`` / copies).
+    """
+    paths = expand_input(input_path)
+    if len(paths) > 1:
+        return _digest(CACHE_VERSION, [input_key(path, mode) for path in paths])
+
+    file_path = paths[0].resolve()
+    stat = file_path.stat()
+
+    if mode == "mtime":
+        return _digest(CACHE_VERSION, str(file_path), stat.st_size, stat.st_mtime_ns)
+    elif mode == "content":
+        sha = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+        return _digest(CACHE_VERSION, sha.hexdigest())
+    else:
+        raise ValueError("Invalid cache key mode. Choose 'mtime' or 'content'.")
+
+
+def step_key(upstream_key: str, step: str, params: dict) -> str:
+    """Key of ``step``'s output given the key of its input."""
+    step_params = {key: params.get(key) for key in STEP_PARAM_KEYS.get(step, [])}
+    return _digest(upstream_key, step, step_params)
+
+
+class StepCache:
+    """Directory of cached DataFrames with size-bounded LRU eviction."""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_MB * 2**20):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+
+    def _entry(self, key: str):
+        for suffix in (".parquet", ".pkl"):
+            path = self.cache_dir / f"{key}{suffix}"
+            if path.exists():
+                return path
+        return None
+
+    def __contains__(self, key: str) -> bool:
+        return self._entry(key) is not None
+
+    def get(self, key: str):
+        """Cached DataFrame for ``key`` or ``None``; a hit refreshes its LRU age."""
+        path = self._entry(key)
+        if path is None:
+            return None
+
+        try:
+            os.utime(path)
+            if path.suffix == ".parquet":
+                return pd.read_parquet(path)
+            return pd.read_pickle(path)
+        except FileNotFoundError:
+            # evicted by another run in the meantime
+            return None
+
+    def put(self, key: str, df: pd.DataFrame) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        # write under a temporary name of this writer only, so readers never
+        # see partial files and concurrent writers of a key do not collide
+        tmp = self.cache_dir / f".{key}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            try:
+                path = self.cache_dir / f"{key}.parquet"
+                df.to_parquet(tmp)
+            except Exception:
+                # no pyarrow, or dtypes Parquet can't hold (mixed objects, sparse)
+                path = self.cache_dir / f"{key}.pkl"
+                df.to_pickle(tmp)
+            os.replace(tmp, path)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+        self.evict()
+
+    def evict(self) -> None:
+        """Drop least-recently-used entries until the cache fits ``max_bytes``."""
+        entries = []
+        for path in self.cache_dir.glob("*"):
+            if path.suffix not in (".parquet", ".pkl"):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                # removed by another run since the listing
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort(key=lambda entry: entry[0])
+        total = sum(size for _, size, _ in entries)
+
+        while entries and total > self.max_bytes:
+            _, size, oldest = entries.pop(0)
+            total -= size
+            oldest.unlink(missing_ok=True)
+
+    def clear(self) -> int:
+        """Remove every entry; returns the number of bytes freed."""
+        if not self.cache_dir.exists():
+            return 0
+        freed = 0
+        for path in self.cache_dir.glob("*"):
+            try:
+                freed += path.stat().st_size if path.is_file() else 0
+            except FileNotFoundError:
+                pass
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        return freed
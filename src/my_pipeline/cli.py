@@ -1,29 +1,35 @@
+"""
+``datapipeline`` command line.
+
+Only click and the logging / profiling / progress helpers are imported
+here; the step modules (and pandas with them) are imported inside the
+commands that run them, so ``datapipeline --help`` and argument errors
+return without loading them.
+"""
+
 import click
+import json
 import tomllib
 from pathlib import Path
 import os
-import toml
-
-from .extract import extract_data
-from .transform import transform_data
-from .outliers import remove_outliers
-from .normalize import normalize_data
-from .encode import encode_categorical
-from .load import save_data
-from .logger import get_logger
-from .profiler import profile_step
-from tqdm import tqdm
-import time
+import signal
+
+from .logger import configure_logging, get_logger
+from .profiler import profile_step, profile_session
+from .progress import StepProgress
 
 logger = get_logger("PipelineCLI")
 
-# -------------------------------------------------------------
-# Helper: Simulate progress bar for long steps
-# -------------------------------------------------------------
-def slow_loop_sim(label: str, seconds: float = 2.0):
-    with click.progressbar(range(100), label=label) as bar:
-        for _ in bar:
-            time.sleep(seconds / 100)
+RUN_ALL_STEPS = ["extract", "transform", "outliers", "normalize", "encode", "load"]
+
+STEP_LABELS = {
+    "extract": "Extract data",
+    "transform": "Transform data",
+    "outliers": "Remove Outliers",
+    "normalize": "Normalize data",
+    "encode": "Categorical Encoding",
+    "load": "Load data",
+}
 
 # -------------------------------------------------------------
 # Helper: Load TOML config
@@ -37,44 +43,382 @@ def load_config(config_path):
         return tomllib.load(f)
 
 
+# -------------------------------------------------------------
+# Helper: Apply the [logging] section (level, console format)
+# -------------------------------------------------------------
+def setup_logging(config):
+    l_cfg = config.get("logging", {})
+    configure_logging(l_cfg.get("level"), l_cfg.get("format"))
+
+
 # -------------------------------------------------------------
 # Helper: Merge CLI params with config values
 # CLI > Config > Default
 # -------------------------------------------------------------
 def merge_params(cli_params, config):
+    from .cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_MB
+    from .incremental import DEFAULT_MEAN_SHIFT, DEFAULT_UNSEEN_SHARE
+
     merged = {}
 
     # STEP ORDER
     merged["steps"] = cli_params.get("steps") or config.get("steps", [])
 
     # EXTRACT
-    merged["input_path"] = cli_params.get("input_path") or config["extract"].get("input_path")
+    ex_cfg = config.get("extract", {})
+    merged["input_path"] = cli_params.get("input_path") or ex_cfg.get("input_path")
+    merged["chunksize"] = cli_params.get("chunksize") or ex_cfg.get("chunksize")
+    merged["file_type"] = ex_cfg.get("file_type", "auto")
+    merged["columns"] = ex_cfg.get("columns")
+    merged["filters"] = ex_cfg.get("filters")
+    merged["optimize_dtypes"] = ex_cfg.get("optimize_dtypes", False)
+    merged["csv_engine"] = ex_cfg.get("engine", "c")
+    merged["dtype_backend"] = ex_cfg.get("dtype_backend", "numpy")
+    merged["memory_map"] = ex_cfg.get("memory_map", False)
+    merged["nrows"] = ex_cfg.get("nrows")
+    merged["skipfooter"] = ex_cfg.get("skipfooter", 0)
 
     # LOAD
-    merged["output_path"] = cli_params.get("output_path") or config["load"].get("output_path")
+    ld_cfg = config.get("load", {})
+    merged["output_path"] = cli_params.get("output_path") or ld_cfg.get("output_path")
+    merged["save_format"] = ld_cfg.get("save_format", "auto")
+    merged["compression"] = ld_cfg.get("compression")
+    merged["float_precision"] = ld_cfg.get("float_precision")
+    merged["write_engine"] = ld_cfg.get("engine", "pandas")
 
     # TRANSFORM
     tr_cfg = config.get("transform", {})
     merged["missing_method"] = cli_params.get("missing_method") or tr_cfg.get("method")
     merged["fill_value"] = cli_params.get("fill_value") or tr_cfg.get("fill_value")
+    merged["missing_column_methods"] = tr_cfg.get("columns") or None
 
     # OUTLIERS
     o_cfg = config.get("outliers", {})
     merged["outlier_method"] = cli_params.get("outlier_method") or o_cfg.get("method")
-    merged["threshold"] = o_cfg.get("threshold", 1.5)
+    merged["threshold"] = cli_params.get("threshold")
+    if merged["threshold"] is None:
+        merged["threshold"] = o_cfg.get("threshold", 1.5)
+    merged["outlier_sequential"] = o_cfg.get("sequential", False)
+
+    # QUANTILES (median / IQR / robust scaling): exact unless an error bound is set
+    merged["quantile_error"] = cli_params.get("quantile_error") or config.get("quantiles", {}).get("error")
 
     # NORMALIZATION
     n_cfg = config.get("normalize", {})
     merged["normalize_method"] = cli_params.get("normalize_method") or n_cfg.get("method")
+    merged["normalize_dtype"] = n_cfg.get("dtype", "float64")
 
     # ENCODING
     e_cfg = config.get("encode", {})
     merged["encode_method"] = cli_params.get("encode_method") or e_cfg.get("method")
     merged["target_column"] = cli_params.get("target_column") or e_cfg.get("target_column")
+    merged["encode_sparse"] = e_cfg.get("sparse", False)
+    merged["encode_max_categories"] = e_cfg.get("max_categories") or None
+    merged["encode_n_features"] = e_cfg.get("n_features", 32)
+    merged["encode_smoothing"] = float(e_cfg.get("smoothing", 0.0))
+    merged["encode_folds"] = int(e_cfg.get("folds", 0))
+    if merged["encode_smoothing"] < 0:
+        raise click.UsageError("[encode] smoothing must be >= 0")
+
+    # CACHE
+    c_cfg = config.get("cache", {})
+    merged["cache"] = not cli_params.get("no_cache") and c_cfg.get("enabled", True)
+    merged["cache_dir"] = c_cfg.get("dir", DEFAULT_CACHE_DIR)
+    merged["cache_max_mb"] = c_cfg.get("max_size_mb", DEFAULT_MAX_MB)
+    merged["cache_key"] = c_cfg.get("key", "mtime")
+
+    # PROFILING
+    p_cfg = config.get("profiling", {})
+    merged["profile_out"] = cli_params.get("profile_out") or p_cfg.get("out")
+    merged["profile_cprofile"] = cli_params.get("profile_cprofile") or p_cfg.get("cprofile_dir")
+
+    # PARALLELISM
+    merged["workers"] = cli_params.get("workers")
+    if merged["workers"] is None:
+        merged["workers"] = config.get("parallel", {}).get("workers")
+
+    # INCREMENTAL (append-only input)
+    i_cfg = config.get("incremental", {})
+    merged["incremental"] = bool(cli_params.get("incremental") or i_cfg.get("enabled", False))
+    merged["refit"] = bool(cli_params.get("refit"))
+    merged["incremental_state"] = i_cfg.get("state_path")
+    merged["drift_mean_shift"] = i_cfg.get("drift_mean_shift", DEFAULT_MEAN_SHIFT)
+    merged["drift_unseen_share"] = i_cfg.get("drift_unseen_share", DEFAULT_UNSEEN_SHARE)
+
+    # SAMPLED PREVIEW (run --sample)
+    merged["sample"] = cli_params.get("sample")
+    merged["sample_seed"] = cli_params.get("sample_seed") or 0
+
+    # ARTIFACT (fit / transform)
+    merged["artifact_path"] = cli_params.get("artifact_path") or config.get("artifact", {}).get("path")
 
     return merged
 
 
+# -------------------------------------------------------------
+# Helper: Streaming execution (--chunksize)
+# -------------------------------------------------------------
+def run_streaming(params, steps):
+    from .fit import sketch_size
+    from .stream import can_chunk, stream_pipeline
+
+    if not can_chunk(params, steps):
+        raise click.UsageError("ffill / bfill fill across chunk boundaries: run without --chunksize")
+    click.echo(f"Streaming input in chunks of {params['chunksize']} rows")
+    progress = StepProgress(total=0, unit="bytes")
+    stats = profile_step("Streaming pipeline", stream_pipeline,
+                         params, steps, params["chunksize"], progress=progress,
+                         workers=params["workers"], sketch_k=sketch_size(params))
+    click.echo(f"Processed {stats['rows_in']} rows in {stats['chunks']} chunks "
+               f"({stats['rows_out']} rows out, {stats['scans']} passes over the input)")
+
+
+# -------------------------------------------------------------
+# Helper: Incremental runs (only the rows appended since the last run)
+# -------------------------------------------------------------
+def run_incremental_steps(params, steps):
+    from .incremental import check_incremental, run_incremental
+    from .parallel import column_pool
+
+    problem = check_incremental(params, steps)
+    if problem:
+        raise click.UsageError(problem)
+    with column_pool(params["workers"]) as pool:
+        stats = profile_step("Incremental pipeline", run_incremental,
+                             params, steps, refit=params["refit"], executor=pool)
+    if stats["mode"] == "up-to-date":
+        click.echo("No new rows since the last run")
+    elif stats["mode"] == "append":
+        click.echo(f"Appended {stats['rows_out']} rows ({stats['rows_in']} new rows in)")
+    else:
+        click.echo(f"Full run ({stats['reason']}): {stats['rows_in']} rows in, "
+                   f"{stats['rows_out']} rows out")
+
+
+# -------------------------------------------------------------
+# Helper: Multi-file inputs (directory / glob), one partition per file
+# -------------------------------------------------------------
+def use_partitions(params, steps):
+    from .extract import expand_input
+    from .partition import can_partition, partitioned_output
+
+    to_parts = "load" in steps and partitioned_output(params["output_path"])
+    if to_parts and not can_partition(params, steps):
+        raise click.UsageError("ffill / bfill need the rows of all files in order: "
+                               "write to a single output file instead of a directory")
+    multi_file = len(expand_input(params["input_path"])) > 1
+    return (to_parts or multi_file) and can_partition(params, steps)
+
+
+def run_partitions(params, steps, state=None):
+    from .partition import run_partitioned
+
+    progress = StepProgress(total=0, unit="partitions")
+    stats = profile_step("Partitioned pipeline", run_partitioned,
+                         params, steps, workers=params["workers"], state=state,
+                         progress=progress)
+    progress.finish()
+    click.echo(f"Processed {stats['rows_in']} rows from {stats['partitions']} files "
+               f"({stats['rows_out']} rows out)")
+
+
+# -------------------------------------------------------------
+# Helper: In-memory execution with the step-result cache
+# -------------------------------------------------------------
+def execute_steps(params, steps, read=None):
+    from .cache import StepCache, input_key, step_key
+    from .extract import extract_data
+    from .fit import apply_step, fit_frame, make_fit, sketch_size, uses_quantiles
+    from .load import save_data
+    from .parallel import column_pool
+    from .plan import build_plan, prefit, run_fused
+    from .stream import input_options, output_options
+
+    step_cache = None
+    if params["cache"]:
+        step_cache = StepCache(params["cache_dir"], params["cache_max_mb"] * 2**20)
+
+        # key of the DataFrame after each step; load leaves it unchanged
+        key = step_key(input_key(params["input_path"], params["cache_key"]), "extract", params)
+        extract_key = key
+        keys = []
+        for step in steps:
+            if step not in ("extract", "load"):
+                key = step_key(key, step, params)
+            keys.append(key)
+
+    def extract():
+        if step_cache is not None and extract_key in step_cache:
+            return step_cache.get(extract_key)
+        df = profile_step(STEP_LABELS["extract"], read or extract_data, params["input_path"],
+                          **input_options(params))
+        if step_cache is not None:
+            step_cache.put(extract_key, df)
+        return df
+
+    df = None
+    start = 0
+    progress = StepProgress(total=len(steps))
+
+    # resume from the longest cached prefix (never skipping a load step)
+    if step_cache is not None:
+        last = steps.index("load") if "load" in steps else len(steps)
+        for i in reversed(range(last)):
+            if keys[i] in step_cache:
+                click.echo(f"Resuming from cached '{steps[i]}' output")
+                df = step_cache.get(keys[i])
+                start = i + 1
+                progress.update(f"{steps[i]} (cached)", advance=start)
+                break
+
+    # ---------------------------------------------------------
+    # Plan the remaining steps, then run the plan's nodes
+    # ---------------------------------------------------------
+    # approximate quantiles (``quantile_error``): stateful steps are fitted with sketches
+    sketch_k = sketch_size(params, None)
+
+    with column_pool(params["workers"]) as pool:
+        # column-parallel fitting needs every step's input materialized
+        plan = build_plan(params, steps[start:], scan=df is None, fuse=pool is None)
+        progress.total = start + len(plan.nodes)
+        state = {}
+
+        for node in plan.nodes:
+            label = " + ".join(STEP_LABELS.get(step, step) for step in node.steps)
+
+            if node.op == "scan":
+                df = extract()
+
+            elif node.op == "load":
+                profile_step(STEP_LABELS["load"], save_data, df, params["output_path"],
+                             **output_options(params))
+
+            else:
+                # a filter pushed ahead of stateful steps: fit them on the unfiltered rows
+                prefit(df, node.prefit, params, state, executor=pool)
+
+                if node.op == "fused":
+                    # the executor owns df, so the fused pass writes its columns in place
+                    df = profile_step(label, run_fused, df, node.steps, params, state)
+                elif node.steps[0] in state:
+                    step = node.steps[0]
+                    df = profile_step(label, apply_step, step, df, params,
+                                      {step: state.pop(step)}, inplace=True)
+                elif ((pool is not None or sketch_k and uses_quantiles(node.steps[0], params))
+                      and make_fit(node.steps[0], params) is not None):
+                    # fit the step's statistics (column-parallel / sketched), then apply them
+                    _, df = profile_step(label, fit_frame, df, node.steps, params,
+                                         sketch_k=sketch_k, executor=pool)
+                else:
+                    # the executor owns df, so steps may modify it in place
+                    df = profile_step(label, apply_step, node.steps[0], df, params, inplace=True)
+                if step_cache is not None and node.prefix_end is not None:
+                    step_cache.put(keys[start + node.prefix_end], df)
+
+            progress.update(f"{label} ({0 if df is None else len(df)} rows)")
+
+    progress.finish()
+    return df
+
+
+# -------------------------------------------------------------
+# Helper: Sampled preview run (--sample)
+# -------------------------------------------------------------
+def run_sampled(params, steps):
+    import tempfile
+    from .sample import REPEATS, WARMUP_ROWS, InputSample, estimate_run, parse_sample
+    from .stream import input_options
+
+    try:
+        size = parse_sample(params["sample"])
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--sample")
+    sample = InputSample(size, seed=params["sample_seed"])
+    frame = profile_step(f"{STEP_LABELS['extract']} (sample)", sample.read,
+                         params["input_path"], **input_options(params))
+
+    # the steps run in memory: an untimed warm-up (imports, first calls),
+    # then, REPEATS times, a few rows and all of them, so fixed costs can be
+    # told from per-row costs and the noise of single timings evens out;
+    # the load step writes to a scratch file
+    suffix = Path(params["output_path"] or "").suffix or ".csv"
+    small, large = frame.iloc[:WARMUP_ROWS], frame
+    runs = {len(small): [], len(large): []}
+    with tempfile.TemporaryDirectory() as scratch:
+        run_params = {**params, "cache": False,
+                      "output_path": os.path.join(scratch, "sample" + suffix)}
+        for part in (small,) + (small, large) * REPEATS:
+            with profile_session(collect=True, trace_memory=False) as session:
+                df = execute_steps(run_params, steps, read=lambda *args, part=part, **kwargs: part.copy())
+            runs[len(part)].append(session.records)
+    estimate = estimate_run((len(small), runs[len(small)][1:]), (len(large), runs[len(large)][-REPEATS:]),
+                            len(frame) / sample.fraction, sample.read_s, STEP_LABELS["extract"])
+
+    click.echo(f"Sampled {sample.rows:,} of ~{round(sample.rows_total):,} rows "
+               f"({sample.fraction:.2%}); estimates for the full input:")
+    for step in estimate["steps"]:
+        rows = "" if step["rows_out"] is None else f"~{step['rows_out']:,} rows"
+        size_mb = "" if step["mb"] is None else f"{step['mb']:,.1f} MB"
+        click.echo(f"  {step['step']:<40} {rows:>18} {step['wall_s']:9.2f} s {size_mb:>12}")
+    low, high = estimate["wall_range"]
+    click.echo(f"  {'Full run':<40} {f'{low:.2f}-{high:.2f} s':>18} {estimate['wall_s']:9.2f} s "
+               f"{estimate['frame_mb']:>9,.1f} MB largest frame (data only)")
+    if df is not None:
+        click.echo(f"Sample output (first rows of {len(df):,}):")
+        click.echo(df.head().to_string())
+
+
+# -------------------------------------------------------------
+# Helper: Pick the execution mode of a run and run it
+# -------------------------------------------------------------
+def run_pipeline(params, steps):
+    from .fit import read_columns
+
+    params = {**params, "columns": read_columns(steps, params)}
+    if params.get("sample"):
+        if params["incremental"]:
+            raise click.UsageError("--sample previews a run; it cannot be --incremental")
+        run_sampled(params, steps)
+    elif params["incremental"]:
+        run_incremental_steps(params, steps)
+    elif params["chunksize"]:
+        run_streaming(params, steps)
+    elif use_partitions(params, steps):
+        run_partitions(params, steps)
+    else:
+        execute_steps(params, steps)
+
+
+# -------------------------------------------------------------
+# Helper: Apply fitted state (an artifact) without refitting
+# -------------------------------------------------------------
+def apply_artifact(params, steps, state):
+    from .extract import extract_data
+    from .fit import apply_step, read_columns
+    from .load import save_data
+    from .stream import can_chunk, input_options, output_options, stream_pipeline
+
+    params = {**params, "columns": read_columns(steps, params)}
+    if params["chunksize"] and not can_chunk(params, steps):
+        raise click.UsageError("ffill / bfill fill across chunk boundaries: run without --chunksize")
+    if params["chunksize"]:
+        stats = profile_step("Transform pipeline", stream_pipeline,
+                             params, steps, params["chunksize"], state=state)
+        click.echo(f"Transformed {stats['rows_in']} rows in {stats['chunks']} chunks")
+    elif use_partitions(params, steps):
+        run_partitions(params, steps, state=state)
+    else:
+        df = profile_step(STEP_LABELS["extract"], extract_data, params["input_path"],
+                          **input_options(params))
+        for step in steps:
+            if step not in ("extract", "load"):
+                df = profile_step(STEP_LABELS.get(step, step), apply_step,
+                                  step, df, params, state, inplace=True)
+        profile_step(STEP_LABELS["load"], save_data, df, params["output_path"],
+                     **output_options(params))
+        click.echo(f"Transformed {len(df)} rows")
+
+
 # -------------------------------------------------------------
 # MAIN RUN COMMAND
 # -------------------------------------------------------------
@@ -92,12 +436,24 @@ def cli():
 @click.option("--fill-value")
 @click.option("--outlier-method", type=click.Choice(["iqr", "zscore"]))
 @click.option("--normalize-method", default = "minmax", type=click.Choice(["minmax", "zscore", "robust"]))
-@click.option("--encode-method", default="label", type=click.Choice(["onehot", "label", "target"]))
+@click.option("--encode-method", default="label", type=click.Choice(["onehot", "label", "target", "hashing"]))
 @click.option("--target-column", type=str, help="Required for target encoding")
-@click.option("--threshold", default=1.5)
+@click.option("--threshold", type=float, help="IQR multiplier or z-score limit (default 1.5)")
+@click.option("--quantile-error", type=float, help="Approximate median / IQR / robust quantiles within this rank error (e.g. 0.001)")
+@click.option("--chunksize", type=int, help="Stream the input in chunks of N rows (bounded memory)")
+@click.option("--no-cache", is_flag=True, help="Recompute every step instead of reusing cached results")
+@click.option("--workers", type=int, help="Worker processes for column-parallel fitting and multi-file inputs (0 = one per CPU)")
+@click.option("--profile-out", help="Write per-step timings and memory as a JSON / Chrome trace file")
+@click.option("--profile-cprofile", help="Directory for one cProfile dump (.prof) per step")
+@click.option("--incremental", is_flag=True, help="Process only the rows appended to the input since the last run")
+@click.option("--refit", is_flag=True, help="With --incremental: refit on the whole input and rewrite the output")
+@click.option("--sample", help="Preview on a random sample (fraction like 0.01 / 1%, or a row count): "
+                               "estimates per step, writes no output")
+@click.option("--sample-seed", type=int, default=0, show_default=True, help="Random seed of --sample")
 def run(input_path, output_path, config, steps,
         missing_method, fill_value, outlier_method, threshold,
-        normalize_method, encode_method, target_column):
+        normalize_method, encode_method, target_column, chunksize, no_cache, workers,
+        profile_out, profile_cprofile, incremental, refit, quantile_error, sample, sample_seed):
     """
     Run the data pipeline using CLI or config settings.toml
     """
@@ -110,6 +466,7 @@ def run(input_path, output_path, config, steps,
         click.echo(f"Loaded config from {config}")
     else:
         config_data = {}
+    setup_logging(config_data)
 
     # --------------------------
     # Merge config + CLI
@@ -124,58 +481,25 @@ def run(input_path, output_path, config, steps,
         "normalize_method": normalize_method,
         "encode_method": encode_method,
         "target_column": target_column,
-        "threshold": threshold  # default threshold
+        "threshold": threshold,  # default threshold
+        "chunksize": chunksize,
+        "no_cache": no_cache,
+        "workers": workers,
+        "profile_out": profile_out,
+        "profile_cprofile": profile_cprofile,
+        "incremental": incremental,
+        "refit": refit,
+        "quantile_error": quantile_error,
+        "sample": sample,
+        "sample_seed": sample_seed,
     }
 
     params = merge_params(cli_params, config_data)
 
     click.echo(f"Steps to run: {params['steps']}")
 
-    df = None
-
-    # ---------------------------------------------------------
-    # Execute steps in order
-    # ---------------------------------------------------------
-    for step in params["steps"]:
-
-        if step == "extract":
-            slow_loop_sim("Extracting data…")
-            df = profile_step("Extract data",extract_data,params["input_path"])
-
-        elif step == "transform":
-            if df is None:
-                df = extract_data(params["input_path"])
-            slow_loop_sim("Transforming data…")
-            df = profile_step("Transform data",transform_data,df,
-                                method=params["missing_method"],
-                                fill_value=params["fill_value"])
-
-        elif step == "outliers":
-            if df is None:
-                df = extract_data(params["input_path"])
-            slow_loop_sim("Removing outliers…")
-            df = profile_step("Remove Outliers",remove_outliers,df,
-                         method=params["outlier_method"],
-                         threshold=params["threshold"])
-
-        elif step == "normalize":
-            if df is None:
-                df = extract_data(params["input_path"])
-            slow_loop_sim("Normalizing data…")
-            df = profile_step("Normalize data",normalize_data,df, method=params["normalize_method"])
-
-        elif step == "encode":
-            if df is None:
-                df = extract_data(params["input_path"])
-            slow_loop_sim("Encoding categorical variables…")
-            df = profile_step("Categorical Encoding",encode_categorical,df,
-                     method=params["encode_method"],
-                     target_column=params["target_column"])
-
-        elif step == "load":
-            slow_loop_sim("Saving data…")
-            save_data(df, params["output_path"])
-            
+    with profile_session(params["profile_out"], params["profile_cprofile"]):
+        run_pipeline(params, params["steps"])
 
     logger.info("Pipeline run completed!")
 
@@ -190,12 +514,22 @@ def run(input_path, output_path, config, steps,
 @click.option("--fill-value")
 @click.option("--outlier-method", type=click.Choice(["iqr", "zscore"]))
 @click.option("--normalize-method", default = "minmax", type=click.Choice(["minmax", "zscore", "robust"]))
-@click.option("--encode-method", default="label", type=click.Choice(["onehot", "label", "target"]))
+@click.option("--encode-method", default="label", type=click.Choice(["onehot", "label", "target", "hashing"]))
 @click.option("--target-column", type=str, help="Required for target encoding")
-@click.option("--threshold", default=1.5)
+@click.option("--threshold", type=float, help="IQR multiplier or z-score limit (default 1.5)")
+@click.option("--quantile-error", type=float, help="Approximate median / IQR / robust quantiles within this rank error (e.g. 0.001)")
+@click.option("--chunksize", type=int, help="Stream the input in chunks of N rows (bounded memory)")
+@click.option("--no-cache", is_flag=True, help="Recompute every step instead of reusing cached results")
+@click.option("--workers", type=int, help="Worker processes for column-parallel fitting and multi-file inputs (0 = one per CPU)")
+@click.option("--profile-out", help="Write per-step timings and memory as a JSON / Chrome trace file")
+@click.option("--profile-cprofile", help="Directory for one cProfile dump (.prof) per step")
+@click.option("--incremental", is_flag=True, help="Process only the rows appended to the input since the last run")
+@click.option("--refit", is_flag=True, help="With --incremental: refit on the whole input and rewrite the output")
 def run_all(input_path, output_path, config,
             missing_method, fill_value, outlier_method,
-            normalize_method, encode_method, target_column, threshold):
+            normalize_method, encode_method, target_column, threshold,
+            chunksize, no_cache, workers, profile_out, profile_cprofile, incremental, refit,
+            quantile_error):
     """
     Run ALL pipeline steps in fixed order:
     extract → transform → outliers → normalize → encode → load
@@ -210,6 +544,7 @@ def run_all(input_path, output_path, config,
         click.echo(f"Loaded config from {config}")
     else:
         config_data = {}
+    setup_logging(config_data)
 
     # --------------------------
     # Merge CLI overrides
@@ -224,6 +559,14 @@ def run_all(input_path, output_path, config,
         "normalize_method": normalize_method,
         "encode_method": encode_method,
         "target_column": target_column,
+        "chunksize": chunksize,
+        "no_cache": no_cache,
+        "workers": workers,
+        "profile_out": profile_out,
+        "profile_cprofile": profile_cprofile,
+        "incremental": incremental,
+        "refit": refit,
+        "quantile_error": quantile_error,
         "steps": None   # run-all ignores config steps
     }
 
@@ -232,34 +575,315 @@ def run_all(input_path, output_path, config,
     # --------------------------------------------
     # Execute steps (fixed order)
     # --------------------------------------------
-    slow_loop_sim("Extracting…")
-    df = profile_step("Extract data",extract_data,params["input_path"])
-
-    slow_loop_sim("Transforming…")
-    df = profile_step("Transform data",transform_data, df,
-                                method=params["missing_method"],
-                                fill_value=params["fill_value"])
-    
-    slow_loop_sim("Removing outliers…")
-    df = profile_step("Remove Outliers",remove_outliers, df,
-                         method=params["outlier_method"],
-                         threshold=params["threshold"])
-
-    slow_loop_sim("Normalizing…")
-    df = profile_step("Normalize data",normalize_data,df, method=params["normalize_method"])
-
-    slow_loop_sim("Encoding…")
-    df = profile_step("Categorical Encoding",encode_categorical, df,
-                     method=params["encode_method"],
-                     target_column=params["target_column"])
-
-    slow_loop_sim("Saving data…")
-    save_data(df, params["output_path"])
+    with profile_session(params["profile_out"], params["profile_cprofile"]):
+        run_pipeline(params, RUN_ALL_STEPS)
 
     logger.info("Pipeline run-all completed!")
 
 
 
+# -------------------------------------------------------------
+# FIT — learn step parameters once and save them as an artifact
+# -------------------------------------------------------------
+@cli.command()
+@click.argument("input_path", required=False)
+@click.option("--config", "-c", help="Path to settings.toml")
+@click.option("--artifact", "artifact_path", "-a", help="Where to write the fitted artifact (.json)")
+@click.option("--steps", multiple=True, type=str, help="Pipeline steps to fit")
+@click.option("--missing-method", type=click.Choice(["drop", "mean", "median", "mode", "constant", "ffill", "bfill"]))
+@click.option("--fill-value")
+@click.option("--outlier-method", type=click.Choice(["iqr", "zscore"]))
+@click.option("--normalize-method", default = "minmax", type=click.Choice(["minmax", "zscore", "robust"]))
+@click.option("--encode-method", default="label", type=click.Choice(["onehot", "label", "target", "hashing"]))
+@click.option("--target-column", type=str, help="Required for target encoding")
+@click.option("--threshold", type=float, help="IQR multiplier or z-score limit (default 1.5)")
+@click.option("--quantile-error", type=float, help="Approximate median / IQR / robust quantiles within this rank error (e.g. 0.001)")
+@click.option("--chunksize", type=int, help="Fit in chunks of N rows (bounded memory, approximate quantiles)")
+@click.option("--workers", type=int, help="Worker processes for column-parallel fitting and multi-file inputs (0 = one per CPU)")
+@click.option("--profile-out", help="Write per-step timings and memory as a JSON / Chrome trace file")
+@click.option("--profile-cprofile", help="Directory for one cProfile dump (.prof) per step")
+def fit(input_path, config, artifact_path, steps,
+        missing_method, fill_value, outlier_method, threshold,
+        normalize_method, encode_method, target_column, chunksize, workers,
+        profile_out, profile_cprofile, quantile_error):
+    """
+    Fit imputation values, outlier bounds, scalers and encoders on the
+    input and save them to an artifact for `datapipeline transform`.
+    """
+    from .artifact import save_artifact
+    from .extract import extract_chunks, extract_data
+    from .fit import fit_frame, fit_pipeline, read_columns, sketch_size
+    from .parallel import column_pool
+    from .stream import input_options
+
+    config_data = load_config(config) if config else {}
+    setup_logging(config_data)
+
+    cli_params = {
+        "input_path": input_path,
+        "artifact_path": artifact_path,
+        "steps": list(steps) if steps else None,
+        "missing_method": missing_method,
+        "fill_value": fill_value,
+        "outlier_method": outlier_method,
+        "normalize_method": normalize_method,
+        "encode_method": encode_method,
+        "target_column": target_column,
+        "threshold": threshold,
+        "chunksize": chunksize,
+        "workers": workers,
+        "profile_out": profile_out,
+        "profile_cprofile": profile_cprofile,
+        "quantile_error": quantile_error
+    }
+    params = merge_params(cli_params, config_data)
+    steps = params["steps"] or RUN_ALL_STEPS
+    params["columns"] = read_columns(steps, params)
+
+    if not params["artifact_path"]:
+        raise click.UsageError("No artifact path: pass --artifact or set [artifact] path in the config")
+
+    with profile_session(params["profile_out"], params["profile_cprofile"]), \
+            column_pool(params["workers"]) as pool:
+        if params["chunksize"]:
+            state = profile_step("Fit pipeline", fit_pipeline,
+                                 lambda: extract_chunks(params["input_path"], params["chunksize"],
+                                                        **input_options(params)),
+                                 steps, params, sketch_size(params), executor=pool)
+        else:
+            df = profile_step("Extract data", extract_data, params["input_path"],
+                              **input_options(params))
+            state, _ = profile_step("Fit pipeline", fit_frame, df, steps, params,
+                                    sketch_k=sketch_size(params, None), executor=pool)
+
+    save_artifact(state, steps, params, params["artifact_path"])
+    click.echo(f"Fitted {list(state)} and saved artifact to {params['artifact_path']}")
+
+
+# -------------------------------------------------------------
+# TRANSFORM — apply a fitted artifact without refitting
+# -------------------------------------------------------------
+@cli.command()
+@click.argument("input_path", required=False)
+@click.argument("output_path", required=False)
+@click.option("--config", "-c", help="Path to settings.toml")
+@click.option("--artifact", "artifact_path", "-a", help="Fitted artifact written by `datapipeline fit`")
+@click.option("--chunksize", type=int, help="Stream the input in chunks of N rows (bounded memory)")
+@click.option("--profile-out", help="Write per-step timings and memory as a JSON / Chrome trace file")
+@click.option("--profile-cprofile", help="Directory for one cProfile dump (.prof) per step")
+def transform(input_path, output_path, config, artifact_path, chunksize,
+              profile_out, profile_cprofile):
+    """
+    Apply the steps and parameters stored in a fitted artifact.
+    """
+    from .artifact import load_artifact
+
+    config_data = load_config(config) if config else {}
+    setup_logging(config_data)
+    paths = merge_params({
+        "input_path": input_path,
+        "output_path": output_path,
+        "artifact_path": artifact_path,
+        "chunksize": chunksize,
+        "profile_out": profile_out,
+        "profile_cprofile": profile_cprofile,
+    }, config_data)
+
+    if not paths["artifact_path"]:
+        raise click.UsageError("No artifact path: pass --artifact or set [artifact] path in the config")
+
+    artifact = load_artifact(paths["artifact_path"])
+    params = {**paths, **artifact["params"]}
+    steps = [step for step in artifact["steps"] if step != "load"] + ["load"]
+    state = artifact["state"]
+
+    with profile_session(params["profile_out"], params["profile_cprofile"]):
+        apply_artifact(params, steps, state)
+
+    logger.info("Pipeline transform completed!")
+
+
+# -------------------------------------------------------------
+# EXPLAIN — show the optimized plan without running it
+# -------------------------------------------------------------
+@cli.command()
+@click.argument("input_path", required=False)
+@click.argument("output_path", required=False)
+@click.option("--config", "-c", help="Path to settings.toml")
+@click.option("--steps", multiple=True, type=str, help="Pipeline steps to plan (default: config steps)")
+@click.option("--all", "run_all_steps", is_flag=True, help="Plan the fixed run-all steps")
+@click.option("--missing-method", type=click.Choice(["drop", "mean", "median", "mode", "constant", "ffill", "bfill"]))
+@click.option("--outlier-method", type=click.Choice(["iqr", "zscore"]))
+@click.option("--normalize-method", default = "minmax", type=click.Choice(["minmax", "zscore", "robust"]))
+@click.option("--encode-method", default="label", type=click.Choice(["onehot", "label", "target", "hashing"]))
+@click.option("--target-column", type=str, help="Required for target encoding")
+@click.option("--chunksize", type=int, help="Plan a streaming run in chunks of N rows")
+@click.option("--workers", type=int, help="Worker processes (0 = one per CPU)")
+@click.option("--quantile-error", type=float, help="Approximate median / IQR / robust quantiles within this rank error (e.g. 0.001)")
+def explain(input_path, output_path, config, steps, run_all_steps,
+            missing_method, outlier_method, normalize_method, encode_method,
+            target_column, chunksize, workers, quantile_error):
+    """
+    Print how `run` (or `run-all` with --all) would execute: the mode and,
+    for in-memory runs, the optimized plan (read once, dropped steps,
+    pushed-down filters, fused column passes).
+    """
+    from .incremental import state_path as incremental_state_path
+    from .parallel import resolve_workers
+    from .plan import build_plan
+
+    config_data = load_config(config) if config else {}
+    cli_params = {
+        "input_path": input_path,
+        "output_path": output_path,
+        "steps": list(steps) if steps else None,
+        "missing_method": missing_method,
+        "outlier_method": outlier_method,
+        "normalize_method": normalize_method,
+        "encode_method": encode_method,
+        "target_column": target_column,
+        "chunksize": chunksize,
+        "workers": workers,
+        "quantile_error": quantile_error,
+    }
+    params = merge_params(cli_params, config_data)
+    steps = RUN_ALL_STEPS if run_all_steps else params["steps"]
+
+    click.echo(f"Steps: {steps}")
+    if params["incremental"]:
+        click.echo("Mode: incremental (rows appended since the last run, transformed with "
+                   f"the state in {incremental_state_path(params)})")
+    elif params["chunksize"]:
+        click.echo(f"Mode: streaming in chunks of {params['chunksize']} rows "
+                   "(each stateful step is fitted in its own pass, then every chunk "
+                   "runs the steps in order)")
+    elif use_partitions(params, steps):
+        click.echo("Mode: partitioned (every input file runs the steps in its own process)")
+    else:
+        fuse = resolve_workers(params["workers"]) == 1
+        click.echo("Mode: in-memory" + ("" if fuse else " (column-parallel fit, no fusion)"))
+        click.echo(build_plan(params, steps, fuse=fuse).explain(params))
+
+
+# -------------------------------------------------------------
+# SERVE — long-running server with warm state and a job queue
+# -------------------------------------------------------------
+@cli.command()
+@click.option("--config", "-c", help="Path to settings.toml (default config of jobs, [serve] settings)")
+@click.option("--host", help="Address to listen on (default 127.0.0.1)")
+@click.option("--port", type=int, help="Port to listen on (default 8765)")
+@click.option("--socket", "socket_path", help="Listen on this Unix socket instead of a port")
+@click.option("--jobs", type=int, help="Jobs run at the same time (default 1)")
+@click.option("--queue-size", type=int, help="Jobs waiting before submissions are refused (default 32)")
+def serve(config, host, port, socket_path, jobs, queue_size):
+    """
+    Serve pipeline jobs over HTTP with imports, configs and fitted
+    artifacts kept warm (see `datapipeline submit`).
+    """
+    from .server import (JobRunner, make_server, DEFAULT_HOST, DEFAULT_PORT,
+                         DEFAULT_JOBS, DEFAULT_QUEUE_SIZE)
+
+    config_data = load_config(config) if config else {}
+    setup_logging(config_data)
+    s_cfg = config_data.get("serve", {})
+    host = host or s_cfg.get("host", DEFAULT_HOST)
+    port = port or s_cfg.get("port", DEFAULT_PORT)
+    socket_path = socket_path or s_cfg.get("socket")
+    jobs = jobs or s_cfg.get("jobs", DEFAULT_JOBS)
+    queue_size = queue_size or s_cfg.get("queue_size", DEFAULT_QUEUE_SIZE)
+
+    runner = JobRunner(config, jobs=jobs, queue_size=queue_size).start()
+    server = make_server(runner, host, port, socket_path)
+    click.echo(f"Serving on {socket_path or f'http://{host}:{server.server_address[1]}'} "
+               f"({jobs} at a time, queue of {queue_size})")
+    # stop on SIGTERM (service managers) as on Ctrl-C: finish the queued jobs first
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
+        runner.shutdown()
+    logger.info("Pipeline server stopped")
+
+
+@cli.command()
+@click.argument("input_path", required=False)
+@click.argument("output_path", required=False)
+@click.option("--config", "-c", help="Config of the job (as seen by the server)")
+@click.option("--steps", multiple=True, type=str, help="Pipeline steps to run")
+@click.option("--transform", "transform_job", is_flag=True, help="Apply a fitted artifact (like `datapipeline transform`)")
+@click.option("--param", "-p", "job_params", multiple=True, help="Job option as key=value, e.g. -p missing_method=mean")
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", type=int, default=8765, show_default=True)
+@click.option("--socket", "socket_path", help="Unix socket of the server")
+@click.option("--wait/--no-wait", default=True, show_default=True, help="Wait for the job to finish")
+def submit(input_path, output_path, config, steps, transform_job, job_params,
+           host, port, socket_path, wait):
+    """
+    Submit a job to a running `datapipeline serve` and print its status.
+    """
+    from .server import request
+
+    params = {}
+    for item in job_params:
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise click.UsageError(f"--param needs key=value, got {item!r}")
+        # numbers and true / false as JSON, anything else as text
+        try:
+            params[key] = json.loads(value)
+        except ValueError:
+            params[key] = value
+
+    # the server resolves relative paths against its own directory
+    def absolute(path):
+        return str(Path(path).resolve()) if path else None
+
+    job = {
+        "command": "transform" if transform_job else "run",
+        "input_path": absolute(input_path),
+        "output_path": absolute(output_path),
+        "config": absolute(config),
+        "steps": list(steps) if steps else None,
+        "params": params,
+    }
+    server = {"host": host, "port": port, "socket_path": socket_path}
+    code, body = request("POST", "/jobs", job, **server)
+    while wait and code < 400 and body["status"] in ("queued", "running"):
+        code, body = request("GET", f"/jobs/{body['id']}?wait=30", **server)
+
+    click.echo(json.dumps(body, indent=1))
+    if code >= 400 or body.get("status") == "failed":
+        raise SystemExit(1)
+
+
+# -------------------------------------------------------------
+# CACHE — manage the step-result cache
+# -------------------------------------------------------------
+@cli.group()
+def cache():
+    """Manage the step-result cache."""
+    pass
+
+
+@cache.command("clear")
+@click.option("--config", "-c", help="Path to settings.toml")
+def cache_clear(config):
+    """
+    Delete every cached step result.
+    """
+    from .cache import StepCache
+
+    config_data = load_config(config) if config else {}
+    params = merge_params({}, config_data)
+    freed = StepCache(params["cache_dir"]).clear()
+    click.echo(f"Cleared {params['cache_dir']} ({freed / 1e6:.1f} MB freed)")
+
+
 if __name__ == "__main__":
     cli()
 
@@ -0,0 +1,146 @@
+"""
+Column type helpers and dtype optimization.
+
+``numeric_columns`` / ``categorical_columns`` are how every step picks its
+columns, so steps keep working on downcast numerics (``int8``,
+``float32``, ...) and on ``category`` / ``string`` / ``boolean`` columns.
+
+``optimize_dtypes`` shrinks a freshly read frame:
+
+* integers are downcast to the smallest (unsigned) type holding their range;
+* floats become ``float32`` when every value survives the round trip
+  (e.g. integer-valued columns that only are float because of NaN);
+* yes / no (true / false) text columns become the nullable ``boolean`` type;
+* text columns with few distinct values become ``category``.
+
+``infer_schema`` runs the text rules on a sample so the reader can parse
+those columns straight into ``category`` / ``boolean`` instead of building
+Python string objects first.
+"""
+
+import numpy as np
+import pandas as pd
+
+NUMERIC = "number"
+CATEGORICAL = ["object", "string", "category"]
+
+# a text column becomes ``category`` when distinct / non-null values <= this
+DEFAULT_CATEGORY_RATIO = 0.5
+SAMPLE_ROWS = 10_000
+
+BOOLEAN_VALUES = {"yes": True, "no": False, "true": True, "false": False,
+                  "y": True, "n": False}
+
+
+def numeric_columns(df: pd.DataFrame) -> pd.Index:
+    """Numeric columns of any width (booleans excluded)."""
+    return df.select_dtypes(include=NUMERIC).columns
+
+
+def categorical_columns(df: pd.DataFrame) -> pd.Index:
+    """
+    Text, ``category`` and nullable ``boolean`` columns.
+
+    ``boolean`` columns come from yes / no text (see ``optimize_dtypes``), so
+    they are still encoded like the text they replace; NumPy ``bool``
+    columns are left alone, as before.
+    """
+    text = df.columns.isin(df.select_dtypes(include=CATEGORICAL).columns)
+    boolean = [isinstance(dtype, pd.BooleanDtype) for dtype in df.dtypes]
+    return df.columns[text | np.asarray(boolean, dtype=bool)]
+
+
+def _text_dtype(values: pd.Series, category_ratio: float):
+    """``"boolean"``, ``"category"`` or ``None`` for a text column."""
+    values = values.dropna()
+    if values.empty:
+        return None
+    distinct = pd.unique(values.astype(str).str.strip().str.lower())
+    if len(distinct) <= 2 and set(distinct) <= set(BOOLEAN_VALUES) and len(
+            {BOOLEAN_VALUES[v] for v in distinct}) == len(distinct):
+        return "boolean"
+    if len(distinct) <= category_ratio * len(values):
+        return "category"
+    return None
+
+
+def infer_schema(sample: pd.DataFrame, category_ratio: float = DEFAULT_CATEGORY_RATIO) -> dict:
+    """
+    ``{column: "category" | "boolean"}`` for the text columns of ``sample``.
+
+    Only types that hold any value are inferred: a wrong ``category`` guess
+    just gets more categories, and ``boolean`` columns are parsed as
+    ``category`` and converted afterwards (see ``apply_schema``), so values
+    the sample did not show never make the read fail.
+    """
+    schema = {}
+    for col in categorical_columns(sample):
+        dtype = _text_dtype(sample[col], category_ratio)
+        if dtype is not None:
+            schema[col] = dtype
+    return schema
+
+
+def reader_dtypes(schema: dict) -> dict:
+    """``dtype=`` argument for ``pd.read_csv`` from an ``infer_schema`` result."""
+    return {col: "category" for col in schema}
+
+
+def _to_boolean(values: pd.Series) -> pd.Series:
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype("category")
+    flags = [BOOLEAN_VALUES.get(str(c).strip().lower()) for c in values.cat.categories]
+    if any(flag is None for flag in flags):
+        # a value outside yes / no: keep the column as text categories
+        return values
+    codes = values.cat.codes.to_numpy()
+    # code -1 (missing) indexes the extra last slot and is masked
+    table = np.asarray(flags + [False], dtype=bool)
+    result = pd.arrays.BooleanArray(table[codes], codes == -1)
+    return pd.Series(result, index=values.index, name=values.name)
+
+
+def apply_schema(df: pd.DataFrame, schema: dict) -> pd.DataFrame:
+    """Convert the columns of ``schema`` in place (after a read with ``reader_dtypes``)."""
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            continue
+        if dtype == "boolean":
+            df[col] = _to_boolean(df[col])
+        elif not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    return df
+
+
+def downcast_numeric(df: pd.DataFrame) -> pd.DataFrame:
+    """Downcast the numeric columns of ``df`` in place without changing any value."""
+    for col in df.select_dtypes(include=["integer", "floating"]).columns:
+        values = df[col]
+        if not isinstance(values.dtype, np.dtype):
+            continue
+        if values.dtype.kind in "iu":
+            kind = "unsigned" if values.min() >= 0 else "integer"
+            df[col] = pd.to_numeric(values, downcast=kind)
+        elif values.dtype == np.float64:
+            as_float32 = values.to_numpy().astype(np.float32)
+            if np.array_equal(as_float32.astype(np.float64), values.to_numpy(), equal_nan=True):
+                df[col] = as_float32
+    return df
+
+
+def optimize_dtypes(df: pd.DataFrame, schema: dict = None,
+                    category_ratio: float = DEFAULT_CATEGORY_RATIO,
+                    downcast: bool = True) -> pd.DataFrame:
+    """
+    Shrink the dtypes of ``df`` in place (see the module docstring).
+
+    ``schema`` (from ``infer_schema``) fixes the text column types, e.g. so
+    every chunk of a streamed file gets the same ones; otherwise they are
+    inferred from ``df`` itself. ``downcast=False`` leaves numerics alone.
+    """
+    if schema is None:
+        schema = infer_schema(df, category_ratio)
+    apply_schema(df, schema)
+    if downcast:
+        downcast_numeric(df)
+    return df
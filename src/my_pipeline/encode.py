@@ -1,71 +1,386 @@
+import numpy as np
 import pandas as pd
-from sklearn.preprocessing import OneHotEncoder, LabelEncoder
 
+from .dtypes import categorical_columns
+from .logger import step_logger
 
-def encode_onehot(df):
-    cat_cols = df.select_dtypes(include=["object", "category"]).columns.tolist()
+logger = step_logger("encode")
+
+# one-hot bucket of the levels beyond ``max_categories``; dunder-named so it
+# cannot clash with a real level such as "other"
+OTHER_LEVEL = "__other__"
+
+# rows x columns of codes binned per ``np.bincount`` call in target encoding
+BINCOUNT_CELLS = 4_000_000
+
+
+def text_labels(values):
+    """
+    Values of a categorical column as plain text labels: ``category``
+    columns are decoded and ``boolean`` ones become "True" / "False", so
+    mapping and fitted state (JSON keys) work the same as for text columns.
+    """
+    if isinstance(values.dtype, pd.BooleanDtype):
+        return values.astype(str).where(values.notna())
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.astype(values.cat.categories.dtype)
+    return values
+
+
+def label_codes(values) -> np.ndarray:
+    """
+    Label codes of a categorical column: the index of each value's text in
+    the sorted distinct texts, missing values last (as scikit-learn's
+    ``LabelEncoder`` numbers them).
+    """
+    # missing values are coded here rather than left to ``factorize``,
+    # whose placement of them depends on the pandas version
+    missing = values.isna().to_numpy()
+    codes = np.empty(len(values), dtype=np.intp)
+    codes[~missing], uniques = pd.factorize(text_labels(values[~missing]).astype(str), sort=True)
+    codes[missing] = len(uniques)
+    return codes
+
+
+def onehot_levels(counts, max_categories=None):
+    """
+    Sorted one-hot levels from ``{level: count}``. With ``max_categories``
+    only the most frequent levels are kept and the rest share one
+    ``OTHER_LEVEL`` column.
+    """
+    if max_categories and len(counts) > max_categories:
+        ranked = sorted(counts.items(), key=lambda item: (-item[1], str(item[0])))
+        return sorted(level for level, _ in ranked[:max_categories]) + [OTHER_LEVEL]
+    return sorted(counts)
+
+
+def encode_onehot(df, categories=None, sparse=False, max_categories=None):
+    """
+    One-hot encoding. ``categories`` ({column: [levels]}) fixes the dummy
+    columns, so chunks or new batches always produce the same layout.
+
+    Columns are converted to the ``category`` dtype first, so dummies are
+    built from integer codes. ``sparse=True`` returns ``pd.SparseDtype``
+    dummy columns, and ``max_categories`` caps the levels per column (see
+    ``onehot_levels``) for high-cardinality, ID-like columns.
+    """
+    if categories is not None:
+        cat_cols = [col for col in categories if col in df.columns]
+        logger.info(f"One-Hot Encoding with fitted categories: {cat_cols}")
+    else:
+        cat_cols = categorical_columns(df).tolist()
+        if not cat_cols:
+            logger.info("No categorical columns found. Skipping one-hot encoding.")
+            return df
+        logger.info(f"One-Hot Encoding: {cat_cols}")
+        categories = {
+            col: onehot_levels(text_labels(df[col]).value_counts().to_dict(), max_categories)
+            for col in cat_cols
+        }
+
+    df = df.copy(deep=False)
+    for col in cat_cols:
+        levels = categories[col]
+        values = text_labels(df[col])
+        known = values.isin(levels) | values.isna()
+        if not known.all():
+            # unseen values go to the cap bucket, or set no column without one
+            values = values.where(known, OTHER_LEVEL if OTHER_LEVEL in levels else None)
+        df[col] = pd.Categorical(values, categories=levels)
+    return pd.get_dummies(df, columns=cat_cols, drop_first=False, sparse=sparse)
+
+
+def encode_hashing(df, n_features=32, sparse=False):
+    """
+    Feature hashing: each categorical column becomes exactly ``n_features``
+    indicator columns (``<col>_h0`` ...), whatever its cardinality.
+
+    Values are hashed with pandas' stable (seeded) hash, so the same value
+    lands in the same column across runs, chunks and new data; missing
+    values set no column. No state needs to be fitted.
+    """
+    cat_cols = categorical_columns(df).tolist()
     if not cat_cols:
-        print("No categorical columns found. Skipping one-hot encoding.")
+        logger.info("No categorical columns found. Skipping hashing encoding.")
         return df
-    print(f"One-Hot Encoding: {cat_cols}")
-    return pd.get_dummies(df, columns=cat_cols, drop_first=False)
 
+    logger.info(f"Hashing Encoding ({n_features} columns each): {cat_cols}")
+    df = df.copy(deep=False)
+    buckets = [f"h{i}" for i in range(n_features)]
+    for col in cat_cols:
+        missing = df[col].isna().to_numpy()
+        hashed = pd.util.hash_pandas_object(text_labels(df[col]).astype(str), index=False).to_numpy()
+        codes = np.where(missing, -1, hashed % n_features).astype("int64")
+        df[col] = pd.Categorical.from_codes(codes, categories=buckets)
+    return pd.get_dummies(df, columns=cat_cols, drop_first=False, sparse=sparse)
+
+
+def encode_label(df, classes=None):
+    """
+    Label encoding. ``classes`` ({column: [sorted labels]}) fixes the codes;
+    a ``None`` entry is the code for missing values and labels not in the
+    list become NaN.
+    """
+    if classes is not None:
+        cat_cols = [col for col in classes if col in df.columns]
+        logger.info(f"Label Encoding with fitted classes: {cat_cols}")
+        df = df.copy()
+        for col in cat_cols:
+            codes = {label: code for code, label in enumerate(classes[col])}
+            missing = df[col].isna()
+            df[col] = text_labels(df[col]).astype(str).map(codes)
+            if None in codes:
+                df.loc[missing, col] = codes[None]
+        return df
 
-def encode_label(df):
-    cat_cols = df.select_dtypes(include=["object", "category"]).columns.tolist()
+    cat_cols = categorical_columns(df).tolist()
     if not cat_cols:
-        print("No categorical columns found. Skipping label encoding.")
+        logger.info("No categorical columns found. Skipping label encoding.")
         return df
 
-    print(f"Label Encoding: {cat_cols}")
+    logger.info(f"Label Encoding: {cat_cols}")
     df = df.copy()
     for col in cat_cols:
-        le = LabelEncoder()
-        df[col] = le.fit_transform(df[col].astype(str))
+        df[col] = label_codes(df[col])
     return df
 
 
-def encode_target(df, target_column):
+def row_folds(n_rows: int, folds: int) -> np.ndarray:
+    """
+    Fold (``0 .. folds - 1``) of each row position of a frame.
+
+    Positions are spread with a multiplicative (Fibonacci) hash, so the
+    folds do not follow any ordering of the data, and a fit pass and the
+    pass applying its statistics assign every row of a frame or chunk to
+    the same fold.
+    """
+    positions = np.arange(n_rows, dtype=np.uint64)
+    hashed = (positions * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(32)
+    return (hashed % np.uint64(folds)).astype(np.intp)
+
+
+def _smoothed(sums, counts, smoothing):
+    """
+    Encoded value per fold and code: ``(sum + m * prior) / (count + m)``,
+    with the fold's target mean as prior. The last code (missing or unseen
+    categories) gets the prior, or NaN without smoothing.
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        prior = sums.sum(axis=1) / counts.sum(axis=1)
+        table = (sums + smoothing * prior[:, None]) / (counts + smoothing)
+    table[:, -1] = prior if smoothing else np.nan
+    return table
+
+
+class TargetStats:
+    """
+    Target sums and counts per category of one column, per fold.
+
+    ``sums`` and ``counts`` have one row per fold and one column per
+    category plus a last one for rows with a missing category, so each
+    column's totals cover the whole target (the prior of smoothing).
+    Statistics of chunks or partitions merge exactly.
+    """
+
+    def __init__(self, categories, sums: np.ndarray, counts: np.ndarray):
+        self.categories = pd.Index(categories)
+        self.sums = sums
+        self.counts = counts
+
+    def merge(self, other: "TargetStats") -> "TargetStats":
+        if not self.categories.equals(other.categories):
+            new = other.categories[~other.categories.isin(self.categories)]
+            categories = self.categories.append(new)
+            slots = np.append(categories.get_indexer(other.categories), len(categories))
+            sums = np.zeros((self.sums.shape[0], len(categories) + 1))
+            counts = np.zeros((self.counts.shape[0], len(categories) + 1), dtype=np.int64)
+            mine = np.append(np.arange(len(self.categories)), len(categories))
+            sums[:, mine], counts[:, mine] = self.sums, self.counts
+            self.categories, self.sums, self.counts = categories, sums, counts
+        else:
+            slots = np.arange(len(self.categories) + 1)
+        self.sums[:, slots] += other.sums
+        self.counts[:, slots] += other.counts
+        return self
+
+    def prior(self) -> float:
+        """Mean of every known target value."""
+        count = self.counts.sum()
+        return float(self.sums.sum() / count) if count else float("nan")
+
+    def encodings(self, smoothing=0.0) -> dict:
+        """``{category: encoded value}`` from all folds (for new data)."""
+        table = _smoothed(self.sums.sum(axis=0, keepdims=True),
+                          self.counts.sum(axis=0, keepdims=True), smoothing)
+        return dict(zip(self.categories.tolist(), table[0, :-1].tolist()))
+
+    def encode(self, codes: np.ndarray, smoothing=0.0, fold: np.ndarray = None) -> np.ndarray:
+        """
+        Encoded values of category ``codes`` (positions in ``categories``,
+        -1 for missing or unseen). With ``fold`` (see ``row_folds``) each
+        row gets the statistics of the other folds only (out-of-fold).
+        """
+        if fold is None:
+            table = _smoothed(self.sums.sum(axis=0, keepdims=True),
+                              self.counts.sum(axis=0, keepdims=True), smoothing)
+            fold = 0
+        else:
+            table = _smoothed(self.sums.sum(axis=0) - self.sums,
+                              self.counts.sum(axis=0) - self.counts, smoothing)
+        return table[fold, np.where(codes < 0, table.shape[1] - 1, codes)]
+
+    def codes(self, values) -> np.ndarray:
+        """Codes of a column's values for ``encode``."""
+        return self.categories.get_indexer(text_labels(values))
+
+
+def _column_blocks(columns, n_rows):
+    """Groups of columns whose codes stay within ``BINCOUNT_CELLS`` cells."""
+    size = max(1, BINCOUNT_CELLS // max(n_rows, 1))
+    for start in range(0, len(columns), size):
+        yield columns[start:start + size]
+
+
+def target_stats(df, columns, target_column, folds=0, factorized=None) -> dict:
+    """
+    ``TargetStats`` of each of ``columns`` against ``df[target_column]``.
+
+    Every column is factorized once; the codes of a block of columns are
+    offset into one index space, so a single ``np.bincount`` pass gives
+    the target sums (and one the counts) of every category of the block.
+    Rows with a missing target are not counted. ``folds`` > 1 keeps the
+    statistics per fold (``row_folds``) for out-of-fold encoding.
+    ``factorized`` ({column: (codes, categories)}) reuses factorized columns.
+    """
+    target = df[target_column].to_numpy(dtype="float64", na_value=np.nan)
+    known = ~np.isnan(target)
+    target = target[known]
+    n_folds = folds if folds and folds > 1 else 1
+    fold = row_folds(len(df), n_folds)[known] if n_folds > 1 else None
+    factorized = factorized or {}
+
+    stats = {}
+    for block in _column_blocks(list(columns), len(target)):
+        parts = [factorized.get(col) or pd.factorize(text_labels(df[col])) for col in block]
+        widths = np.array([len(categories) + 1 for _, categories in parts])
+        offsets = np.concatenate(([0], np.cumsum(widths)[:-1]))
+        width = int(widths.sum())
+
+        index = np.empty((len(block), len(target)), dtype=np.intp)
+        for i, (codes, _) in enumerate(parts):
+            codes = codes[known]
+            index[i] = np.where(codes < 0, widths[i] - 1, codes) + offsets[i]
+        if fold is not None:
+            index += fold * width
+        index = index.ravel()
+        sums = np.bincount(index, weights=np.tile(target, len(block)),
+                           minlength=n_folds * width).reshape(n_folds, width)
+        counts = np.bincount(index, minlength=n_folds * width).reshape(n_folds, width)
+
+        for col, (_, categories), start, size in zip(block, parts, offsets, widths):
+            stats[col] = TargetStats(categories, sums[:, start:start + size].copy(),
+                                     counts[:, start:start + size].copy())
+    return stats
+
+
+def target_encodings(df, columns, target_column, smoothing=0.0, folds=0) -> dict:
+    """
+    Target-encoded values (arrays) of ``columns`` from the statistics of
+    ``df`` itself; out-of-fold with ``folds`` > 1.
+    """
+    fold = row_folds(len(df), folds) if folds and folds > 1 else None
+    encoded = {}
+    for block in _column_blocks(list(columns), len(df)):
+        factorized = {col: pd.factorize(text_labels(df[col])) for col in block}
+        stats = target_stats(df, block, target_column, folds, factorized)
+        for col in block:
+            encoded[col] = stats[col].encode(factorized[col][0], smoothing, fold)
+    return encoded
+
+
+def encode_target(df, target_column, means=None, smoothing=0.0, folds=0,
+                  target_prior=None, fold_stats=None):
     """
     Target encoding: replace categories with mean(target) for each category.
 
     Example: if target = "price":
         brand=A → 100
         brand=B → 130
+
+    ``smoothing`` (m) pulls categories with few rows toward the global
+    target mean: ``(sum + m * mean) / (count + m)``; missing categories
+    then get the global mean. With ``folds`` > 1 each row is encoded with
+    the statistics of the other folds (``row_folds``), so a row's own
+    target never leaks into its encoding.
+
+    Fitted state replaces the statistics of ``df``: ``means`` ({column:
+    {category: value}}) for new data, where unseen categories get
+    ``target_prior`` when given; ``fold_stats`` ({column: TargetStats})
+    for out-of-fold encoding of the rows the statistics came from.
     """
 
+    if fold_stats is not None:
+        cat_cols = [col for col in fold_stats if col in df.columns]
+        logger.info(f"Target Encoding out-of-fold with fitted statistics: {cat_cols}")
+        fold = row_folds(len(df), folds)
+        df = df.copy(deep=False)
+        for col in cat_cols:
+            stats = fold_stats[col]
+            df[col] = stats.encode(stats.codes(df[col]), smoothing, fold)
+        return df
+
+    if means is not None:
+        cat_cols = [col for col in means if col in df.columns]
+        logger.info(f"Target Encoding with fitted means: {cat_cols}")
+        df = df.copy(deep=False)
+        for col in cat_cols:
+            encoded = text_labels(df[col]).map(means[col])
+            df[col] = encoded if target_prior is None else encoded.fillna(target_prior)
+        return df
+
     if target_column not in df.columns:
         raise ValueError(f"Target column '{target_column}' not found in DataFrame.")
 
-    cat_cols = df.select_dtypes(include=["object", "category"]).columns.tolist()
+    cat_cols = categorical_columns(df).tolist()
     if not cat_cols:
-        print("No categorical columns found. Skipping target encoding.")
+        logger.info("No categorical columns found. Skipping target encoding.")
         return df
 
-    df = df.copy()
-
-    for col in cat_cols:
-        print(f"Target Encoding {col} using target '{target_column}'")
-
-        means = df.groupby(col)[target_column].mean()
-        df[col] = df[col].map(means)
-
+    logger.info(f"Target Encoding {cat_cols} using target '{target_column}'")
+    encoded = target_encodings(df, cat_cols, target_column, smoothing, folds)
+    df = df.copy(deep=False)
+    for col, values in encoded.items():
+        df[col] = values
     return df
 
 
-def encode_categorical(df, method="label", target_column=None):
+def encode_categorical(df, method="label", target_column=None, mappings=None,
+                       sparse=False, max_categories=None, n_features=32,
+                       smoothing=0.0, folds=0, target_prior=None, fold_stats=None):
     """
     Wrapper to call encoding methods.
+
+    ``mappings`` holds fitted per-column state for the chosen method
+    (one-hot categories, label classes or target means). ``sparse`` and
+    ``max_categories`` apply to one-hot, ``sparse`` and ``n_features`` to
+    hashing; ``smoothing``, ``folds``, ``target_prior`` and ``fold_stats``
+    to target encoding (see ``encode_target``).
     """
 
     if method == "onehot":
-        return encode_onehot(df)
+        return encode_onehot(df, categories=mappings, sparse=sparse,
+                             max_categories=max_categories)
+    elif method == "hashing":
+        return encode_hashing(df, n_features=n_features, sparse=sparse)
     elif method == "label":
-        return encode_label(df)
+        return encode_label(df, classes=mappings)
     elif method == "target":
         if target_column is None:
             raise ValueError("Target encoding requires --target-column")
-        return encode_target(df, target_column)
+        if smoothing < 0:
+            raise ValueError("Target smoothing must be >= 0")
+        return encode_target(df, target_column, means=mappings, smoothing=smoothing,
+                             folds=folds, target_prior=target_prior, fold_stats=fold_stats)
     else:
-        raise ValueError("Invalid encoding method. Choose: onehot, label, target")
+        raise ValueError("Invalid encoding method. Choose: onehot, label, target, hashing")
 
@@ -1,12 +1,505 @@
-import pandas as pd
+import glob
+import io
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-def extract_data(input_path: str) -> pd.DataFrame:
-    """Extract raw data from a CSV file."""
+import pandas as pd
+
+from .dtypes import SAMPLE_ROWS, apply_schema, infer_schema, optimize_dtypes, reader_dtypes
+
+# file extension -> reader format ("arrow" is the Arrow IPC file format,
+# which Feather v2 is an alias for)
+FILE_TYPES = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".feather": "feather",
+    ".arrow": "arrow",
+    ".ipc": "arrow",
+}
+
+
+# CSV parsers (``pd.read_csv`` engines) and column type backends
+CSV_ENGINES = ("c", "pyarrow", "python")
+DTYPE_BACKENDS = ("numpy", "numpy_nullable", "pyarrow")
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise ImportError(
+            "Parquet / Feather / Arrow files need pyarrow: pip install pyarrow"
+        ) from e
+
+
+def detect_file_type(path, file_type: str = None) -> str:
+    """Resolve ``file_type`` ("auto"/None means: from the file extension)."""
+    if file_type and file_type != "auto":
+        if file_type not in FILE_TYPES.values():
+            raise ValueError(
+                f"Unsupported file type '{file_type}'. Choose: csv, parquet, feather, arrow"
+            )
+        return file_type
+
+    suffix = Path(path).suffix.lower()
+    if suffix not in FILE_TYPES:
+        raise ValueError(f"Cannot detect file type of {path}; set file_type explicitly")
+    return FILE_TYPES[suffix]
+
+
+def expand_input(input_path) -> list:
+    """
+    Files behind ``input_path``, sorted: a single file, every supported
+    file in a directory, or the matches of a glob pattern
+    (``data/raw/2024-*.csv``, ``data/raw/**/*.parquet``).
+    """
+    input_path = str(input_path)
+
+    if glob.has_magic(input_path):
+        paths = sorted(Path(p) for p in glob.glob(input_path, recursive=True)
+                       if Path(p).is_file())
+        if not paths:
+            raise FileNotFoundError(f"No input files match: {input_path}")
+        return paths
+
     file_path = Path(input_path)
+    if file_path.is_dir():
+        paths = sorted(p for p in file_path.iterdir()
+                       if p.is_file() and p.suffix.lower() in FILE_TYPES)
+        if not paths:
+            raise FileNotFoundError(f"No supported input files in directory: {file_path}")
+        return paths
 
     if not file_path.exists():
         raise FileNotFoundError(f"Input file does not exist: {file_path}")
+    return [file_path]
+
+
+def input_size(input_path) -> int:
+    """Total size in bytes of the file(s) behind ``input_path``."""
+    return sum(os.path.getsize(p) for p in expand_input(input_path))
+
+
+class _ByteWindow(io.RawIOBase):
+    """Read-only, memory-mapped file object over the first ``end`` bytes of a file."""
+
+    def __init__(self, file_path, end: int):
+        self._file = open(file_path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._end = end
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self._end}[whence]
+        self._pos = min(max(base + offset, 0), self._end)
+        return self._pos
+
+    def readinto(self, buffer):
+        n = max(min(len(buffer), self._end - self._pos), 0)
+        buffer[:n] = self._map[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._map.close()
+            self._file.close()
+        super().close()
+
+
+def open_window(file_path, skipfooter: int = 0):
+    """Binary file object over ``file_path`` without its last ``skipfooter`` lines."""
+    if not skipfooter:
+        return open(file_path, "rb")
+    end = footer_offset(file_path, skipfooter)
+    return io.BufferedReader(_ByteWindow(file_path, end)) if end else io.BytesIO()
+
+
+def footer_offset(file_path, lines: int) -> int:
+    """Byte offset where the last ``lines`` lines of a file start."""
+    size = os.path.getsize(file_path)
+    if not lines or not size:
+        return size
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        end = size - 1 if data[size - 1:size] == b"\n" else size
+        for _ in range(lines):
+            end = data.rfind(b"\n", 0, end)
+            if end < 0:
+                return 0
+        return end + 1
+
+
+def read_csv(file_path, columns=None, dtype=None, engine: str = "c",
+             dtype_backend: str = "numpy", memory_map: bool = False,
+             nrows: int = None, skipfooter: int = 0, chunksize: int = None):
+    """
+    ``pd.read_csv`` with the ``[extract]`` reader options.
+
+    Parameters
+    ----------
+    file_path : str, Path or binary file object
+        CSV file to parse (``skipfooter`` and ``memory_map`` need a path).
+    columns : list[str], optional
+        Parse only these columns (``usecols``).
+    dtype : dict, optional
+        Column types given to the parser (e.g. ``dtypes.reader_dtypes``).
+    engine : str
+        "c" (default), "pyarrow" (multithreaded Arrow CSV parser, needs
+        ``pyarrow``) or "python". Chunked reads and ``nrows`` windows use
+        the C parser, as the Arrow parser always reads whole files.
+    dtype_backend : str
+        "numpy" (default), "numpy_nullable" or "pyarrow" (Arrow-backed
+        columns: no Python string objects, integers stay integers with
+        missing values).
+    memory_map : bool
+        Map the file into memory instead of reading it through a buffer.
+    nrows : int, optional
+        Parse only the first ``nrows`` data rows.
+    skipfooter : int
+        Ignore this many lines at the end of the file. The footer is found
+        by scanning back from the end, so it never reaches the parser
+        (``pd.read_csv``'s own ``skipfooter`` needs the slow Python parser).
+    chunksize : int, optional
+        Return an iterator of DataFrames of this many rows.
+
+    Returns
+    -------
+    DataFrame or iterator of DataFrames
+    """
+    if engine not in CSV_ENGINES:
+        raise ValueError(f"Invalid CSV engine '{engine}'. Choose: {', '.join(CSV_ENGINES)}")
+    if dtype_backend not in DTYPE_BACKENDS:
+        raise ValueError(f"Invalid dtype backend '{dtype_backend}'. Choose: {', '.join(DTYPE_BACKENDS)}")
+    if engine == "pyarrow" and (chunksize or nrows):
+        engine = "c"
+    if engine == "pyarrow" or dtype_backend == "pyarrow":
+        _require_pyarrow()
+
+    options = {"usecols": columns, "dtype": dtype, "engine": engine, "nrows": nrows}
+    if dtype_backend != "numpy":
+        options["dtype_backend"] = dtype_backend
+
+    if skipfooter:
+        source = open_window(file_path, skipfooter)
+    elif memory_map and engine == "pyarrow":
+        import pyarrow as pa
+        source = pa.memory_map(str(file_path))
+    else:
+        source = file_path
+        options["memory_map"] = memory_map and isinstance(file_path, (str, Path))
+
+    # pandas' Arrow parser mis-casts other columns when given ``dtype``;
+    # converting afterwards is cheap
+    after = options.pop("dtype") if engine == "pyarrow" and dtype else None
+
+    if chunksize:
+        reader = pd.read_csv(source, chunksize=chunksize, **options)
+        return _closing_chunks(reader, None if source is file_path else source)
+    try:
+        df = pd.read_csv(source, **options)
+        return df.astype(after) if after else df
+    finally:
+        if source is not file_path:
+            source.close()
+
+
+def _closing_chunks(reader, source=None):
+    try:
+        yield from reader
+    finally:
+        reader.close()
+        if source is not None:
+            source.close()
+
+
+def _filter_mask(df: pd.DataFrame, filters) -> pd.Series:
+    """Boolean mask for ``[(column, op, value), ...]`` (all conditions ANDed)."""
+    ops = {
+        "==": lambda s, v: s == v,
+        "=": lambda s, v: s == v,
+        "!=": lambda s, v: s != v,
+        "<": lambda s, v: s < v,
+        "<=": lambda s, v: s <= v,
+        ">": lambda s, v: s > v,
+        ">=": lambda s, v: s >= v,
+        "in": lambda s, v: s.isin(v),
+        "not in": lambda s, v: ~s.isin(v),
+    }
+    mask = pd.Series(True, index=df.index)
+    for col, op, value in filters:
+        if op not in ops:
+            raise ValueError(f"Unsupported filter operator '{op}'")
+        mask &= ops[op](df[col], value)
+    return mask
 
-    df = pd.read_csv(file_path)
+
+def extract_data(input_path: str, file_type: str = None, columns=None,
+                 filters=None, workers: int = None, optimize: bool = False,
+                 csv_options=None) -> pd.DataFrame:
+    """
+    Extract raw data from a CSV, Parquet, Feather or Arrow IPC file.
+
+    Parameters
+    ----------
+    input_path : str
+        File, directory or glob pattern to read (see ``expand_input``).
+        Several files are parsed in parallel and concatenated in path order.
+    file_type : str, optional
+        "csv", "parquet", "feather" or "arrow"; detected from the extension
+        when omitted or "auto".
+    columns : list[str], optional
+        Read only these columns (projection).
+    filters : list[tuple], optional
+        Row predicates ``(column, op, value)``, ANDed. Parquet pushes them
+        down to skip row groups; other formats filter after reading.
+    workers : int, optional
+        Threads used to parse several files (default: one per CPU).
+    optimize : bool
+        Shrink the dtypes (see ``dtypes.optimize_dtypes``): text column
+        types are inferred from a sample of the first file and passed to
+        the CSV reader, numerics are downcast after reading.
+    csv_options : dict, optional
+        Reader options of CSV files (``engine``, ``dtype_backend``,
+        ``memory_map``, ``nrows``, ``skipfooter``), see ``read_csv``;
+        ``nrows`` and ``skipfooter`` apply to every file.
+
+    Returns
+    -------
+    DataFrame
+    """
+    paths = expand_input(input_path)
+    file_type = detect_file_type(paths[0], file_type) if len(paths) == 1 else file_type
+    columns = list(columns) if columns else None
+    filters = [tuple(f) for f in filters] if filters else None
+    schema = _sample_schema(paths[0], file_type, columns) if optimize else None
+    csv_options = csv_options or {}
+
+    if len(paths) > 1:
+        workers = min(len(paths), workers or os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            frames = list(pool.map(
+                lambda path: _read_file(path, file_type, columns, filters, schema, csv_options),
+                paths))
+        df = pd.concat(frames, ignore_index=True)
+    else:
+        df = _read_file(paths[0], file_type, columns, filters, schema, csv_options)
+
+    if optimize:
+        # also after concatenating: shards with different categories give object columns
+        optimize_dtypes(df, schema)
     return df
+
+
+def extract_appended(input_path: str, offset: int = 0, file_type: str = None,
+                     columns=None, filters=None, optimize: bool = False, csv_options=None):
+    """
+    Extract the complete CSV lines after byte ``offset`` of a growing file.
+
+    Only the bytes from ``offset`` to the last newline currently in the file
+    are parsed, so a line still being written is left for the next read.
+    The header always comes from the start of the file (``offset=0`` reads
+    the whole file). CSV only; ``columns``, ``filters`` and ``optimize``
+    work as in ``extract_data``, of ``csv_options`` only the ``engine`` and
+    ``dtype_backend`` apply.
+
+    Returns
+    -------
+    tuple
+        ``(DataFrame, end)`` where ``end`` is the byte offset to continue
+        from next time.
+    """
+    input_path = Path(input_path)
+    if detect_file_type(input_path, file_type) != "csv":
+        raise ValueError(f"Byte offsets only apply to CSV input, not {input_path}")
+    names = pd.read_csv(input_path, nrows=0).columns.tolist()
+
+    with open(input_path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    complete = data.rfind(b"\n") + 1
+    data = data[:complete]
+    end = offset + complete
+
+    options = {key: value for key, value in (csv_options or {}).items()
+               if key in ("engine", "dtype_backend") and value}
+    if options.get("dtype_backend") == "numpy":
+        del options["dtype_backend"]
+    if offset == 0:
+        df = pd.read_csv(io.BytesIO(data), usecols=columns, **options) if data else pd.DataFrame(columns=names)
+    elif data.strip():
+        df = pd.read_csv(io.BytesIO(data), header=None, names=names, usecols=columns, **options)
+    else:
+        df = pd.DataFrame(columns=names)
+    if columns:
+        df = df[list(columns)]
+    if filters:
+        df = df[_filter_mask(df, [tuple(f) for f in filters])].reset_index(drop=True)
+    if optimize:
+        optimize_dtypes(df)
+    return df, end
+
+
+def _with_filter_columns(columns, filters):
+    """``columns`` plus the columns ``filters`` need (dropped again after filtering)."""
+    if not columns or not filters:
+        return columns
+    return list(dict.fromkeys([*columns, *(col for col, _, _ in filters)]))
+
+
+def _sample_schema(file_path, file_type, columns) -> dict:
+    """Text column types (``dtypes.infer_schema``) of the first rows of a file."""
+    file_type = detect_file_type(file_path, file_type)
+    if file_type == "csv":
+        sample = pd.read_csv(file_path, usecols=columns, nrows=SAMPLE_ROWS)
+    else:
+        _require_pyarrow()
+        sample = next(_arrow_chunks(Path(file_path), file_type, SAMPLE_ROWS, None, columns),
+                      pd.DataFrame())
+    return infer_schema(sample)
+
+
+def _read_file(file_path, file_type, columns, filters, schema=None, csv_options=None) -> pd.DataFrame:
+    file_type = detect_file_type(file_path, file_type)
+
+    if file_type == "csv":
+        dtype = reader_dtypes(schema) if schema else None
+        read_columns = _with_filter_columns(columns, filters)
+        df = read_csv(file_path, read_columns, dtype, **(csv_options or {}))
+        if filters:
+            df = df[_filter_mask(df, filters)].reset_index(drop=True)
+        if read_columns != columns:
+            df = df.drop(columns=read_columns[len(columns):])
+        return df
+
+    _require_pyarrow()
+
+    if file_type == "parquet":
+        import pyarrow.parquet as pq
+        table = pq.read_table(file_path, columns=columns, filters=filters, memory_map=True)
+    else:
+        # Feather v2 == Arrow IPC file: memory-mapped, buffers are not copied
+        import pyarrow.feather as feather
+        import pyarrow.parquet as pq
+        read_columns = _with_filter_columns(columns, filters)
+        table = feather.read_table(file_path, columns=read_columns, memory_map=True)
+        if filters:
+            table = table.filter(pq.filters_to_expression(filters))
+        if read_columns != columns:
+            table = table.select(columns)
+
+    return table.to_pandas()
+
+
+def extract_chunks(input_path: str, chunksize: int, on_chunk=None,
+                   file_type: str = None, columns=None, filters=None,
+                   optimize: bool = False, csv_options=None):
+    """
+    Extract raw data from a file as an iterator of DataFrames.
+
+    Only ``chunksize`` rows are parsed and held in memory at a time, so
+    files larger than RAM can be streamed through the pipeline. Parquet
+    files are streamed by record batch; Feather / Arrow IPC files are
+    memory-mapped and sliced.
+
+    ``on_chunk(bytes_read)``, if given, is called after each chunk is parsed
+    with the current byte offset in the file (for progress reporting).
+    ``columns`` and ``filters`` work as in ``extract_data``; several input
+    files are read one after the other and the offset counts across them.
+    With ``optimize`` the text columns of every chunk get the types inferred
+    from the start of the first file; numerics are not downcast, so all
+    chunks keep the same dtypes. ``csv_options`` are the CSV reader options
+    of ``read_csv`` (chunks are always parsed by the C or Python parser).
+    """
+    if chunksize <= 0:
+        raise ValueError("chunksize must be a positive number of rows")
+
+    paths = expand_input(input_path)
+    columns = list(columns) if columns else None
+    schema = _sample_schema(paths[0], file_type, columns) if optimize else None
+
+    filters = [tuple(f) for f in filters] if filters else None
+    read_columns = _with_filter_columns(columns, filters)
+    csv_options = csv_options or {}
+
+    if len(paths) > 1:
+        chunks = _chain_chunks(paths, chunksize, on_chunk, file_type, read_columns, schema,
+                               csv_options)
+    else:
+        chunks = _file_chunks(paths[0], chunksize, on_chunk, file_type, read_columns, schema,
+                              csv_options)
+
+    if filters:
+        chunks = (chunk[_filter_mask(chunk, filters)] for chunk in chunks)
+    if read_columns != columns:
+        chunks = (chunk.drop(columns=read_columns[len(columns):]) for chunk in chunks)
+    if schema:
+        chunks = (apply_schema(chunk, schema) for chunk in chunks)
+    return chunks
+
+
+def _file_chunks(file_path, chunksize, on_chunk, file_type, columns, schema=None,
+                 csv_options=None):
+    file_path = Path(file_path)
+    file_type = detect_file_type(file_path, file_type)
+    dtype = reader_dtypes(schema) if schema else None
+
+    if file_type != "csv":
+        _require_pyarrow()
+        return _arrow_chunks(file_path, file_type, chunksize, on_chunk, columns)
+    elif on_chunk is None:
+        return read_csv(file_path, columns, dtype, chunksize=chunksize, **(csv_options or {}))
+    else:
+        return _chunks_with_offset(file_path, chunksize, on_chunk, columns, dtype, csv_options)
+
+
+def _chain_chunks(paths, chunksize, on_chunk, file_type, columns, schema, csv_options=None):
+    done = 0
+    for path in paths:
+        offset = None if on_chunk is None else (lambda n, base=done: on_chunk(base + n))
+        yield from _file_chunks(path, chunksize, offset, file_type, columns, schema, csv_options)
+        done += os.path.getsize(path)
+
+
+def _chunks_with_offset(file_path: Path, chunksize: int, on_chunk, columns=None, dtype=None,
+                        csv_options=None):
+    options = dict(csv_options or {}, memory_map=False, skipfooter=0)
+    with open_window(file_path, (csv_options or {}).get("skipfooter")) as f:
+        for chunk in read_csv(f, columns, dtype, chunksize=chunksize, **options):
+            on_chunk(f.tell())
+            yield chunk
+
+
+def _arrow_chunks(file_path: Path, file_type: str, chunksize: int, on_chunk, columns):
+    import pyarrow as pa
+
+    size = file_path.stat().st_size
+
+    if file_type == "parquet":
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(file_path, memory_map=True)
+        total_rows = parquet_file.metadata.num_rows
+        batches = parquet_file.iter_batches(batch_size=chunksize, columns=columns)
+    else:
+        source = pa.memory_map(str(file_path))
+        table = pa.ipc.open_file(source).read_all()
+        if columns:
+            table = table.select(columns)
+        total_rows = table.num_rows
+        batches = table.to_batches(max_chunksize=chunksize)
+
+    rows = 0
+    for batch in batches:
+        rows += batch.num_rows
+        if on_chunk is not None:
+            # byte offset is approximated from the share of rows read
+            on_chunk(size * rows // max(total_rows, 1))
+        yield batch.to_pandas()
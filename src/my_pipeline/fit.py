@@ -0,0 +1,385 @@
+"""
+Fit / apply engine for out-of-core runs.
+
+Steps such as mean imputation, scaling, outlier bounds and target encoding
+need statistics over the *whole* column. When the data is processed chunk
+by chunk, computing them per chunk gives wrong results, so a run is split
+in two phases:
+
+1. **fit** – stream the chunks through mergeable accumulators
+   (``stats.RunningStats``, ``stats.QuantileSketch``, ``stats.CategoryStats``,
+   ``encode.TargetStats``) and freeze the resulting per-column parameters;
+2. **apply** – stream the chunks again and hand the frozen parameters to
+   the step functions, which then compute nothing from the chunk itself.
+
+Each stateful step is fitted on the output of the steps before it (with
+their parameters already frozen), exactly as it would see the data in an
+in-memory run. Memory stays constant: only the accumulators are kept.
+"""
+
+import math
+
+from .transform import STAT_METHODS, column_methods_for, transform_data
+from .outliers import remove_outliers
+from .normalize import normalize_data
+from .encode import encode_categorical, onehot_levels, target_stats, text_labels
+from .stats import RunningStats, QuantileSketch, CategoryStats, sketch_k_for_error
+from .parallel import update_fit
+from .dtypes import numeric_columns, categorical_columns
+
+DEFAULT_SKETCH_K = 2048
+# (step, method) pairs whose statistics are quantiles
+QUANTILE_METHODS = {("transform", "median"), ("outliers", "iqr"), ("normalize", "robust")}
+
+# merged params each step reads (see ``apply_step``)
+STEP_PARAM_KEYS = {
+    "extract": ["file_type", "columns", "filters", "optimize_dtypes", "csv_engine",
+                "dtype_backend", "nrows", "skipfooter"],
+    "transform": ["missing_method", "fill_value", "missing_column_methods", "quantile_error"],
+    "outliers": ["outlier_method", "threshold", "outlier_sequential", "quantile_error"],
+    "normalize": ["normalize_method", "normalize_dtype", "quantile_error"],
+    "encode": ["encode_method", "target_column", "encode_sparse",
+               "encode_max_categories", "encode_n_features", "encode_smoothing",
+               "encode_folds"],
+}
+
+
+class MissingValueFit:
+    """
+    Fill values for the mean / median / mode imputation methods (the
+    column's ``column_methods`` override when it has one).
+    """
+
+    def __init__(self, method, sketch_k=DEFAULT_SKETCH_K, column_methods=None):
+        self.method = method
+        self.sketch_k = sketch_k
+        self.column_methods = column_methods
+        self.columns = {}
+
+    def update(self, df):
+        numeric = set(numeric_columns(df))
+        methods = column_methods_for(df.columns, self.method, self.column_methods)
+        for col, method in methods.items():
+            if col not in self.columns:
+                if method == "mode":
+                    self.columns[col] = CategoryStats()
+                elif method == "mean" and col in numeric:
+                    self.columns[col] = RunningStats()
+                elif method == "median" and col in numeric:
+                    self.columns[col] = QuantileSketch(self.sketch_k)
+                else:
+                    continue
+            acc = self.columns[col]
+            acc.update(df[col] if isinstance(acc, CategoryStats) else df[col].to_numpy())
+
+    def result(self):
+        fill_values = {}
+        for col, acc in self.columns.items():
+            if isinstance(acc, CategoryStats):
+                if acc.counts:
+                    fill_values[col] = acc.mode()
+            elif acc.count:
+                fill_values[col] = acc.mean if isinstance(acc, RunningStats) else acc.quantile(0.5)
+        return {"fill_values": fill_values}
+
+
+class OutlierFit:
+    """Per-column ``[lower, upper]`` bounds for IQR or z-score filtering."""
+
+    def __init__(self, method, threshold, sketch_k=DEFAULT_SKETCH_K):
+        if method not in ("iqr", "zscore"):
+            raise ValueError("Invalid method. Choose 'iqr' or 'zscore'.")
+        self.method = method
+        self.threshold = threshold if threshold is not None else (1.5 if method == "iqr" else 3.0)
+        self.sketch_k = sketch_k
+        self.columns = {}
+
+    def update(self, df):
+        for col in numeric_columns(df):
+            if col not in self.columns:
+                self.columns[col] = (QuantileSketch(self.sketch_k) if self.method == "iqr"
+                                     else RunningStats())
+            self.columns[col].update(df[col].to_numpy())
+
+    def result(self):
+        bounds = {}
+        for col, acc in self.columns.items():
+            if self.method == "iqr":
+                q1, q3 = acc.quantile(0.25), acc.quantile(0.75)
+                iqr = q3 - q1
+                bounds[col] = [q1 - self.threshold * iqr, q3 + self.threshold * iqr]
+            else:
+                std = acc.std()
+                if std == 0 or math.isnan(std):
+                    continue
+                bounds[col] = [acc.mean - self.threshold * std,
+                               acc.mean + self.threshold * std]
+        return {"bounds": bounds}
+
+
+class NormalizeFit:
+    """Per-column ``[center, scale]`` so that ``x' = (x - center) / scale``."""
+
+    def __init__(self, method, sketch_k=DEFAULT_SKETCH_K):
+        if method not in ("minmax", "zscore", "robust"):
+            raise ValueError("Invalid method. Choose 'minmax', 'zscore', or 'robust'.")
+        self.method = method
+        self.sketch_k = sketch_k
+        self.columns = {}
+
+    def update(self, df):
+        for col in numeric_columns(df):
+            if col not in self.columns:
+                self.columns[col] = (QuantileSketch(self.sketch_k) if self.method == "robust"
+                                     else RunningStats())
+            self.columns[col].update(df[col].to_numpy())
+
+    def result(self):
+        scaling = {}
+        for col, acc in self.columns.items():
+            if self.method == "minmax":
+                scaling[col] = [acc.min, acc.max - acc.min]
+            elif self.method == "zscore":
+                scaling[col] = [acc.mean, acc.std()]
+            else:
+                scaling[col] = [acc.quantile(0.5), acc.quantile(0.75) - acc.quantile(0.25)]
+        return {"scaling": scaling}
+
+
+class EncodeFit:
+    """Category lists (one-hot / label) or per-category target statistics."""
+
+    def __init__(self, method, target_column=None, max_categories=None,
+                 smoothing=0.0, folds=0):
+        if method not in ("onehot", "label", "target"):
+            raise ValueError("Invalid encoding method. Choose: onehot, label, target, hashing")
+        if method == "target" and target_column is None:
+            raise ValueError("Target encoding requires --target-column")
+        self.method = method
+        self.target_column = target_column
+        self.max_categories = max_categories
+        self.smoothing = smoothing or 0.0
+        self.folds = folds or 0
+        self.columns = {}
+
+    @property
+    def context_columns(self):
+        """Columns every partition needs besides its own (see ``parallel``)."""
+        return [self.target_column] if self.method == "target" else []
+
+    def update(self, df):
+        if self.method == "target":
+            if self.target_column not in df.columns:
+                raise ValueError(f"Target column '{self.target_column}' not found in DataFrame.")
+            stats = target_stats(df, categorical_columns(df), self.target_column, self.folds)
+            for col, acc in stats.items():
+                if col in self.columns:
+                    self.columns[col].merge(acc)
+                else:
+                    self.columns[col] = acc
+            return
+
+        for col in categorical_columns(df):
+            acc = self.columns.setdefault(col, CategoryStats())
+            values = text_labels(df[col])
+            if self.method == "label":
+                # labels are coded by their string form, NaN included (see ``label_codes``)
+                acc.update(values.astype(str))
+            else:
+                acc.update(values)
+
+    def result(self):
+        if self.method == "target":
+            fitted = {"mappings": {col: acc.encodings(self.smoothing)
+                                   for col, acc in self.columns.items()}}
+            if self.smoothing and self.columns:
+                # unseen categories of new data get the global mean
+                fitted["target_prior"] = next(iter(self.columns.values())).prior()
+            if self.folds > 1:
+                # only valid for the fitted rows themselves; not saved in artifacts
+                fitted["fold_stats"] = dict(self.columns)
+            return fitted
+        if self.method == "label":
+            # ``label_codes`` sorts missing values after every label
+            mappings = {col: sorted(acc.counts) + ([None] if acc.nulls else [])
+                        for col, acc in self.columns.items()}
+        else:
+            mappings = {col: onehot_levels(acc.counts, self.max_categories)
+                        for col, acc in self.columns.items()}
+        return {"mappings": mappings}
+
+
+def sketch_size(params: dict, default=DEFAULT_SKETCH_K):
+    """
+    Quantile sketch size for a run: sized for ``params["quantile_error"]``
+    (approximate quantiles, see ``stats.sketch_k_for_error``) when set,
+    otherwise ``default`` (``None``: exact).
+    """
+    error = params.get("quantile_error")
+    return sketch_k_for_error(error) if error else default
+
+
+def uses_quantiles(step: str, params: dict) -> bool:
+    """Whether ``step`` is fitted with quantiles under ``params``."""
+    method = {"transform": "missing_method", "outliers": "outlier_method",
+              "normalize": "normalize_method"}.get(step)
+    if step == "transform" and "median" in (params.get("missing_column_methods") or {}).values():
+        return True
+    return (step, params.get(method)) in QUANTILE_METHODS
+
+
+def make_fit(step: str, params: dict, sketch_k=DEFAULT_SKETCH_K):
+    """
+    Accumulator for ``step`` under ``params``, or ``None`` when the step
+    needs no global statistics (e.g. dropping rows or a constant fill).
+    """
+    if step == "transform":
+        column_methods = params.get("missing_column_methods") or {}
+        if {params["missing_method"], *column_methods.values()} & set(STAT_METHODS):
+            return MissingValueFit(params["missing_method"], sketch_k, column_methods)
+        return None
+    elif step == "outliers":
+        return OutlierFit(params["outlier_method"], params["threshold"], sketch_k)
+    elif step == "normalize":
+        return NormalizeFit(params["normalize_method"], sketch_k)
+    elif step == "encode":
+        if params["encode_method"] == "hashing":
+            return None
+        return EncodeFit(params["encode_method"], params["target_column"],
+                         params.get("encode_max_categories"),
+                         params.get("encode_smoothing"), params.get("encode_folds"))
+    return None
+
+
+def read_columns(steps, params: dict):
+    """
+    Columns to read for ``steps``: the ``columns`` projection (``None``:
+    all) plus the columns the steps refer to by name, i.e. the target of
+    target encoding. Every other step works on all columns of its type.
+    """
+    columns = params.get("columns")
+    if not columns:
+        return columns
+    needed = []
+    if "encode" in steps and params.get("encode_method") == "target" and params.get("target_column"):
+        needed.append(params["target_column"])
+    return list(dict.fromkeys([*columns, *needed]))
+
+
+def stateful_steps(steps, params: dict) -> list:
+    """Steps that need a fit pass under ``params`` (in execution order)."""
+    return [step for step in steps if make_fit(step, params) is not None]
+
+
+def apply_step(step: str, df, params: dict, state=None, inplace: bool = False):
+    """
+    Run a single DataFrame -> DataFrame step with the merged pipeline params.
+
+    ``state`` is the output of ``fit_pipeline``; when it holds an entry for
+    ``step`` the frozen parameters are used instead of statistics of ``df``.
+    ``inplace=True`` lets steps that support it modify ``df`` instead of
+    copying it; only pass it when the caller owns ``df``.
+    ``extract`` and ``load`` are handled by the caller.
+    """
+    fitted = (state or {}).get(step) or {}
+
+    if step == "transform":
+        return transform_data(df,
+                              method=params["missing_method"],
+                              fill_value=params["fill_value"],
+                              inplace=inplace,
+                              column_methods=params.get("missing_column_methods"),
+                              **fitted)
+    elif step == "outliers":
+        return remove_outliers(df,
+                               method=params["outlier_method"],
+                               threshold=params["threshold"],
+                               sequential=params.get("outlier_sequential", False),
+                               **fitted)
+    elif step == "normalize":
+        return normalize_data(df, method=params["normalize_method"],
+                              inplace=inplace,
+                              dtype=params.get("normalize_dtype") or "float64",
+                              **fitted)
+    elif step == "encode":
+        return encode_categorical(df,
+                                  method=params["encode_method"],
+                                  target_column=params["target_column"],
+                                  sparse=params.get("encode_sparse", False),
+                                  max_categories=params.get("encode_max_categories"),
+                                  n_features=params.get("encode_n_features") or 32,
+                                  smoothing=params.get("encode_smoothing") or 0.0,
+                                  folds=params.get("encode_folds") or 0,
+                                  **fitted)
+    else:
+        raise ValueError(f"Unknown pipeline step: {step}")
+
+
+def fit_frame(df, steps, params: dict, sketch_k=None, executor=None):
+    """
+    Fit every stateful step on an in-memory DataFrame.
+
+    Each step is fitted and then applied before the next one is fitted, so
+    the frame is transformed only once. Quantiles are exact by default.
+    With a process pool as ``executor`` (see ``parallel.column_pool``) the
+    columns are fitted in parallel.
+
+    Returns
+    -------
+    tuple
+        ``(state, transformed DataFrame)``.
+    """
+    state = {}
+
+    for step in steps:
+        if step in ("extract", "load"):
+            continue
+        fitter = make_fit(step, params, sketch_k)
+        if fitter is not None:
+            update_fit(fitter, df, executor)
+            state[step] = fitter.result()
+        df = apply_step(step, df, params, state)
+
+    return state, df
+
+
+def fit_pipeline(chunks, steps, params: dict, sketch_k=DEFAULT_SKETCH_K,
+                 executor=None) -> dict:
+    """
+    Fit every stateful step over a chunked input.
+
+    Parameters
+    ----------
+    chunks : callable
+        Returns a fresh iterator of DataFrames each time it is called; it is
+        called once per stateful step.
+    steps : list[str]
+        Pipeline steps in execution order.
+    params : dict
+        Merged pipeline params (see ``cli.merge_params``).
+    sketch_k : int or None
+        Size of the quantile sketches; ``None`` keeps every value (exact).
+    executor : ProcessPoolExecutor, optional
+        Fit the columns of each chunk in parallel (``parallel.update_fit``).
+
+    Returns
+    -------
+    dict
+        ``{step: fitted kwargs}`` to pass to ``apply_step``.
+    """
+    state = {}
+    runnable = [step for step in steps if step not in ("extract", "load")]
+
+    for i, step in enumerate(runnable):
+        fitter = make_fit(step, params, sketch_k)
+        if fitter is None:
+            continue
+
+        for chunk in chunks():
+            for previous in runnable[:i]:
+                chunk = apply_step(previous, chunk, params, state)
+            update_fit(fitter, chunk, executor)
+
+        state[step] = fitter.result()
+
+    return state
@@ -0,0 +1,228 @@
+"""
+Incremental runs over an append-only CSV input.
+
+The first run (and every refit) fits all steps on the whole file, writes
+the output and saves the fitted state as an artifact (see ``artifact``)
+with two extra entries:
+
+* ``watermark`` – byte offset and row count processed so far, a
+  checksum of the header and of the bytes just before the offset, and
+  the ``[extract]`` settings the rows were read with;
+* ``profile`` – per-column mean / std and known categories of the data the
+  state was fitted on, the reference for drift checks.
+
+Later runs check that the file still starts with what was processed, read
+only the bytes after the offset, transform them with the stored parameters
+and append them to the output. The whole file is refitted and the output
+rewritten only when asked to (``refit=True``), when the step or read
+settings, input or output changed, or when the new rows drift from the profile:
+a numeric mean moving more than ``drift_mean_shift`` standard deviations,
+or more than ``drift_unseen_share`` of a categorical column's new values
+never seen before.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from .artifact import STEP_PARAMS, load_artifact, save_artifact
+from .dtypes import categorical_columns, numeric_columns
+from .encode import text_labels
+from .extract import detect_file_type, expand_input, extract_appended
+from .fit import STEP_PARAM_KEYS, apply_step, fit_frame, sketch_size
+from .load import save_data
+from .partition import partitioned_output
+from .stream import can_chunk, input_options, output_options
+
+# bytes before the watermark that must be unchanged between runs
+CHECK_BYTES = 64 * 1024
+# categorical columns with more distinct values are not tracked for drift
+MAX_TRACKED_CATEGORIES = 10_000
+
+DEFAULT_MEAN_SHIFT = 0.5
+DEFAULT_UNSEEN_SHARE = 0.05
+
+
+def state_path(params: dict) -> Path:
+    """Where the watermark and fitted state of incremental runs are kept."""
+    if params.get("incremental_state"):
+        return Path(params["incremental_state"])
+    output_path = Path(params["output_path"])
+    return output_path.with_name(output_path.name + ".state.json")
+
+
+def check_incremental(params: dict, steps) -> str:
+    """Why ``steps`` cannot run incrementally under ``params`` (``None`` if they can)."""
+    if "load" not in steps:
+        return "incremental runs append to the output: add a load step"
+    if len(expand_input(params["input_path"])) > 1 or detect_file_type(
+            params["input_path"], params.get("file_type")) != "csv":
+        return "incremental runs need a single CSV input file"
+    if partitioned_output(params["output_path"]) or detect_file_type(
+            params["output_path"], params.get("save_format")) != "csv":
+        return "incremental runs append to a single CSV output file"
+    if not can_chunk(params, steps):
+        return "ffill / bfill need the neighbouring rows of earlier runs"
+    return None
+
+
+def _checksum(input_path, offset: int) -> str:
+    with open(input_path, "rb") as f:
+        head = f.readline()
+        start = max(len(head), offset - CHECK_BYTES)
+        f.seek(start)
+        tail = f.read(max(offset - start, 0))
+    return hashlib.sha256(head + tail).hexdigest()
+
+
+def read_settings(params: dict) -> dict:
+    """The ``[extract]`` settings in ``params``, as they read back from JSON."""
+    return json.loads(json.dumps({key: params.get(key) for key in STEP_PARAM_KEYS["extract"]}))
+
+
+def input_watermark(input_path, offset: int, rows: int, params: dict) -> dict:
+    """Watermark of ``input_path`` processed up to byte ``offset`` with ``params``."""
+    return {
+        "input_path": str(input_path),
+        "offset": offset,
+        "rows": rows,
+        "checksum": _checksum(input_path, offset),
+        "read": read_settings(params),
+    }
+
+
+def data_profile(df: pd.DataFrame) -> dict:
+    """Reference statistics for ``drift``."""
+    numeric = {}
+    for col in numeric_columns(df):
+        values = df[col].astype("float64")
+        if values.notna().any():
+            numeric[col] = [float(values.mean()), float(values.std(ddof=0))]
+    categories = {}
+    for col in categorical_columns(df):
+        known = text_labels(df[col]).dropna().unique()
+        if len(known) <= MAX_TRACKED_CATEGORIES:
+            categories[col] = sorted(str(value) for value in known)
+    return {"numeric": numeric, "categories": categories}
+
+
+def drift(profile: dict, df: pd.DataFrame, mean_shift=DEFAULT_MEAN_SHIFT,
+          unseen_share=DEFAULT_UNSEEN_SHARE) -> list:
+    """Reasons why the new rows ``df`` differ from ``profile`` (empty: no drift)."""
+    reasons = []
+    for col, (mean, std) in profile["numeric"].items():
+        if col not in df.columns or not df[col].notna().any():
+            continue
+        new_mean = float(pd.to_numeric(df[col], errors="coerce").mean())
+        if std > 0:
+            shift = abs(new_mean - mean) / std
+        else:
+            shift = 0.0 if new_mean == mean else float("inf")
+        if shift > mean_shift:
+            reasons.append(f"{col} mean moved {shift:.2f} std")
+    for col, known in profile["categories"].items():
+        if col not in df.columns:
+            continue
+        values = text_labels(df[col]).dropna().astype(str)
+        if values.empty:
+            continue
+        share = float((~values.isin(known)).mean())
+        if share > unseen_share:
+            reasons.append(f"{share:.0%} of {col} values are new")
+    return reasons
+
+
+def _stale_reason(artifact, params: dict, steps) -> str:
+    """Why the stored state cannot be extended (``None`` if it can)."""
+    if artifact is None:
+        return "no previous run"
+    if artifact["steps"] != list(steps) or artifact["params"] != {
+            key: params.get(key) for key in STEP_PARAMS}:
+        return "step settings changed"
+    watermark = artifact["watermark"]
+    if watermark["input_path"] != str(params["input_path"]):
+        return "input changed"
+    if watermark.get("read") != read_settings(params):
+        # other columns, filters or parsing would not match the rows written
+        return "read settings changed"
+    if not Path(params["output_path"]).exists():
+        return "output missing"
+    if (os.path.getsize(params["input_path"]) < watermark["offset"]
+            or _checksum(params["input_path"], watermark["offset"]) != watermark["checksum"]):
+        return "input was rewritten"
+    return None
+
+
+def _full_run(params: dict, steps, path: Path, reason: str, executor=None) -> dict:
+    df, end = extract_appended(params["input_path"], 0, **input_options(params))
+    rows_in = len(df)
+    profile = data_profile(df)
+    state, df = fit_frame(df, steps, params, sketch_k=sketch_size(params, None),
+                          executor=executor)
+    save_data(df, params["output_path"], **output_options(params))
+    save_artifact(state, steps, params, path, extra={
+        "watermark": input_watermark(params["input_path"], end, rows_in, params),
+        "profile": profile,
+    })
+    return {"mode": "full", "reason": reason, "rows_in": rows_in, "rows_out": len(df)}
+
+
+def run_incremental(params: dict, steps, refit: bool = False, executor=None) -> dict:
+    """
+    Process the rows appended to ``params["input_path"]`` since the last run.
+
+    Parameters
+    ----------
+    params : dict
+        Merged pipeline params (see ``cli.merge_params``); reads
+        ``incremental_state``, ``drift_mean_shift`` and ``drift_unseen_share``.
+    steps : list[str]
+        Pipeline steps; must end up in a CSV ``load`` (see ``check_incremental``).
+    refit : bool
+        Refit on the whole file and rewrite the output regardless.
+    executor : ProcessPoolExecutor, optional
+        Column-parallel fitting for full runs (see ``parallel.column_pool``).
+
+    Returns
+    -------
+    dict
+        ``mode`` ("full", "append" or "up-to-date"), ``reason`` of a full
+        run, ``rows_in`` and ``rows_out``.
+    """
+    problem = check_incremental(params, steps)
+    if problem:
+        raise ValueError(problem)
+
+    path = state_path(params)
+    artifact = load_artifact(path) if path.exists() and not refit else None
+    reason = "refit requested" if refit else _stale_reason(artifact, params, steps)
+    if reason is not None:
+        return _full_run(params, steps, path, reason, executor)
+
+    watermark = artifact["watermark"]
+    df, end = extract_appended(params["input_path"], watermark["offset"],
+                               **input_options(params))
+    if end == watermark["offset"]:
+        return {"mode": "up-to-date", "reason": None, "rows_in": 0, "rows_out": 0}
+
+    reasons = drift(artifact["profile"], df,
+                    params.get("drift_mean_shift", DEFAULT_MEAN_SHIFT),
+                    params.get("drift_unseen_share", DEFAULT_UNSEEN_SHARE))
+    if reasons:
+        return _full_run(params, steps, path, "drift: " + "; ".join(reasons), executor)
+
+    rows_in = len(df)
+    for step in steps:
+        if step not in ("extract", "load"):
+            df = apply_step(step, df, params, artifact["state"], inplace=True)
+    save_data(df, params["output_path"], append=True, **output_options(params))
+
+    save_artifact(artifact["state"], steps, params, path, extra={
+        "watermark": input_watermark(params["input_path"], end, watermark["rows"] + rows_in,
+                                     params),
+        "profile": artifact["profile"],
+    })
+    return {"mode": "append", "reason": None, "rows_in": rows_in, "rows_out": len(df)}
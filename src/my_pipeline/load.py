@@ -1,9 +1,327 @@
+"""
+Output writers.
+
+``ChunkWriter`` writes a sequence of DataFrames to one output file. Each
+chunk is serialized on the calling thread while a background thread
+compresses and writes the previous ones, so formatting overlaps with disk
+I/O (and, in streaming runs, with the steps computing the next chunk).
+
+* **CSV** chunks are formatted by pandas (default) or by the Arrow CSV
+  writer (``csv_engine="pyarrow"``, several times faster; text is quoted,
+  booleans are written as ``true`` / ``false`` and integral floats without
+  ``.0``), optionally rounded to ``float_precision`` decimals and
+  compressed with gzip, bz2, xz or zstd (zstd needs ``zstandard``);
+* **Parquet** chunks become row groups and **Feather / Arrow IPC** chunks
+  record batches of one file. The first chunk fixes the schema; later
+  chunks are cast to it, so every chunk ends up with the same types.
+
+A new file is written under a temporary name next to the destination and
+renamed over it on ``close``: a crash never leaves a truncated output. An
+appending writer (CSV only) adds to the existing file and cuts it back to
+its old size when writing fails.
+"""
+
+import bz2
+import gzip
+import lzma
+import os
+import queue
+import threading
+import uuid
 from pathlib import Path
+
 import pandas as pd
 
-def save_data(df: pd.DataFrame, output_path: str) -> None:
-    """Load processed data to CSV output."""
-    output_path = Path(output_path)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
+from .extract import detect_file_type, _require_pyarrow
+
+# rows serialized per chunk by ``save_data``
+DEFAULT_CHUNK_ROWS = 100_000
+# serialized chunks waiting for the writer thread
+DEFAULT_QUEUE_SIZE = 4
+
+CSV_ENGINES = ("pandas", "pyarrow")
+CSV_COMPRESSIONS = ("gzip", "bz2", "xz", "zstd")
+
+_DONE = object()
+
+
+def _require_zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("zstd compressed CSV output needs zstandard: pip install zstandard") from e
+    return zstandard
+
+
+def _compressed(raw, compression):
+    """File object compressing into ``raw`` (closing it leaves ``raw`` open)."""
+    if compression is None:
+        return raw
+    if compression == "gzip":
+        # zlib's default level: most of the size of level 9 at a fraction of the time
+        return gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6)
+    if compression == "bz2":
+        return bz2.BZ2File(raw, mode="wb")
+    if compression == "xz":
+        return lzma.LZMAFile(raw, mode="wb")
+    return _require_zstandard().ZstdCompressor().stream_writer(raw, closefd=False)
+
+
+def _dense(df: pd.DataFrame) -> pd.DataFrame:
+    """Arrow has no sparse column type: sparse dummies become dense ``uint8``."""
+    sparse_cols = [col for col, dtype in df.dtypes.items() if isinstance(dtype, pd.SparseDtype)]
+    if sparse_cols:
+        df = df.copy(deep=False)
+        for col in sparse_cols:
+            df[col] = df[col].sparse.to_dense().astype("uint8")
+    return df
+
+
+class ChunkWriter:
+    """
+    Write DataFrames chunk by chunk to one CSV, Parquet, Feather or Arrow
+    IPC file (see the module docstring).
+
+    Parameters
+    ----------
+    output_path : str or Path
+        Destination file; its directory is created.
+    save_format : str, optional
+        "csv", "parquet", "feather" or "arrow"; detected from the extension
+        when omitted or "auto".
+    compression : str, optional
+        "gzip", "bz2", "xz" or "zstd" for CSV; "snappy" (default) / "zstd"
+        / ... for Parquet; "lz4" (default) / "zstd" for Feather and Arrow IPC.
+    float_precision : int, optional
+        Round float columns of CSV output to this many decimals.
+    csv_engine : str
+        CSV formatter: "pandas" (default) or "pyarrow".
+    append : bool
+        Add to the end of an existing CSV file (without repeating its
+        header) instead of replacing the file.
+    queue_size : int
+        Serialized chunks that may wait for the writer thread; ``write``
+        blocks when they are all taken.
+
+    Use as a context manager, or call ``close`` (``abort`` on failure)::
+
+        with ChunkWriter("out.parquet") as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+    """
+
+    def __init__(self, output_path, save_format: str = None, compression: str = None,
+                 float_precision: int = None, csv_engine: str = "pandas",
+                 append: bool = False, queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.output_path = Path(output_path)
+        self.save_format = detect_file_type(self.output_path, save_format)
+        self.compression = compression
+        self.float_precision = float_precision
+        self.csv_engine = csv_engine or "pandas"
+        self.append = append
+        self.rows = 0
+
+        if self.save_format == "csv":
+            if compression is not None and compression not in CSV_COMPRESSIONS:
+                raise ValueError(f"Unsupported CSV compression '{compression}'. "
+                                 f"Choose: {', '.join(CSV_COMPRESSIONS)}")
+            if self.csv_engine not in CSV_ENGINES:
+                raise ValueError(f"Invalid CSV engine '{csv_engine}'. Choose: {', '.join(CSV_ENGINES)}")
+            if compression == "zstd":
+                _require_zstandard()
+        elif append:
+            raise ValueError(f"Appending is only supported for CSV output, not {self.save_format}")
+        if self.save_format != "csv" or self.csv_engine == "pyarrow":
+            _require_pyarrow()
+
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        if append:
+            self._existed = self.output_path.exists()
+            self._start_size = self.output_path.stat().st_size if self._existed else 0
+            self._path = self.output_path
+        else:
+            # same directory, so the final rename stays on one file system
+            self._path = self.output_path.with_name(
+                f".{self.output_path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        self._header = not (append and self._start_size)
+
+        self._schema = None
+        self._sink = None
+        self._raw = None
+        self._error = None
+        self._closed = False
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._drain, name="ChunkWriter", daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, df: pd.DataFrame) -> None:
+        """Serialize ``df`` and queue it for the writer thread."""
+        if self._closed:
+            raise ValueError("write to a closed ChunkWriter")
+        self._raise_error()
+        payload = self._serialize(df)
+        self._queue.put(payload)
+        self.rows += len(df)
+
+    def close(self) -> None:
+        """Write everything queued and move the file into place."""
+        if self._closed:
+            return
+        self._stop()
+        if self._error is not None:
+            self._discard()
+            self._raise_error()
+        if not self.append:
+            os.replace(self._path, self.output_path)
+
+    def abort(self) -> None:
+        """Stop writing and leave the destination as it was."""
+        if self._closed:
+            return
+        self._stop()
+        self._discard()
+
+    # ---- calling thread -------------------------------------------------
+
+    def _serialize(self, df: pd.DataFrame):
+        if self.save_format != "csv":
+            import pyarrow as pa
+            table = pa.Table.from_pandas(_dense(df), preserve_index=False)
+            if self._schema is None:
+                self._schema = table.schema
+            elif not table.schema.equals(self._schema, check_metadata=False):
+                try:
+                    table = table.cast(self._schema)
+                except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError) as e:
+                    raise ValueError(f"Chunk does not match the schema of the first chunk "
+                                     f"written to {self.output_path}: {e}") from e
+            return table
+
+        if self.float_precision is not None:
+            floats = df.select_dtypes(include="floating").columns
+            if len(floats):
+                df = df.copy(deep=False)
+                df[floats] = df[floats].round(self.float_precision)
+        header, self._header = self._header, False
+        if self.csv_engine == "pyarrow":
+            import pyarrow as pa
+            return pa.Table.from_pandas(_dense(df), preserve_index=False), header
+        return df.to_csv(index=False, header=header).encode()
+
+    # ---- writer thread --------------------------------------------------
+
+    def _drain(self):
+        payload = None
+        try:
+            while (payload := self._queue.get()) is not _DONE:
+                self._write_payload(payload)
+            self._finish()
+        except BaseException as e:
+            self._error = e
+            self._close_files()
+            # keep taking chunks so ``write`` does not block forever
+            while payload is not _DONE:
+                payload = self._queue.get()
+
+    def _open_csv(self):
+        self._raw = open(self._path, "ab" if self.append else "wb")
+        self._sink = _compressed(self._raw, self.compression)
+
+    def _write_payload(self, payload):
+        if self.save_format == "csv":
+            if self._sink is None:
+                self._open_csv()
+            if self.csv_engine == "pyarrow":
+                import pyarrow.csv as pacsv
+                table, header = payload
+                pacsv.write_csv(table, self._sink, pacsv.WriteOptions(include_header=header))
+            else:
+                self._sink.write(payload)
+        elif self.save_format == "parquet":
+            if self._sink is None:
+                import pyarrow.parquet as pq
+                self._sink = pq.ParquetWriter(self._path, payload.schema,
+                                              compression=self.compression or "snappy")
+            self._sink.write_table(payload)
+        else:
+            if self._sink is None:
+                import pyarrow as pa
+                compression = self.compression or ("lz4" if pa.Codec.is_available("lz4_frame") else None)
+                options = pa.ipc.IpcWriteOptions(compression=compression)
+                self._sink = pa.ipc.new_file(str(self._path), payload.schema, options=options)
+            self._sink.write_table(payload)
+
+    def _finish(self):
+        if self._sink is None:
+            # nothing was written: an empty CSV, or a table without columns
+            if self.save_format == "csv":
+                self._open_csv()
+            else:
+                import pyarrow as pa
+                self._write_payload(pa.table({}))
+        if self._sink is not self._raw:
+            self._sink.close()
+        if self._raw is not None:
+            self._raw.flush()
+            os.fsync(self._raw.fileno())
+            self._raw.close()
+
+    def _close_files(self):
+        for handle in (self._sink, self._raw):
+            try:
+                if handle is not None:
+                    handle.close()
+            except Exception:
+                pass
+
+    # ---- shared ---------------------------------------------------------
+
+    def _stop(self):
+        self._closed = True
+        self._queue.put(_DONE)
+        self._thread.join()
+
+    def _discard(self):
+        if not self.append:
+            self._path.unlink(missing_ok=True)
+        elif self._existed:
+            os.truncate(self._path, self._start_size)
+        else:
+            self._path.unlink(missing_ok=True)
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
+
+
+def save_data(df: pd.DataFrame, output_path: str, append: bool = False,
+              save_format: str = None, compression: str = None,
+              float_precision: int = None, csv_engine: str = "pandas",
+              chunk_rows: int = DEFAULT_CHUNK_ROWS) -> None:
+    """
+    Load processed data to CSV, Parquet, Feather or Arrow IPC output.
+
+    With ``append=True`` the rows are added to the end of an existing file
+    without repeating the header (CSV only). Otherwise the file is written
+    under a temporary name and renamed into place when complete.
 
-    df.to_csv(output_path, index=False)
+    ``save_format`` is detected from the extension when omitted or "auto".
+    ``compression``, ``float_precision`` and ``csv_engine`` are described
+    in ``ChunkWriter``; ``df`` is serialized ``chunk_rows`` rows at a time
+    while earlier chunks are written.
+    """
+    chunk_rows = max(int(chunk_rows or DEFAULT_CHUNK_ROWS), 1)
+    with ChunkWriter(output_path, save_format=save_format, compression=compression,
+                     float_precision=float_precision, csv_engine=csv_engine,
+                     append=append) as writer:
+        for start in range(0, max(len(df), 1), chunk_rows):
+            writer.write(df.iloc[start:start + chunk_rows])
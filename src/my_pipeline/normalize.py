@@ -1,16 +1,54 @@
 
+import numpy as np
 import pandas as pd
 
-def normalize_data(df: pd.DataFrame, method: str = "minmax") -> pd.DataFrame:
+from .dtypes import numeric_columns
+from .logger import step_logger
+
+logger = step_logger("normalize")
+
+def scaling_stats(values: np.ndarray, method: str):
+    """
+    ``(center, scale)`` of every column of the 2-D float array ``values``
+    for ``method``, NaN skipped. Zero scales are left for the caller.
+    """
+    if method == "minmax":
+        center = np.nanmin(values, axis=0)
+        scale = np.nanmax(values, axis=0) - center
+    elif method == "zscore":
+        center = np.nanmean(values, axis=0)
+        scale = np.nanstd(values, axis=0, ddof=1)
+    else:
+        q1, center, q3 = np.nanquantile(values, [0.25, 0.5, 0.75], axis=0)
+        scale = q3 - q1
+    return center, scale
+
+
+def normalize_data(df: pd.DataFrame, method: str = "minmax", scaling=None,
+                   inplace: bool = False, dtype: str = "float64") -> pd.DataFrame:
     """
     Normalize numerical columns in a DataFrame.
 
+    All numeric columns (any int / uint / float width) are read as one 2-D
+    block; their statistics come from a single reduction per statistic and
+    the scaling is applied as one broadcast ``(x - center) / scale``.
+    Columns with zero range, zero variance or zero IQR get ``scale = 1``
+    (as scikit-learn does) so they never turn into inf or NaN.
+
     Parameters
     ----------
     df : DataFrame
         Input data.
     method : str
         Options: "minmax", "zscore", "robust".
+    scaling : dict, optional
+        Pre-computed ``{column: [center, scale]}`` parameters (from
+        ``fit.fit_pipeline``); each column becomes ``(x - center) / scale``.
+    inplace : bool
+        Overwrite the numeric columns of ``df`` itself instead of returning
+        a new frame.
+    dtype : str
+        "float64" (default) or "float32" to halve the memory of the output.
 
     Returns
     -------
@@ -18,32 +56,43 @@ def normalize_data(df: pd.DataFrame, method: str = "minmax") -> pd.DataFrame:
         Normalized DataFrame (not saved to disk).
     """
 
-    numeric_cols = df.select_dtypes(include=["int64", "float64"]).columns
+    if method not in ("minmax", "zscore", "robust"):
+        raise ValueError("Invalid method. Choose 'minmax', 'zscore', or 'robust'.")
 
-    if len(numeric_cols) == 0:
-        print("⚠ No numeric columns found to normalize.")
-        return df
+    if scaling is not None:
+        logger.info(f"Applying fitted {method} scaling...")
+        numeric_cols = [col for col in scaling if col in df.columns]
+        center = np.array([scaling[col][0] for col in numeric_cols], dtype="float64")
+        scale = np.array([scaling[col][1] for col in numeric_cols], dtype="float64")
+        values = df[numeric_cols].to_numpy(dtype="float64")
 
-    df_norm = df.copy()
+    else:
+        numeric_cols = numeric_columns(df)
 
-    if method == "minmax":
-        print("Applying Min-Max Normalization...")
-        for col in numeric_cols:
-            df_norm[col] = (df[col] - df[col].min()) / (df[col].max() - df[col].min())
+        if len(numeric_cols) == 0:
+            logger.warning("No numeric columns found to normalize.")
+            return df
+        if df.empty:
+            return df
 
-    elif method == "zscore":
-        print("Applying Z-score Standardization...")
-        for col in numeric_cols:
-            df_norm[col] = (df[col] - df[col].mean()) / df[col].std()
+        values = df[numeric_cols].to_numpy(dtype="float64")
 
-    elif method == "robust":
-        print("Applying Robust Scaling (less sensitive to outliers)...")
-        for col in numeric_cols:
-            median = df[col].median()
-            iqr = df[col].quantile(0.75) - df[col].quantile(0.25)
-            df_norm[col] = (df[col] - median) / iqr
+        if method == "minmax":
+            logger.info("Applying Min-Max Normalization...")
+        elif method == "zscore":
+            logger.info("Applying Z-score Standardization...")
+        else:
+            logger.info("Applying Robust Scaling (less sensitive to outliers)...")
+        center, scale = scaling_stats(values, method)
 
-    else:
-        raise ValueError("Invalid method. Choose 'minmax', 'zscore', or 'robust'.")
+    scale = np.where((scale == 0) | np.isnan(scale), 1.0, scale)
+
+    # ``values`` may be a view of ``df``'s data, so don't scale it in place
+    scaled = (values - center) / scale
+    if dtype != "float64":
+        scaled = scaled.astype(dtype)
 
+    # shallow copy: untouched columns keep sharing their data with ``df``
+    df_norm = df if inplace else df.copy(deep=False)
+    df_norm[numeric_cols] = scaled
     return df_norm
@@ -2,18 +2,37 @@
 import pandas as pd
 import numpy as np
 
-def remove_outliers(df: pd.DataFrame, method: str = "iqr", threshold: float = 3.0) -> pd.DataFrame:
+from .dtypes import numeric_columns
+from .logger import step_logger
+
+logger = step_logger("outliers")
+
+def remove_outliers(df: pd.DataFrame, method: str = "iqr", threshold: float = None,
+                    bounds=None, sequential: bool = False) -> pd.DataFrame:
     """
     Remove outliers from numerical columns using IQR or Z-score.
 
+    By default the bounds of every numeric column are computed in one
+    batched reduction over the same input, the per-column checks are ANDed
+    into a single row mask and the result is materialized once, so the
+    output does not depend on column order.
+
     Parameters
     ----------
     df : DataFrame
         Input data.
     method : str
         "iqr" or "zscore".
-    z_threshold : float
-        Threshold for z-score filtering.
+    threshold : float, optional
+        IQR multiplier (rows outside ``[Q1 - t*IQR, Q3 + t*IQR]`` are
+        dropped) or z-score limit. Defaults to 1.5 for IQR, 3.0 for z-score.
+    bounds : dict, optional
+        Pre-computed ``{column: [lower, upper]}`` limits (from
+        ``fit.fit_pipeline``). When given, rows outside any column's limits
+        are dropped and no statistics are computed from ``df``.
+    sequential : bool
+        Legacy behaviour: filter column by column, recomputing each
+        column's statistics on the rows that survived the previous columns.
 
     Returns
     -------
@@ -21,21 +40,68 @@ def remove_outliers(df: pd.DataFrame, method: str = "iqr", threshold: float = 3.
         DataFrame with outliers removed.
     """
 
-    numeric_cols = df.select_dtypes(include=["int64", "float64"]).columns
+    if bounds is not None:
+        logger.info(f"Applying fitted {method} outlier bounds...")
+        cols = [col for col in bounds if col in df.columns]
+        lower = np.array([bounds[col][0] for col in cols], dtype="float64")
+        upper = np.array([bounds[col][1] for col in cols], dtype="float64")
+        return df[_within(df[cols].to_numpy(dtype="float64"), lower, upper)]
+
+    if method not in ("iqr", "zscore"):
+        raise ValueError("Invalid method. Choose 'iqr' or 'zscore'.")
+    if threshold is None:
+        threshold = 1.5 if method == "iqr" else 3.0
+
+    numeric_cols = numeric_columns(df)
+
+    if sequential:
+        return _remove_outliers_sequential(df, numeric_cols, method, threshold)
+
+    if len(numeric_cols) == 0 or df.empty:
+        return df
+
+    values = df[numeric_cols].to_numpy(dtype="float64")
+
+    if method == "iqr":
+        logger.info("Applying IQR outlier removal...")
+        q1, q3 = np.nanquantile(values, [0.25, 0.75], axis=0)
+        iqr = q3 - q1
+        lower = q1 - threshold * iqr
+        upper = q3 + threshold * iqr
+
+    else:
+        logger.info("Applying Z-score outlier removal...")
+        mean = np.nanmean(values, axis=0)
+        std = np.nanstd(values, axis=0, ddof=1)
+        # constant columns carry no outliers and are left out of the mask
+        keep = std != 0
+        values, mean, std = values[:, keep], mean[keep], std[keep]
+        lower = mean - threshold * std
+        upper = mean + threshold * std
+
+    return df[_within(values, lower, upper)]
+
+
+def _within(values: np.ndarray, lower: np.ndarray, upper: np.ndarray) -> np.ndarray:
+    """Row mask: every column inside its bounds (NaN counts as outside)."""
+    return ((values >= lower) & (values <= upper)).all(axis=1)
+
+
+def _remove_outliers_sequential(df, numeric_cols, method, threshold):
     df_clean = df.copy()
 
     if method == "iqr":
-        print("Applying IQR outlier removal...")
+        logger.info("Applying IQR outlier removal (sequential)...")
         for col in numeric_cols:
             Q1 = df_clean[col].quantile(0.25)
             Q3 = df_clean[col].quantile(0.75)
             IQR = Q3 - Q1
-            lower = Q1 - 1.5 * IQR
-            upper = Q3 + 1.5 * IQR
+            lower = Q1 - threshold * IQR
+            upper = Q3 + threshold * IQR
             df_clean = df_clean[(df_clean[col] >= lower) & (df_clean[col] <= upper)]
 
-    elif method == "zscore":
-        print("Applying Z-score outlier removal...")
+    else:
+        logger.info("Applying Z-score outlier removal (sequential)...")
         for col in numeric_cols:
             col_mean = df_clean[col].mean()
             col_std = df_clean[col].std()
@@ -44,7 +110,4 @@ def remove_outliers(df: pd.DataFrame, method: str = "iqr", threshold: float = 3.
             z_scores = (df_clean[col] - col_mean) / col_std
             df_clean = df_clean[z_scores.abs() <= threshold]
 
-    else:
-        raise ValueError("Invalid method. Choose 'iqr' or 'zscore'.")
-
     return df_clean
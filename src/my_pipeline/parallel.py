@@ -0,0 +1,144 @@
+"""
+Column-parallel fitting.
+
+The statistics behind the stateful steps (quantile sketches, running
+moments, category counts, target-encoding group sums) are computed
+independently for every column. ``update_fit`` splits the columns of a
+DataFrame across a process pool, runs the step's accumulator on each part
+and merges the per-column results back in column order, so the fitted
+state is the same whatever the number of workers.
+
+Numeric columns are copied once into a shared-memory block that the
+workers map directly; only the (small) accumulators travel back through
+pickling. Text / categorical columns cannot live in a flat buffer and are
+sent to the worker that owns them.
+"""
+
+import copy
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+
+def resolve_workers(workers) -> int:
+    """``None`` / 1 -> serial, 0 -> one worker per CPU."""
+    if workers is None:
+        return 1
+    if workers == 0:
+        return os.cpu_count() or 1
+    return max(1, int(workers))
+
+
+class ColumnPool(ProcessPoolExecutor):
+    """Process pool that records its number of ``workers``."""
+
+    def __init__(self, workers: int):
+        super().__init__(max_workers=workers)
+        self.workers = workers
+
+
+def column_pool(workers):
+    """
+    Context manager yielding a process pool (``ColumnPool``) for
+    ``update_fit``, or ``None`` (serial) when a single worker is requested.
+    """
+    workers = resolve_workers(workers)
+    if workers <= 1:
+        return nullcontext(None)
+    return ColumnPool(workers)
+
+
+def _shareable(series: pd.Series) -> bool:
+    dtype = series.dtype
+    return isinstance(dtype, np.dtype) and dtype.kind in "biuf"
+
+
+def update_fit(fitter, df: pd.DataFrame, executor=None):
+    """
+    ``fitter.update(df)``, with the columns spread across ``executor``
+    (a ``column_pool``; other executors get one part per CPU).
+
+    ``fitter`` is any of the ``fit`` accumulators (``MissingValueFit``,
+    ``OutlierFit``, ``NormalizeFit``, ``EncodeFit``): they keep one
+    mergeable accumulator per column in ``fitter.columns``. Columns listed
+    in ``fitter.context_columns`` (e.g. the target of target encoding) are
+    passed to every worker.
+    """
+    if executor is None or df.shape[1] < 2 or df.empty:
+        fitter.update(df)
+        return fitter
+
+    context = [col for col in getattr(fitter, "context_columns", []) if col in df.columns]
+    fitted = [col for col in df.columns if col not in context]
+    n_parts = min(getattr(executor, "workers", None) or resolve_workers(0), len(fitted))
+    parts = [fitted[i::n_parts] for i in range(n_parts)]
+
+    # one shared block with every numeric column at its own offset
+    specs, offset = {}, 0
+    for col in df.columns:
+        if _shareable(df[col]):
+            dtype = df[col].dtype
+            offset = -(-offset // dtype.itemsize) * dtype.itemsize
+            specs[col] = (offset, dtype.str, len(df))
+            offset += dtype.itemsize * len(df)
+
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1)) if specs else None
+    try:
+        for col, (start, dtype, length) in specs.items():
+            np.ndarray(length, dtype, buffer=shm.buf, offset=start)[:] = df[col].to_numpy()
+
+        blank = copy.copy(fitter)
+        blank.columns = {}
+        futures = []
+        for part in parts:
+            columns = part + context
+            shared = {col: specs[col] for col in columns if col in specs}
+            pickled = {col: df[col].reset_index(drop=True) for col in columns if col not in specs}
+            futures.append(executor.submit(_update_columns, blank, shm and shm.name,
+                                           columns, shared, pickled))
+        partial = {}
+        for future in futures:
+            partial.update(future.result())
+    finally:
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+    # merge in column order so the result does not depend on the partitioning
+    return merge_accumulators(fitter, partial, df.columns)
+
+
+def merge_accumulators(fitter, partial: dict, columns=None):
+    """
+    Merge per-column accumulators ``{column: accumulator}`` computed on
+    another part of the data into ``fitter.columns``, in ``columns`` order.
+    """
+    for col in (partial if columns is None else columns):
+        if col not in partial:
+            continue
+        if col in fitter.columns:
+            fitter.columns[col].merge(partial[col])
+        else:
+            fitter.columns[col] = partial[col]
+    return fitter
+
+
+def _update_columns(fitter, shm_name, columns, shared, pickled):
+    """Worker: run ``fitter`` on the given columns and return its accumulators."""
+    shm = shared_memory.SharedMemory(name=shm_name) if shared else None
+    try:
+        data = {
+            col: pickled[col] if col in pickled
+            else np.ndarray(shared[col][2], shared[col][1], buffer=shm.buf, offset=shared[col][0])
+            for col in columns
+        }
+        fitter.update(pd.DataFrame(data, columns=columns, copy=False))
+        del data
+        return fitter.columns
+    finally:
+        if shm is not None:
+            shm.close()
@@ -0,0 +1,192 @@
+"""
+Row-partitioned execution for multi-file inputs.
+
+When ``input_path`` is a directory or a glob matching several shards,
+every shard is a partition: a worker process parses it, runs the pipeline
+steps on it and writes it out, so shards are processed side by side and
+only the small fitted state travels between processes.
+
+Global statistics are fitted first with one parallel pass over the shards
+per stateful step: each worker returns the mergeable accumulators of its
+shard and they are merged in path order. Forward / backward fill carry
+values across rows and cannot be split by shard; those runs go through
+the in-memory path instead (see ``can_partition``).
+"""
+
+import collections
+import contextlib
+from itertools import repeat
+from pathlib import Path
+
+from .extract import detect_file_type, expand_input, extract_data
+from .fit import DEFAULT_SKETCH_K, apply_step, make_fit, sketch_size, stateful_steps
+from .load import ChunkWriter, save_data
+from .parallel import column_pool, merge_accumulators
+from .stream import can_chunk, input_options, output_options
+
+PART_SUFFIXES = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather", "arrow": ".arrow"}
+
+
+def can_partition(params: dict, steps) -> bool:
+    """Whether every step gives the same result when run shard by shard."""
+    return can_chunk(params, steps)
+
+
+def partitioned_output(output_path) -> bool:
+    """An output path without a file extension is a directory of part files."""
+    return output_path is not None and not Path(output_path).suffix
+
+
+def part_path(output_dir, index: int, shard, params: dict) -> Path:
+    """``<output_dir>/part-00003-<shard name>.<format>`` for shard ``index``."""
+    save_format = params.get("save_format")
+    if not save_format or save_format == "auto":
+        save_format = detect_file_type(shard, params.get("file_type"))
+    return Path(output_dir) / f"part-{index:05d}-{Path(shard).stem}{PART_SUFFIXES[save_format]}"
+
+
+def _map(executor, fn, *iterables):
+    return map(fn, *iterables) if executor is None else executor.map(fn, *iterables)
+
+
+def _map_bounded(executor, window, fn, *iterables):
+    """
+    ``_map`` in order with at most ``window`` calls submitted ahead, so
+    results finished early do not pile up while an earlier one is awaited.
+    """
+    if executor is None:
+        yield from map(fn, *iterables)
+        return
+    pending = collections.deque()
+    for args in zip(*iterables):
+        pending.append(executor.submit(fn, *args))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _fit_shard(path, params, previous_steps, state, step, sketch_k):
+    df = extract_data(path, **input_options(params))
+    for previous in previous_steps:
+        df = apply_step(previous, df, params, state, inplace=True)
+    fitter = make_fit(step, params, sketch_k)
+    fitter.update(df)
+    return fitter.columns
+
+
+def _process_shard(path, params, steps, state, output, keep):
+    df = extract_data(path, **input_options(params))
+    rows_in = len(df)
+    for step in steps:
+        if step not in ("extract", "load"):
+            df = apply_step(step, df, params, state, inplace=True)
+    if output is not None:
+        save_data(df, output, **output_options(params))
+    return rows_in, len(df), df if keep else None
+
+
+def fit_shards(paths, steps, params: dict, executor=None, sketch_k=DEFAULT_SKETCH_K,
+               progress=None) -> dict:
+    """
+    Fit every stateful step over the shards in ``paths``.
+
+    Same result as ``fit.fit_pipeline`` over the concatenated shards, with
+    the shards of each pass spread over ``executor``.
+    """
+    state = {}
+    runnable = [step for step in steps if step not in ("extract", "load")]
+
+    for i, step in enumerate(runnable):
+        fitter = make_fit(step, params, sketch_k)
+        if fitter is None:
+            continue
+
+        partials = _map(executor, _fit_shard, paths, repeat(params), repeat(runnable[:i]),
+                        repeat(state), repeat(step), repeat(sketch_k))
+        for path, partial in zip(paths, partials):
+            merge_accumulators(fitter, partial)
+            if progress is not None:
+                progress.update(f"fit {step}: {Path(path).name}")
+
+        state[step] = fitter.result()
+
+    return state
+
+
+def run_partitioned(params: dict, steps, workers=None, state=None, progress=None) -> dict:
+    """
+    Run ``steps`` on every shard of ``params["input_path"]`` in parallel.
+
+    Parameters
+    ----------
+    params : dict
+        Merged pipeline params (see ``cli.merge_params``).
+    steps : list[str]
+        Steps to run, in order. ``extract`` is implicit.
+    workers : int, optional
+        Worker processes; ``None`` or 0 means one per CPU.
+    state : dict, optional
+        Already fitted state (e.g. from a pipeline artifact); when given the
+        fit passes are skipped.
+    progress : StepProgress, optional
+        Advanced once per shard and pass; its total is set here.
+
+    Returns
+    -------
+    dict
+        Counters: ``partitions``, ``rows_in`` and ``rows_out``.
+
+    When the output path has no file extension it is treated as a
+    directory and every shard is written to its own ``part-*`` file by the
+    worker that processed it; otherwise the shards are written to the one
+    output file in path order.
+    """
+    if not can_partition(params, steps):
+        raise ValueError("ffill / bfill depend on row order across files and "
+                         "cannot run partitioned")
+
+    paths = expand_input(params["input_path"])
+    output_path = params.get("output_path") if "load" in steps else None
+    to_parts = partitioned_output(output_path)
+
+    if progress is not None:
+        n_fits = 0 if state is not None else len(stateful_steps(steps, params))
+        progress.total = len(paths) * (1 + n_fits)
+
+    if to_parts:
+        output_dir = Path(output_path)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        # stale parts of an earlier run with more shards would be mixed in
+        for stale in output_dir.glob("part-*"):
+            stale.unlink()
+        outputs = [part_path(output_dir, i, path, params) for i, path in enumerate(paths)]
+    else:
+        outputs = [None] * len(paths)
+
+    stats = {"partitions": len(paths), "rows_in": 0, "rows_out": 0}
+    single_output = output_path is not None and not to_parts
+
+    with column_pool(0 if workers is None else workers) as executor:
+        if state is None:
+            state = fit_shards(paths, steps, params, executor, sketch_k=sketch_size(params),
+                               progress=progress)
+
+        # about two shards per worker in flight: every worker stays busy while
+        # the parent holds a bounded number of processed frames
+        window = 2 * (executor.workers if executor is not None else 1)
+        results = _map_bounded(executor, window, _process_shard, paths, repeat(params),
+                               repeat(steps), repeat(state), outputs, repeat(single_output))
+        # shards go to the one output file in path order (Parquet: one row group each)
+        with (ChunkWriter(output_path, **output_options(params)) if single_output
+              else contextlib.nullcontext()) as writer:
+            for path, (rows_in, rows_out, df) in zip(paths, results):
+                stats["rows_in"] += rows_in
+                stats["rows_out"] += rows_out
+                if single_output:
+                    writer.write(df)
+                del df
+                if progress is not None:
+                    progress.update(f"apply: {Path(path).name}")
+
+    return stats
@@ -0,0 +1,313 @@
+"""
+Lazy execution plan for in-memory runs.
+
+``build_plan`` turns the step list into plan nodes and rewrites it before
+anything is read:
+
+* **read once / dead work** – the input is scanned once, before the first
+  step, whether or not ``extract`` is listed. Steps whose result a later
+  ``extract`` throws away, and steps after the last ``load``, are dropped.
+* **filter pushdown** – outlier removal moves ahead of steps that only
+  replace text columns with indicator columns (one-hot / hashing
+  ``encode``), so those steps run on fewer rows; the numeric columns the
+  filter reads are left as they are. The passed steps are fitted on the
+  unfiltered rows first, as in the original order. Normalization is not
+  passed: bounds fitted on the raw values round differently from bounds
+  fitted on the rescaled ones, so rows on a bound could be kept or dropped.
+* **fusion** – consecutive column-wise steps (mean / median / mode / ffill
+  / bfill imputation, normalization, label / target encoding, in that
+  order) become one ``fused`` node. It takes each column through all of
+  them and writes it back once, instead of every step copying the frame.
+
+``Plan.explain`` renders the plan (``datapipeline explain``); the nodes are
+run by ``cli.execute_steps``.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .dtypes import categorical_columns, numeric_columns
+from .encode import label_codes, target_encodings
+from .fit import make_fit, sketch_size, uses_quantiles
+from .logger import step_logger
+from .normalize import scaling_stats
+from .parallel import update_fit
+from .transform import fill_with, mode_value
+
+# per step, the methods that work column by column and can be fused
+FUSIBLE_METHODS = {
+    "transform": ("mean", "median", "mode", "ffill", "bfill"),
+    "normalize": ("minmax", "zscore", "robust"),
+    "encode": ("label", "target"),
+}
+# steps a fused node runs, in the only order it can run them
+FUSION_ORDER = ["transform", "normalize", "encode"]
+
+logger = step_logger("fused")
+
+STEP_METHOD_KEYS = {
+    "transform": "missing_method",
+    "outliers": "outlier_method",
+    "normalize": "normalize_method",
+    "encode": "encode_method",
+}
+
+
+class PlanNode:
+    """
+    One operation of a plan.
+
+    ``op`` is "scan", "step", "fused" or "load"; ``positions`` are the
+    indices of the original steps it runs; ``prefit`` lists steps that are
+    fitted on the node's input before it runs (see filter pushdown);
+    ``prefix_end`` is set when the frame after this node equals the frame
+    after original step ``prefix_end`` (so it may be cached).
+    """
+
+    def __init__(self, op, positions, steps, prefit=None, note=None):
+        self.op = op
+        self.positions = positions
+        self.steps = steps
+        self.prefit = prefit or []
+        self.note = note
+        self.prefix_end = None
+
+    def describe(self, params: dict) -> str:
+        if self.op == "scan":
+            return f"scan     {params.get('input_path')}"
+        if self.op == "load":
+            return f"load     {params.get('output_path')}"
+        parts = " + ".join(_with_method(step, params) for step in self.steps)
+        return f"{self.op:<8} {parts}"
+
+
+class Plan:
+    """Optimized plan of an in-memory run (see ``build_plan``)."""
+
+    def __init__(self, steps, nodes, dropped):
+        self.steps = steps
+        self.nodes = nodes
+        self.dropped = dropped
+
+    def explain(self, params: dict) -> str:
+        lines = [f"Plan: {len(self.steps)} steps -> {len(self.nodes)} nodes"]
+        for i, node in enumerate(self.nodes, 1):
+            line = f"  {i}. {node.describe(params)}"
+            if node.note:
+                line += f"  ({node.note})"
+            lines.append(line)
+        for position, reason in sorted(self.dropped):
+            lines.append(f"  dropped {self.steps[position]} (step {position + 1}): {reason}")
+        return "\n".join(lines)
+
+
+def _with_method(step, params):
+    key = STEP_METHOD_KEYS.get(step)
+    return f"{step}[{params.get(key)}]" if key else step
+
+
+def _fusible(step, params) -> bool:
+    if params.get("quantile_error") and uses_quantiles(step, params):
+        # approximate quantiles come from a sketch fit, not the fused exact pass
+        return False
+    if step == "transform" and params.get("missing_column_methods"):
+        # per-column methods (e.g. "drop") are run by ``handle_missing_values``
+        return False
+    return params.get(STEP_METHOD_KEYS.get(step)) in FUSIBLE_METHODS.get(step, ())
+
+
+def _pushable(step, params) -> bool:
+    """Whether an outlier filter gives the same rows before ``step`` as after it."""
+    if step == "encode":
+        # indicator columns are not numeric; label / target codes would be
+        return params.get("encode_method") in ("onehot", "hashing")
+    return False
+
+
+def _live_steps(steps, dropped):
+    live = []
+    for i, step in enumerate(steps):
+        if step == "extract":
+            # without a load in between, the work since the last read is lost
+            while live and steps[live[-1]] != "load":
+                position = live.pop()
+                reason = "read again" if steps[position] == "extract" else "discarded"
+                dropped.append((position, f"{reason} by the extract at step {i + 1}"))
+        live.append(i)
+    if "load" in steps:
+        while steps[live[-1]] != "load":
+            dropped.append((live.pop(), "runs after the last load"))
+    return live
+
+
+def _push_filters(order, steps, params):
+    """Move outlier filters ahead of pushable steps; ``{position: passed positions}``."""
+    passed = {}
+    for k in range(len(order)):
+        if steps[order[k]] != "outliers":
+            continue
+        j = k
+        while j > 0 and _pushable(steps[order[j - 1]], params):
+            j -= 1
+        if j < k:
+            position = order.pop(k)
+            order.insert(j, position)
+            passed[position] = order[j + 1:k + 1]
+    return passed
+
+
+def build_plan(params: dict, steps, scan: bool = True, fuse: bool = True,
+               pushdown: bool = True) -> Plan:
+    """
+    Optimized plan for running ``steps`` on one in-memory frame.
+
+    Parameters
+    ----------
+    params : dict
+        Merged pipeline params (see ``cli.merge_params``).
+    steps : list[str]
+        Steps in the order they are listed.
+    scan : bool
+        Read the input before the first step if ``steps`` does not start
+        with ``extract`` (``False`` when the frame is already there, e.g.
+        resumed from the cache).
+    fuse, pushdown : bool
+        Turn the rewrites off (fusion is off when fitting column-parallel).
+    """
+    steps = list(steps)
+    dropped = []
+    order = _live_steps(steps, dropped)
+    passed = _push_filters(order, steps, params) if pushdown else {}
+
+    nodes = []
+    if scan and (not order or steps[order[0]] != "extract"):
+        nodes.append(PlanNode("scan", [], ["extract"], note="implicit, read once"))
+
+    group = []
+
+    def close_group():
+        if len(group) > 1:
+            nodes.append(PlanNode("fused", list(group), [steps[p] for p in group],
+                                  note="one pass per column"))
+        elif group:
+            nodes.append(PlanNode("step", list(group), [steps[group[0]]]))
+        group.clear()
+
+    for position in order:
+        step = steps[position]
+        if fuse and _fusible(step, params):
+            if group and FUSION_ORDER.index(step) <= FUSION_ORDER.index(steps[group[-1]]):
+                close_group()
+            group.append(position)
+            continue
+        close_group()
+        if step == "extract":
+            nodes.append(PlanNode("scan", [position], [step]))
+        elif step == "load":
+            nodes.append(PlanNode("load", [position], [step]))
+        else:
+            node = PlanNode("step", [position], [step])
+            if position in passed:
+                node.prefit = [steps[p] for p in passed[position]
+                               if make_fit(steps[p], params) is not None]
+                ahead = ", ".join(steps[p] for p in passed[position])
+                node.note = f"pushed ahead of {ahead}"
+            nodes.append(node)
+    close_group()
+
+    done = set()
+    for node in nodes:
+        done.update(node.positions)
+        if node.op in ("step", "fused") and done:
+            end = max(done)
+            if all(p in done for p in order if p <= end):
+                node.prefix_end = end
+
+    return Plan(steps, nodes, dropped)
+
+
+def prefit(df, steps, params: dict, state: dict, executor=None) -> dict:
+    """Fit ``steps`` on ``df`` as it is into ``state`` (quantiles exact unless ``quantile_error``)."""
+    for step in steps:
+        fitter = make_fit(step, params, sketch_size(params, None))
+        update_fit(fitter, df, executor)
+        state[step] = fitter.result()
+    return state
+
+
+def _fill(values: pd.Series, method: str, numeric: bool) -> pd.Series:
+    if method in ("mean", "median"):
+        if not numeric:
+            return values
+        return fill_with(values, values.mean() if method == "mean" else values.median())
+    if method == "mode":
+        if not values.isna().any():
+            return values
+        mode = mode_value(values)
+        return values if mode is None else fill_with(values, mode)
+    return values.ffill() if method == "ffill" else values.bfill()
+
+
+def run_fused(df: pd.DataFrame, steps, params: dict, state=None) -> pd.DataFrame:
+    """
+    Run the column-wise ``steps`` (a fused plan node) on ``df`` in place.
+
+    Every column goes through imputation, scaling and encoding in one go
+    and is written back once. Numeric columns are done first so target
+    encoding sees the final target column. ``state`` may hold pre-fitted
+    parameters for ``normalize`` (pushdown); they are used up.
+    """
+    state = state if state is not None else {}
+    missing_method = params["missing_method"] if "transform" in steps else None
+    normalize_method = params["normalize_method"] if "normalize" in steps else None
+    encode_method = params["encode_method"] if "encode" in steps else None
+    scaling = (state.pop("normalize", None) or {}).get("scaling")
+    dtype = params.get("normalize_dtype") or "float64"
+
+    logger.info(f"Running fused column pass: {' -> '.join(_with_method(s, params) for s in steps)}")
+
+    numeric = list(numeric_columns(df))
+    categorical = list(categorical_columns(df))
+    if encode_method == "target" and params["target_column"] not in df.columns:
+        raise ValueError(f"Target column '{params['target_column']}' not found in DataFrame.")
+    # an empty frame keeps its dtypes, as in ``normalize_data``
+    scale_rows = normalize_method is not None and not df.empty
+
+    for col in numeric:
+        values = original = df[col]
+        if missing_method:
+            values = _fill(values, missing_method, numeric=True)
+        if scale_rows and (scaling is None or col in scaling):
+            array = values.to_numpy(dtype="float64")
+            if scaling is None:
+                center, scale = scaling_stats(array.reshape(-1, 1), normalize_method)
+                center, scale = center[0], scale[0]
+            else:
+                center, scale = scaling[col]
+            if scale == 0 or np.isnan(scale):
+                scale = 1.0
+            values = pd.Series(((array - center) / scale).astype(dtype, copy=False),
+                               index=df.index, name=col)
+        if values is not original:
+            df[col] = values
+
+    for col in df.columns:
+        if col in numeric:
+            continue
+        values = original = df[col]
+        if missing_method:
+            values = _fill(values, missing_method, numeric=False)
+        if encode_method == "label" and col in categorical:
+            values = pd.Series(label_codes(values), index=df.index, name=col)
+        if values is not original:
+            df[col] = values
+
+    if encode_method == "target" and categorical:
+        # every filled column in one bincount pass
+        encoded = target_encodings(df, categorical, params["target_column"],
+                                   smoothing=params.get("encode_smoothing") or 0.0,
+                                   folds=params.get("encode_folds") or 0)
+        for col, values in encoded.items():
+            df[col] = values
+
+    return df
@@ -1,18 +1,223 @@
+"""
+Step profiling.
+
+``profile_step`` runs a pipeline step and measures it: wall time
+(``perf_counter_ns``), CPU time, peak RSS, Python allocations (when
+``tracemalloc`` is tracing), input / output rows and columns, bytes
+processed and throughput. A summary line is always logged.
+
+Inside ``profile_session`` every measurement is also kept and written on
+exit to a JSON file in the Chrome trace format (open it in
+``chrome://tracing`` or https://ui.perfetto.dev); its ``steps`` key holds
+the same records for scripts. Each step can also be run under ``cProfile``
+and its stats dumped to a ``.prof`` file per step.
+"""
+
+import cProfile
+import json
+import os
+import re
+import sys
 import time
-import logging
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+from .logger import get_logger
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = get_logger("Profiler")
+
+MB = 2**20
+
+_session = None
+
+
+class ProfileSession:
+    """Measurements of one CLI run (see ``profile_session``)."""
+
+    def __init__(self, trace_memory: bool = True, cprofile_dir=None):
+        self.trace_memory = trace_memory
+        self.cprofile_dir = Path(cprofile_dir) if cprofile_dir else None
+        self.records = []
+        self.origin_ns = time.perf_counter_ns()
+        self._owns_tracemalloc = False
+        self._cprofile_active = False
+
+    def start(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracemalloc = True
+        if self.cprofile_dir is not None:
+            self.cprofile_dir.mkdir(parents=True, exist_ok=True)
+
+    def stop(self):
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+
+    def to_trace(self) -> dict:
+        """Chrome trace ("JSON object format") with one complete event per step."""
+        pid = os.getpid()
+        events = [{
+            "name": record["step"],
+            "cat": "step",
+            "ph": "X",
+            "ts": record["start_us"],
+            "dur": record["wall_s"] * 1e6,
+            "pid": pid,
+            "tid": 0,
+            "args": {key: value for key, value in record.items()
+                     if key not in ("step", "start_us")},
+        } for record in self.records]
+        return {"traceEvents": events, "displayTimeUnit": "ms", "steps": self.records}
+
+    def write(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_trace(), f, indent=1)
+
+
+@contextmanager
+def profile_session(profile_out=None, cprofile_dir=None, collect=False, trace_memory=None):
+    """
+    Collect every ``profile_step`` measurement made inside the block.
+
+    ``profile_out`` is the trace file written on exit (also when a step
+    fails); ``cprofile_dir`` gets one ``cProfile`` dump per step;
+    ``collect=True`` only keeps the records on the yielded session (e.g.
+    for benchmarks). With none of them the block runs unprofiled apart
+    from the log lines. ``trace_memory`` (default: on when records are
+    kept) turns on ``tracemalloc``, which slows Python allocations down.
+    """
+    global _session
+
+    if not profile_out and not cprofile_dir and not collect:
+        yield None
+        return
+
+    if trace_memory is None:
+        trace_memory = bool(profile_out) or collect
+    session = ProfileSession(trace_memory=trace_memory, cprofile_dir=cprofile_dir)
+    previous, _session = _session, session
+    session.start()
+    try:
+        yield session
+    finally:
+        session.stop()
+        _session = previous
+        if profile_out:
+            session.write(profile_out)
+            logger.info(f"[PROFILE] trace of {len(session.records)} steps written to {profile_out}")
+
+
+def _peak_rss() -> int:
+    """Peak resident set size of this process in bytes (0 if unknown)."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _shape(obj):
+    """``(rows, columns, bytes)`` of a DataFrame or a pipeline counters dict."""
+    if hasattr(obj, "shape") and hasattr(obj, "memory_usage"):
+        return obj.shape[0], obj.shape[1], int(obj.memory_usage(index=False).sum())
+    if isinstance(obj, dict) and "rows_in" in obj:
+        return obj["rows_in"], None, None
+    return None, None, None
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
 
 def profile_step(step_name: str, func, *args, **kwargs):
     """
-    Measure execution time of a pipeline step.
-    Logs duration in seconds.
-    Returns the function's output.
+    Run ``func(*args, **kwargs)`` as the pipeline step ``step_name`` and
+    measure it. Logs a summary and, inside ``profile_session``, records the
+    full measurement. Returns the function's output.
+
+    Rows / columns / bytes in are taken from the first DataFrame argument,
+    rows / columns / bytes out from the returned DataFrame (or from the
+    ``rows_in`` / ``rows_out`` counters of streaming runs).
     """
-    start = time.time()
-    result = func(*args, **kwargs)
-    end = time.time()
+    session = _session
+    frame_in = next((arg for arg in args if hasattr(arg, "memory_usage")), None)
+    rows_in, cols_in, bytes_in = _shape(frame_in)
 
-    duration = round(end - start, 4)
-    logging.info(f"[PROFILE] {step_name} took {duration} seconds")
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+        alloc_before = tracemalloc.get_traced_memory()[0]
+    rss_before = _peak_rss()
 
-    return result
+    profiler = None
+    if session is not None and session.cprofile_dir is not None and not session._cprofile_active:
+        profiler = cProfile.Profile()
+        session._cprofile_active = True
+
+    start_ns = time.perf_counter_ns()
+    cpu_start_ns = time.process_time_ns()
+    try:
+        result = profiler.runcall(func, *args, **kwargs) if profiler else func(*args, **kwargs)
+    finally:
+        wall_ns = time.perf_counter_ns() - start_ns
+        cpu_ns = time.process_time_ns() - cpu_start_ns
+        if profiler is not None:
+            session._cprofile_active = False
+
+    rows_out, cols_out, bytes_out = _shape(result)
+    if isinstance(result, dict) and "rows_out" in result:
+        rows_out = result["rows_out"]
+
+    wall_s = wall_ns / 1e9
+    rows = rows_in if rows_in is not None else rows_out
+    nbytes = bytes_in if bytes_in is not None else bytes_out
+    rss_after = _peak_rss()
 
+    record = {
+        "step": step_name,
+        "start_us": (start_ns - (session.origin_ns if session else start_ns)) / 1e3,
+        "wall_s": wall_s,
+        "cpu_s": cpu_ns / 1e9,
+        "rows_in": rows_in,
+        "rows_out": rows_out,
+        "cols_in": cols_in,
+        "cols_out": cols_out,
+        "bytes_in": bytes_in,
+        "bytes_out": bytes_out,
+        "rows_per_s": rows / wall_s if rows is not None and wall_s > 0 else None,
+        "mb_per_s": nbytes / MB / wall_s if nbytes is not None and wall_s > 0 else None,
+        "peak_rss_mb": rss_after / MB,
+        "peak_rss_delta_mb": (rss_after - rss_before) / MB,
+    }
+    if tracing:
+        current, peak = tracemalloc.get_traced_memory()
+        record["alloc_delta_mb"] = (current - alloc_before) / MB
+        record["alloc_peak_mb"] = (peak - alloc_before) / MB
+
+    summary = f"[PROFILE] {step_name} took {wall_s:.4f} s (cpu {record['cpu_s']:.4f} s)"
+    if rows_in is not None and rows_out is not None:
+        summary += f", {rows_in} -> {rows_out} rows"
+    elif rows is not None:
+        summary += f", {rows} rows"
+    if record["rows_per_s"] is not None:
+        summary += f" ({record['rows_per_s']:,.0f} rows/s)"
+    summary += f", peak RSS {record['peak_rss_mb']:.1f} MB"
+    logger.info(summary, extra={"step": step_name, "rows_in": rows_in, "rows_out": rows_out,
+                                "duration_s": wall_s})
+
+    if session is not None:
+        session.records.append(record)
+        if profiler is not None:
+            index = len(session.records) - 1
+            profiler.dump_stats(session.cprofile_dir / f"{index:02d}-{_slug(step_name)}.prof")
+
+    return result
@@ -2,35 +2,70 @@ import sys
 import time
 
 class StepProgress:
-    def __init__(self, total: int):
+    """
+    Single-line progress bar for pipeline steps, rows or bytes.
+
+    Redraws are throttled to one every ``min_interval`` seconds so calling
+    ``update`` once per chunk costs next to nothing, and the bar is switched
+    off automatically when stdout is not a terminal (logs, cron, pipes).
+    """
+
+    def __init__(self, total: int, unit: str = "steps", enabled: bool = None,
+                 min_interval: float = 0.1):
         self.total = total
+        self.unit = unit
         self.current = 0
         self.start_time = time.time()
+        self.enabled = sys.stdout.isatty() if enabled is None else enabled
+        self.min_interval = min_interval
+        self._last_draw = 0.0
+
+    def update(self, step_name: str, advance: int = 1):
+        """Advance progress by ``advance`` units and show the step name."""
+        self.current += advance
+        if not self.enabled:
+            return
 
-    def update(self, step_name: str):
-        """Advance progress by 1 and print the step name."""
-        self.current += 1
-        percent = (self.current / self.total) * 100
+        now = time.perf_counter()
+        done = self.current >= self.total
+        if not done and now - self._last_draw < self.min_interval:
+            return
+        self._last_draw = now
+
+        fraction = min(self.current / self.total, 1.0) if self.total else 1.0
+        percent = fraction * 100
 
         elapsed = time.time() - self.start_time
         elapsed_str = f"{elapsed:.1f}s"
 
         bar_len = 30
-        filled = int(self.current / self.total * bar_len)
+        filled = int(fraction * bar_len)
         bar = "█" * filled + "-" * (bar_len - filled)
 
         msg = (
-            f"\r▶️  Step {self.current}/{self.total} "
+            f"\r▶️  {self._position()} "
             f"[{bar}] {percent:5.1f}% | {step_name} | elapsed {elapsed_str}"
         )
 
         sys.stdout.write(msg)
         sys.stdout.flush()
 
-        if self.current == self.total:
+        if done:
             print()  # final newline
 
+    def _position(self) -> str:
+        if self.unit == "bytes":
+            return f"{self.current / 1e6:.1f}/{self.total / 1e6:.1f} MB"
+        if self.unit == "steps":
+            return f"Step {self.current}/{self.total}"
+        return f"{self.current}/{self.total} {self.unit}"
+
     def finish(self):
         """Optional: print summary."""
+        if not self.enabled:
+            return
         total_time = time.time() - self.start_time
-        print(f"Completed all {self.total} steps in {total_time:.2f}s")
+        if self.unit == "steps":
+            print(f"Completed all {self.total} steps in {total_time:.2f}s")
+        else:
+            print(f"Completed {self._position()} in {total_time:.2f}s")
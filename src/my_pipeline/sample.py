@@ -0,0 +1,257 @@
+"""
+Sampled preview runs (``run --sample``).
+
+``InputSample.read`` stands in for ``extract.extract_data``: it returns a
+uniform random sample of the input rows without parsing the whole input.
+
+* **CSV** – random byte offsets are drawn and the line after each one is
+  taken, so only the sampled lines (and a probe estimating the row count)
+  are parsed. A line is picked with the probability of an offset hitting
+  the line before it, which is uniform as long as row lengths do not
+  drift along the file. Quoted fields must not contain line breaks.
+* **Parquet / Feather / Arrow IPC** – random row indices are taken from
+  the row count of the file metadata.
+
+Small inputs, and samples of more than ``FULL_READ_SHARE`` of the rows,
+are read whole and sampled in memory. ``estimate_run`` scales the
+profiled steps of sampled runs up to the whole input.
+"""
+
+import io
+import mmap
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from .dtypes import optimize_dtypes
+from .extract import (_filter_mask, _require_pyarrow, _with_filter_columns,
+                      detect_file_type, expand_input, footer_offset, read_csv)
+from .profiler import MB
+
+# bytes after the CSV header that estimate the mean row length
+PROBE_BYTES = 1 << 20
+# above this share of the rows a file is read whole and sampled in memory
+FULL_READ_SHARE = 0.5
+# rows of the warm-up run of a preview (imports, first calls) and of the
+# small timed runs that measure the fixed cost of each step
+WARMUP_ROWS = 100
+# timed runs of a preview on each of the two sizes
+REPEATS = 3
+
+
+def parse_sample(value):
+    """
+    ``--sample`` size: a fraction of the rows (float, "0.01" or "1%") or a
+    number of rows (int, "10000").
+    """
+    text = str(value).strip()
+    try:
+        if text.endswith("%"):
+            size = float(text[:-1]) / 100
+        elif text.isdigit():
+            size = int(text)
+        else:
+            size = float(text)
+    except ValueError:
+        size = None
+    if (size is None or isinstance(size, float) and not 0 < size <= 1
+            or isinstance(size, int) and size < 1):
+        raise ValueError(f"Invalid sample size {value!r}: give a fraction in (0, 1] "
+                         f"(0.01, 1%) or a number of rows (10000)")
+    return size
+
+
+class InputSample:
+    """
+    Random sample of a pipeline input (see the module docstring).
+
+    ``size`` is a fraction of the rows or a number of rows (split over
+    several input files by their size). After ``read``, ``rows`` holds the
+    rows sampled (before filters), ``rows_total`` the estimated rows of the
+    input and ``read_s`` the estimated time to read all of it.
+    """
+
+    def __init__(self, size, seed: int = 0):
+        self.size = size
+        self.seed = seed
+        self.rows = 0
+        self.rows_total = 0
+        self.read_s = 0.0
+
+    @property
+    def fraction(self) -> float:
+        """Sampled share of the input rows."""
+        return self.rows / self.rows_total if self.rows_total else 1.0
+
+    def read(self, input_path, file_type: str = None, columns=None, filters=None,
+             workers: int = None, optimize: bool = False, csv_options=None) -> pd.DataFrame:
+        """Sampled rows of ``input_path``; arguments as in ``extract.extract_data``."""
+        paths = expand_input(input_path)
+        sizes = [os.path.getsize(path) for path in paths]
+        columns = list(columns) if columns else None
+        filters = [tuple(f) for f in filters] if filters else None
+        read_columns = _with_filter_columns(columns, filters)
+        rng = np.random.default_rng(self.seed)
+
+        frames = []
+        for path, nbytes in zip(paths, sizes):
+            size = self.size
+            if isinstance(size, int):
+                size = max(1, round(size * nbytes / (sum(sizes) or 1)))
+            if detect_file_type(path, file_type) == "csv":
+                frames.append(self._sample_csv(path, size, rng, read_columns, csv_options or {}))
+            else:
+                frames.append(self._sample_arrow(path, detect_file_type(path, file_type),
+                                                 size, rng, read_columns))
+        df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+        if filters:
+            df = df[_filter_mask(df, filters)].reset_index(drop=True)
+        if read_columns != columns:
+            df = df.drop(columns=read_columns[len(columns):])
+        if optimize:
+            optimize_dtypes(df)
+        return df
+
+    def _sample_csv(self, path, size, rng, columns, csv_options) -> pd.DataFrame:
+        skipfooter = csv_options.get("skipfooter") or 0
+        end = footer_offset(path, skipfooter) if skipfooter else os.path.getsize(path)
+        if not end or csv_options.get("nrows"):
+            # nothing to seek in, or a window counted in rows
+            return self._sample_whole(path, columns, csv_options, size, rng)
+        options = {key: csv_options[key] for key in ("engine", "dtype_backend")
+                   if csv_options.get(key)}
+
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            header_end = data.find(b"\n", 0, end) + 1
+            probe = data[header_end:min(end, header_end + PROBE_BYTES)]
+            probe = probe[:probe.rfind(b"\n") + 1]
+            probe_rows = probe.count(b"\n")
+            body = end - header_end
+            n = round(size * body * probe_rows / len(probe)) if probe_rows else 0
+            n = max(n, 1) if isinstance(size, float) else size
+            if (not header_end or not probe_rows or header_end + PROBE_BYTES >= end
+                    or n >= FULL_READ_SHARE * body * probe_rows / len(probe)):
+                return self._sample_whole(path, columns, csv_options, size, rng)
+
+            # parse speed on the probe's contiguous rows, for the time of a full read
+            start = time.perf_counter()
+            read_csv(io.BytesIO(data[:header_end] + probe), columns, **options)
+            self.read_s += (time.perf_counter() - start) * body / len(probe)
+
+            # the line after a random offset; the header's newline leads to the first row
+            starts = set()
+            for _ in range(8):
+                missing = n - len(starts)
+                if missing <= 0:
+                    break
+                for offset in rng.integers(0, end, size=missing):
+                    newline = data.find(b"\n", offset, end)
+                    if 0 <= newline < end - 1:
+                        starts.add(newline + 1)
+
+            lines = [data[:header_end]]
+            for start in sorted(starts)[:n]:
+                stop = data.find(b"\n", start, end)
+                lines.append(data[start:stop + 1] if stop >= 0 else data[start:end] + b"\n")
+
+        df = read_csv(io.BytesIO(b"".join(lines)), columns, **options)
+        # the mean length of the sampled rows covers the whole file, not just its start
+        mean_length = sum(len(line) for line in lines[1:]) / max(len(lines) - 1, 1)
+        self.rows += len(df)
+        self.rows_total += body / mean_length
+        return df
+
+    def _sample_arrow(self, path, file_type, size, rng, columns) -> pd.DataFrame:
+        _require_pyarrow()
+        import pyarrow.dataset as ds
+
+        dataset = ds.dataset(str(path), format="parquet" if file_type == "parquet" else "ipc")
+        total = dataset.count_rows()
+        n = min(total, max(1, round(size * total)) if isinstance(size, float) else size)
+
+        # the read speed of the first batch, for the time of a full read
+        start = time.perf_counter()
+        first = next(iter(dataset.to_batches(columns=columns)), None)
+        if first is not None and first.num_rows:
+            self.read_s += (time.perf_counter() - start) * total / first.num_rows
+
+        indices = np.sort(rng.choice(total, n, replace=False))
+        df = dataset.take(indices, columns=columns).to_pandas()
+        self.rows += n
+        self.rows_total += total
+        return df
+
+    def _sample_whole(self, path, columns, csv_options, size, rng) -> pd.DataFrame:
+        start = time.perf_counter()
+        df = read_csv(path, columns, **csv_options)
+        self.read_s += time.perf_counter() - start
+        n = min(len(df), round(size * len(df)) if isinstance(size, float) else size)
+        self.rows += n
+        self.rows_total += len(df)
+        return df.iloc[np.sort(rng.choice(len(df), n, replace=False))].reset_index(drop=True)
+
+
+def scaled_time(small, large, rows_total) -> float:
+    """
+    Wall time at ``rows_total`` rows from two timed runs ``(rows, seconds)``:
+    a fixed cost plus a cost per row, fitted through both, so per-call
+    overheads are not multiplied up with the rows. The two runs should be
+    far apart in size (a ``WARMUP_ROWS`` run and the whole sample), or the
+    noise of the timings decides the cost per row.
+    """
+    (rows_a, time_a), (rows_b, time_b) = small, large
+    per_row = (time_b - time_a) / (rows_b - rows_a) if rows_b > rows_a else time_b / max(rows_b, 1)
+    per_row = max(per_row, 0.0)
+    fixed = max(time_b - per_row * rows_b, 0.0)
+    return fixed + per_row * rows_total
+
+
+def estimate_run(small, large, rows_total: float, read_s: float, read_step: str) -> dict:
+    """
+    Full-input estimates from repeated runs of the same steps on a few
+    (``WARMUP_ROWS``) and on all sampled rows: ``(input rows, [profile_step
+    records of each repeat])`` each.
+
+    A step's fixed cost is its median time over the small runs; each large
+    run then gives a time at ``rows_total`` rows (``scaled_time``). Step
+    and total times are the medians over the large runs, ``wall_range``
+    the lowest and highest total. Rows and frame sizes scale with the rows
+    of the large runs. The read step (the record named ``read_step``)
+    takes ``read_s``.
+
+    Returns
+    -------
+    dict
+        ``steps`` (``step``, ``rows_out``, ``wall_s``, ``mb``: frame size
+        after the step; ``None`` when unknown), ``wall_s`` and
+        ``wall_range`` in total and ``frame_mb``, the largest frame. That
+        is the data alone: the process peaks higher (copies, the
+        interpreter and its libraries).
+    """
+    (rows_small, runs_small), (rows_large, runs_large) = small, large
+    scale = rows_total / rows_large if rows_large else 1.0
+    steps, totals = [], [0.0] * len(runs_large)
+    for i, record in enumerate(runs_large[0]):
+        rows, nbytes = record["rows_out"], record["bytes_out"]
+        if record["step"] == read_step:
+            times = [read_s] * len(runs_large)
+        else:
+            fixed = float(np.median([run[i]["wall_s"] for run in runs_small]))
+            times = [scaled_time((rows_small, fixed), (rows_large, run[i]["wall_s"]), rows_total)
+                     for run in runs_large]
+        totals = [total + wall_s for total, wall_s in zip(totals, times)]
+        steps.append({
+            "step": record["step"],
+            "rows_out": None if rows is None else round(rows * scale),
+            "wall_s": float(np.median(times)),
+            "mb": None if nbytes is None else nbytes * scale / MB,
+        })
+    return {
+        "steps": steps,
+        "wall_s": float(np.median(totals)),
+        "wall_range": (min(totals), max(totals)),
+        "frame_mb": max((step["mb"] for step in steps if step["mb"] is not None), default=0.0),
+    }
@@ -0,0 +1,370 @@
+"""
+Long-running pipeline server (``datapipeline serve``).
+
+Every ``datapipeline run`` is a cold process: interpreter start, imports,
+config parsing and, for ``transform``, loading the fitted artifact. The
+server pays for those once and keeps them warm:
+
+* the step modules (pandas included) are imported at start;
+* configs and fitted artifacts are parsed on first use and reused until
+  their file changes (keyed by path and modification time);
+* in-memory runs share the on-disk step cache as usual; concurrent jobs
+  (also identical ones) may read and write the same entries.
+
+Jobs are JSON requests over HTTP, on a localhost port or a Unix socket:
+
+    POST /jobs               submit a job (202 + job, 503 when the queue is full)
+    GET  /jobs               every job still kept
+    GET  /jobs/<id>?wait=S   one job; waits up to S seconds for it to finish
+    GET  /status             workers, queue depth and job counts
+
+A job is ``{"command": "run" | "transform", "input_path", "output_path",
+"config", "steps", "params": {...}}``. ``params`` holds the options of the
+matching CLI command (``missing_method``, ``threshold``, ``chunksize``,
+``artifact_path``, ...), which override the config as on the command line.
+
+Jobs run on a fixed number of worker threads fed by a bounded queue.
+When the queue is full, submissions are refused with ``503`` and
+``Retry-After`` (backpressure) instead of piling up in memory. Each job
+records how long it waited and ran.
+"""
+
+import http.client
+import importlib
+import json
+import math
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+from .logger import get_logger
+
+logger = get_logger("PipelineServer")
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_JOBS = 1
+DEFAULT_QUEUE_SIZE = 32
+# finished jobs kept for status requests; older ones are forgotten
+KEEP_FINISHED = 1000
+
+COMMANDS = ("run", "transform")
+# options a job may set (the CLI options of ``run`` / ``transform``)
+JOB_PARAMS = {
+    "missing_method", "fill_value", "outlier_method", "threshold", "normalize_method",
+    "encode_method", "target_column", "chunksize", "no_cache", "workers",
+    "incremental", "refit", "artifact_path", "quantile_error",
+}
+# defaults of the CLI options, for jobs whose params and config leave them unset
+JOB_DEFAULTS = {"normalize_method": "minmax", "encode_method": "label"}
+# imported at start so the first job does not pay for them
+WARM_MODULES = ["cli", "extract", "transform", "outliers", "normalize", "encode", "load",
+                "fit", "plan", "stream", "partition", "incremental", "artifact", "cache"]
+
+
+class QueueFull(Exception):
+    """The job queue is at capacity; retry later."""
+
+
+class Job:
+    """One submitted job and its status / timings."""
+
+    def __init__(self, request: dict):
+        self.id = uuid.uuid4().hex[:12]
+        self.request = request
+        self.status = "queued"
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.done = threading.Event()
+
+    def to_dict(self) -> dict:
+        now = time.time()
+        return {
+            "id": self.id,
+            "status": self.status,
+            "command": self.request.get("command", "run"),
+            "input_path": self.request.get("input_path"),
+            "output_path": self.request.get("output_path"),
+            "submitted": datetime.fromtimestamp(self.submitted, timezone.utc)
+            .isoformat(timespec="milliseconds"),
+            "queue_s": (self.started or now) - self.submitted,
+            "run_s": None if self.started is None else (self.finished or now) - self.started,
+            "error": self.error,
+        }
+
+
+def _check_request(request) -> dict:
+    if not isinstance(request, dict):
+        raise ValueError("a job must be a JSON object")
+    unknown = set(request) - {"command", "input_path", "output_path", "config", "steps", "params"}
+    if unknown:
+        raise ValueError(f"unknown job fields: {sorted(unknown)}")
+    if request.get("command", "run") not in COMMANDS:
+        raise ValueError(f"command must be one of {list(COMMANDS)}")
+    params = request.get("params") or {}
+    if not isinstance(params, dict) or set(params) - JOB_PARAMS:
+        raise ValueError(f"params may only set {sorted(JOB_PARAMS)}")
+    steps = request.get("steps")
+    if steps is not None and not (isinstance(steps, list) and all(isinstance(s, str) for s in steps)):
+        raise ValueError("steps must be a list of step names")
+    return request
+
+
+class JobRunner:
+    """
+    Bounded job queue, worker threads and the warm configs / artifacts.
+
+    Parameters
+    ----------
+    config_path : str, optional
+        Config of jobs that name none.
+    jobs : int
+        Jobs run at the same time (worker threads).
+    queue_size : int
+        Jobs waiting beyond the running ones before submissions are refused.
+    """
+
+    def __init__(self, config_path=None, jobs: int = DEFAULT_JOBS,
+                 queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.config_path = config_path
+        self.queue = queue.Queue(maxsize=max(queue_size, 1))
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self._files = {}
+        self._threads = [threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                         for i in range(max(jobs, 1))]
+
+    def start(self):
+        for name in WARM_MODULES:
+            importlib.import_module(f".{name}", __package__)
+        if self.config_path:
+            self.config(self.config_path)
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def shutdown(self):
+        """Stop the workers after the jobs already queued."""
+        for _ in self._threads:
+            self.queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    # ---------------------------------------------------------
+    # Warm state
+    # ---------------------------------------------------------
+    def _cached(self, kind, path, load):
+        key = (kind, str(Path(path).resolve()))
+        mtime = os.stat(path).st_mtime_ns
+        with self.lock:
+            cached = self._files.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        value = load(path)
+        with self.lock:
+            self._files[key] = (mtime, value)
+        return value
+
+    def config(self, path) -> dict:
+        from .cli import load_config
+        return self._cached("config", path, load_config)
+
+    def artifact(self, path) -> dict:
+        from .artifact import load_artifact
+        return self._cached("artifact", path, load_artifact)
+
+    # ---------------------------------------------------------
+    # Jobs
+    # ---------------------------------------------------------
+    def submit(self, request: dict) -> Job:
+        job = Job(_check_request(request))
+        with self.lock:
+            try:
+                self.queue.put_nowait(job)
+            except queue.Full:
+                raise QueueFull(f"{self.queue.maxsize} jobs already waiting") from None
+            self.jobs[job.id] = job
+            self._forget_finished()
+        return job
+
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.done.is_set()]
+        for job_id in finished[:max(len(finished) - KEEP_FINISHED, 0)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def status(self) -> dict:
+        with self.lock:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "uptime_s": time.time() - self.started,
+            "workers": len(self._threads),
+            "queued": self.queue.qsize(),
+            "queue_size": self.queue.maxsize,
+            "jobs": counts,
+        }
+
+    def _work(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            job.status = "running"
+            job.started = time.time()
+            try:
+                self.run_job(job.request)
+                job.status = "done"
+            except Exception as e:
+                job.status = "failed"
+                job.error = f"{type(e).__name__}: {e}"
+                logger.error(f"Job {job.id} failed: {job.error}", extra={"job": job.id})
+            finally:
+                job.finished = time.time()
+                job.done.set()
+            logger.info(f"Job {job.id} {job.status} in {job.finished - job.started:.3f} s "
+                        f"(waited {job.started - job.submitted:.3f} s)",
+                        extra={"job": job.id, "duration_s": job.finished - job.started})
+
+    def run_job(self, request: dict):
+        """Run one job the way the matching CLI command would."""
+        from .cli import RUN_ALL_STEPS, apply_artifact, merge_params, run_pipeline
+
+        config_path = request.get("config") or self.config_path
+        config = self.config(config_path) if config_path else {}
+        params = merge_params({
+            **(request.get("params") or {}),
+            "input_path": request.get("input_path"),
+            "output_path": request.get("output_path"),
+            "steps": request.get("steps"),
+        }, config)
+        for key, value in JOB_DEFAULTS.items():
+            if params[key] is None:
+                params[key] = value
+
+        if request.get("command", "run") == "transform":
+            if not params["artifact_path"]:
+                raise ValueError("No artifact path: set params.artifact_path or [artifact] path")
+            artifact = self.artifact(params["artifact_path"])
+            steps = [step for step in artifact["steps"] if step != "load"] + ["load"]
+            apply_artifact({**params, **artifact["params"]}, steps, artifact["state"])
+        else:
+            run_pipeline(params, params["steps"] or RUN_ALL_STEPS)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "datapipeline"
+
+    def do_GET(self):
+        runner = self.server.runner
+        url = urlparse(self.path)
+        if url.path == "/status":
+            return self._reply(200, runner.status())
+        if url.path == "/jobs":
+            with runner.lock:
+                jobs = list(runner.jobs.values())
+            return self._reply(200, {"jobs": [job.to_dict() for job in jobs]})
+        if url.path.startswith("/jobs/"):
+            job = runner.get(url.path[len("/jobs/"):])
+            if job is None:
+                return self._reply(404, {"error": "no such job"})
+            wait = parse_qs(url.query).get("wait")
+            if wait:
+                try:
+                    timeout = float(wait[0])
+                    if not 0 <= timeout < math.inf:
+                        raise ValueError
+                except ValueError:
+                    return self._reply(400, {"error": f"invalid wait {wait[0]!r}: give seconds"})
+                job.done.wait(timeout)
+            return self._reply(200, job.to_dict())
+        self._reply(404, {"error": f"unknown path {url.path}"})
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/jobs":
+            return self._reply(404, {"error": f"unknown path {self.path}"})
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            job = self.server.runner.submit(json.loads(self.rfile.read(length) or b"{}"))
+        except QueueFull as e:
+            return self._reply(503, {"error": f"queue full: {e}"}, {"Retry-After": "1"})
+        except ValueError as e:
+            return self._reply(400, {"error": str(e)})
+        self._reply(202, job.to_dict())
+
+    def _reply(self, code, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # Unix socket peers have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(runner: JobRunner, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None):
+    """HTTP server for ``runner`` on ``host:port`` or, if given, the Unix socket ``socket_path``."""
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = _UnixHTTPServer(socket_path, _Handler)
+    else:
+        server = ThreadingHTTPServer((host, port), _Handler)
+        server.daemon_threads = True
+    server.runner = runner
+    return server
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def request(method: str, path: str, body=None, host=DEFAULT_HOST, port=DEFAULT_PORT,
+            socket_path=None, timeout=None):
+    """Send one request to a running server; returns ``(status code, JSON body)``."""
+    if socket_path:
+        conn = _UnixConnection(socket_path, timeout=timeout)
+    else:
+        conn = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        data = None if body is None else json.dumps(body)
+        conn.request(method, path, body=data, headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read() or b"{}")
+    finally:
+        conn.close()
@@ -0,0 +1,225 @@
+"""
+Mergeable running statistics.
+
+Every accumulator here can be updated chunk by chunk and merged with
+another accumulator of the same kind, so statistics over data that does
+not fit in memory (or that is split across partitions) can be built from
+partial aggregates and still give the global result.
+"""
+
+import math
+
+import numpy as np
+
+# measured rank error of ``QuantileSketch`` stays below this / k
+RANK_ERROR_FACTOR = 3.0
+
+
+def sketch_k_for_error(error: float) -> int:
+    """Smallest sketch size ``k`` whose rank error stays within ``error`` (e.g. 0.001)."""
+    if not 0 < error < 1:
+        raise ValueError(f"quantile error must be between 0 and 1, got {error}")
+    return max(8, int(math.ceil(RANK_ERROR_FACTOR / error)))
+
+
+class RunningStats:
+    """
+    Count, mean, variance, min and max of a numeric stream.
+
+    Mean and variance use Welford's algorithm in its batched form
+    (Chan et al.): each chunk is reduced with NumPy and then merged, which
+    is numerically stable and needs O(1) memory.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values) -> "RunningStats":
+        values = np.asarray(values, dtype="float64")
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return self
+
+        batch = RunningStats()
+        batch.count = int(values.size)
+        batch.mean = float(values.mean())
+        batch.m2 = float(((values - batch.mean) ** 2).sum())
+        batch.min = float(values.min())
+        batch.max = float(values.max())
+        return self.merge(batch)
+
+    def merge(self, other: "RunningStats") -> "RunningStats":
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return self
+
+        n = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / n
+        self.m2 += other.m2 + delta * delta * self.count * other.count / n
+        self.count = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def std(self, ddof: int = 1) -> float:
+        """Standard deviation (``ddof=1`` matches ``Series.std``)."""
+        if self.count <= ddof:
+            return math.nan
+        return math.sqrt(self.m2 / (self.count - ddof))
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch (KLL-style compactor hierarchy).
+
+    Values are buffered at level 0; when a level outgrows its capacity it
+    is sorted and every other item is promoted to the next level with twice
+    the weight. The largest levels hold ``k`` items and smaller levels
+    shrink geometrically, so memory is O(k) regardless of the stream length
+    and the rank error is roughly ``1 / k``.
+
+    While fewer than ``k`` values have been seen nothing is compacted and
+    the quantiles are exact. ``k=None`` disables compaction entirely.
+    ``sketch_k_for_error`` picks ``k`` for a rank error bound;
+    ``to_dict`` / ``from_dict`` turn a sketch into JSON-able data so
+    sketches built elsewhere (other processes, machines or runs) can be
+    merged.
+    """
+
+    def __init__(self, k=2048, seed: int = 0):
+        self.k = k
+        self.count = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values) -> "QuantileSketch":
+        values = np.asarray(values, dtype="float64")
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return self
+
+        self.count += int(values.size)
+        # block by block: compactions sort bounded blocks, so a long column
+        # costs O(n log block) and O(k + block) memory instead of a full sort
+        block = values.size if self.k is None else max(4 * self.k, 1 << 16)
+        for start in range(0, values.size, block):
+            self.levels[0] = np.concatenate([self.levels[0], values[start:start + block]])
+            self._compress()
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self._compress()
+        return self
+
+    @property
+    def error_bound(self) -> float:
+        """Rank error the quantiles stay within (0 while nothing was compacted)."""
+        if self.k is None or len(self.levels) == 1:
+            return 0.0
+        return min(RANK_ERROR_FACTOR / self.k, 1.0)
+
+    def to_dict(self) -> dict:
+        return {"k": self.k, "count": self.count,
+                "levels": [items.tolist() for items in self.levels]}
+
+    @classmethod
+    def from_dict(cls, data: dict, seed: int = 0) -> "QuantileSketch":
+        sketch = cls(data["k"], seed=seed)
+        sketch.count = data["count"]
+        sketch.levels = [np.asarray(items, dtype="float64") for items in data["levels"]]
+        return sketch
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        if self.k is None:
+            return
+
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if items.size > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # an odd item stays behind so total weight is preserved
+                keep = items[:1] if items.size % 2 else items[:0]
+                items = items[keep.size:]
+                promoted = items[self._rng.integers(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def quantile(self, q: float) -> float:
+        """Approximate ``q``-quantile (exact until the first compaction)."""
+        if self.count == 0:
+            return math.nan
+
+        if len(self.levels) == 1:
+            # nothing compacted yet: same linear interpolation as pandas
+            return float(np.quantile(self.levels[0], q))
+
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([
+            np.full(level_items.size, 2 ** level, dtype="float64")
+            for level, level_items in enumerate(self.levels)
+        ])
+        order = np.argsort(items, kind="stable")
+        items, weights = items[order], weights[order]
+        cumulative = np.cumsum(weights)
+        idx = np.searchsorted(cumulative, q * cumulative[-1], side="left")
+        return float(items[min(idx, items.size - 1)])
+
+
+class CategoryStats:
+    """
+    Per-category counts of a stream.
+
+    Used for mode imputation and the category lists of label / one-hot
+    encoding (target encoding keeps ``encode.TargetStats``).
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.nulls = 0
+
+    def update(self, values) -> "CategoryStats":
+        self.nulls += int(values.isna().sum())
+        counts = values.value_counts(dropna=True)
+        for value, n in counts.items():
+            # ``category`` columns also list their unobserved categories
+            if n:
+                self.counts[value] = self.counts.get(value, 0) + int(n)
+        return self
+
+    def merge(self, other: "CategoryStats") -> "CategoryStats":
+        for value, n in other.counts.items():
+            self.counts[value] = self.counts.get(value, 0) + n
+        self.nulls += other.nulls
+        return self
+
+    def mode(self):
+        """Most frequent value; ties resolve to the smallest, like ``Series.mode``."""
+        if not self.counts:
+            return None
+        top = max(self.counts.values())
+        tied = [value for value, n in self.counts.items() if n == top]
+        try:
+            return sorted(tied)[0]
+        except TypeError:
+            return tied[0]
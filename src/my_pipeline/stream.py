@@ -0,0 +1,143 @@
+"""
+Chunked (streaming) execution of the pipeline steps.
+
+Instead of loading the whole input into one DataFrame, the input is read
+``chunksize`` rows at a time; every configured step runs on each chunk and
+the load step hands the chunk to a ``load.ChunkWriter``, which writes it
+(CSV rows, a Parquet row group or Arrow record batches) on a background
+thread while the next chunk is processed.  Peak memory is bounded by the
+chunk size rather than by the size of the input file.
+
+Global statistics (fill values, outlier bounds, scaling, encodings) are
+fitted over the whole input first, see ``fit.fit_pipeline``.
+"""
+
+import contextlib
+
+from .extract import extract_chunks, input_size
+from .fit import DEFAULT_SKETCH_K, apply_step, fit_pipeline, stateful_steps
+from .load import ChunkWriter
+from .parallel import column_pool
+
+# missing-value methods that depend on the previous / next rows
+ROW_ORDER_METHODS = ("ffill", "bfill")
+
+
+def can_chunk(params: dict, steps) -> bool:
+    """
+    Whether every step gives the same result when the rows are run in
+    separate pieces (chunks, shards, appended rows): ffill / bfill, also
+    as a per-column method, would stop filling at the edge of each piece.
+    """
+    if "transform" not in steps:
+        return True
+    methods = [params.get("missing_method"), *(params.get("missing_column_methods") or {}).values()]
+    return not any(method in ROW_ORDER_METHODS for method in methods)
+
+
+def input_options(params: dict) -> dict:
+    """``extract_data`` / ``extract_chunks`` keyword args from merged params."""
+    return {
+        "file_type": params.get("file_type"),
+        "columns": params.get("columns"),
+        "filters": params.get("filters"),
+        "optimize": params.get("optimize_dtypes", False),
+        "csv_options": {
+            "engine": params.get("csv_engine") or "c",
+            "dtype_backend": params.get("dtype_backend") or "numpy",
+            "memory_map": params.get("memory_map", False),
+            "nrows": params.get("nrows"),
+            "skipfooter": params.get("skipfooter") or 0,
+        },
+    }
+
+
+def output_options(params: dict) -> dict:
+    """``save_data`` / ``ChunkWriter`` keyword args from merged params."""
+    return {
+        "save_format": params.get("save_format"),
+        "compression": params.get("compression"),
+        "float_precision": params.get("float_precision"),
+        "csv_engine": params.get("write_engine") or "pandas",
+    }
+
+
+def stream_pipeline(params: dict, steps, chunksize: int,
+                    sketch_k=DEFAULT_SKETCH_K, state=None, progress=None,
+                    workers=1) -> dict:
+    """
+    Stream the input through ``steps`` in chunks of ``chunksize`` rows.
+
+    Parameters
+    ----------
+    params : dict
+        Merged pipeline params (see ``cli.merge_params``).
+    steps : list[str]
+        Steps to run, in order. ``extract`` is implicit.
+    chunksize : int
+        Number of input rows parsed per chunk.
+    sketch_k : int or None
+        Quantile sketch size used while fitting median / IQR statistics.
+    state : dict, optional
+        Already fitted state (e.g. from a pipeline artifact); when given the
+        fit passes are skipped and the input is read only once.
+    progress : StepProgress, optional
+        Advanced by the number of input bytes parsed; its total is set to
+        the input size times the number of scans.
+    workers : int
+        Processes used to fit the columns of each chunk (0 = one per CPU).
+
+    Returns
+    -------
+    dict
+        Counters: ``chunks``, ``rows_in``, ``rows_out`` and ``scans``
+        (number of passes over the input, fit passes included).
+    """
+    if not can_chunk(params, steps):
+        raise ValueError("ffill / bfill fill across chunk boundaries and cannot run streamed")
+    scans = {"count": 0}
+
+    if progress is not None:
+        n_scans = 1 if state is not None else 1 + len(stateful_steps(steps, params))
+        progress.total = input_size(params["input_path"]) * n_scans
+
+    def chunks():
+        scans["count"] += 1
+        if progress is None:
+            return extract_chunks(params["input_path"], chunksize, **input_options(params))
+
+        label = "fit" if state is None else "apply"
+        offset = {"bytes": 0}
+
+        def on_chunk(bytes_read):
+            progress.update(f"{label} pass {scans['count']}", bytes_read - offset["bytes"])
+            offset["bytes"] = bytes_read
+
+        return extract_chunks(params["input_path"], chunksize, on_chunk=on_chunk,
+                              **input_options(params))
+
+    if state is None:
+        with column_pool(workers) as executor:
+            state = fit_pipeline(chunks, steps, params, sketch_k=sketch_k, executor=executor)
+
+    stats = {"chunks": 0, "rows_in": 0, "rows_out": 0}
+
+    # the output replaces the old file only once every chunk is written
+    with (ChunkWriter(params["output_path"], **output_options(params)) if "load" in steps
+          else contextlib.nullcontext()) as writer:
+        for chunk in chunks():
+            stats["chunks"] += 1
+            stats["rows_in"] += len(chunk)
+
+            for step in steps:
+                if step == "extract":
+                    continue
+                elif step == "load":
+                    writer.write(chunk)
+                else:
+                    chunk = apply_step(step, chunk, params, state, inplace=True)
+
+            stats["rows_out"] += len(chunk)
+
+    stats["scans"] = scans["count"]
+    return stats
@@ -1,9 +1,78 @@
+import numpy as np
 import pandas as pd
 
-def handle_missing_values(df: pd.DataFrame,method: str = "drop",fill_value=None) -> pd.DataFrame:
+from .dtypes import numeric_columns
+from .logger import step_logger
+
+logger = step_logger("transform")
+
+MISSING_METHODS = ("drop", "mean", "median", "mode", "constant", "ffill", "bfill")
+# methods whose fill value is a statistic of the column (and can be fitted)
+STAT_METHODS = ("mean", "median", "mode")
+
+
+def column_methods_for(columns, method: str, column_methods=None) -> dict:
+    """
+    Effective imputation method of every column in ``columns``: the
+    ``column_methods`` override when there is one, else ``method``.
+    """
+    column_methods = column_methods or {}
+    for col, col_method in column_methods.items():
+        if col_method not in MISSING_METHODS:
+            raise ValueError(
+                f"Invalid method '{col_method}' for column '{col}'. "
+                f"Choose from: {', '.join(MISSING_METHODS)}"
+            )
+    return {col: column_methods.get(col, method) for col in columns}
+
+
+def mode_value(values: pd.Series):
+    """
+    Most frequent non-missing value of ``values`` (``None`` when all are
+    missing); ties resolve to the smallest, like ``Series.mode``.
+
+    One ``factorize`` pass and a ``bincount`` of the codes instead of a
+    full ``value_counts``.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    codes = codes[codes >= 0]
+    if not len(codes):
+        return None
+    counts = np.bincount(codes, minlength=len(uniques))
+    tied = np.flatnonzero(counts == counts.max())
+    if len(tied) == 1:
+        return uniques[tied[0]]
+    if isinstance(uniques, pd.CategoricalIndex):
+        # in category order
+        return uniques[tied[uniques.codes[tied].argmin()]]
+    try:
+        return uniques[tied].min()
+    except TypeError:
+        # unorderable mixed values: first seen
+        return uniques[tied[0]]
+
+
+def fill_statistic(values: pd.Series, method: str, numeric: bool):
+    """Fill value of one column for a mean / median / mode method (``None``: no fill)."""
+    if method == "mode":
+        return mode_value(values)
+    if not numeric:
+        # mean / median only apply to numeric columns
+        return None
+    value = values.mean() if method == "mean" else values.median()
+    return None if pd.isna(value) else value
+
+
+def handle_missing_values(df: pd.DataFrame,method: str = "drop",fill_value=None,
+                          fill_values=None, inplace: bool = False,
+                          column_methods=None) -> pd.DataFrame:
     """
     Handle missing values using various strategies.
 
+    One null-count pass finds the columns with missing values; fill values
+    are computed and written for those columns only, so the cost follows
+    the missing values rather than the width of the frame.
+
     Parameters
     ----------
     df : DataFrame
@@ -19,6 +88,16 @@ def handle_missing_values(df: pd.DataFrame,method: str = "drop",fill_value=None)
             - "bfill"
     fill_value : Any
         Required when method="constant".
+    fill_values : dict, optional
+        Pre-computed per-column fill values (from ``fit.fit_pipeline``) for
+        the mean / median / mode methods. When given they are used as-is
+        instead of being computed from ``df``.
+    inplace : bool
+        Fill the columns of ``df`` itself instead of returning a new frame.
+    column_methods : dict, optional
+        Per-column ``{column: method}`` overrides of ``method`` (the
+        ``[transform.columns]`` config table). "drop" drops the rows that
+        miss a value in one of the columns using it.
 
     Returns
     -------
@@ -26,51 +105,100 @@ def handle_missing_values(df: pd.DataFrame,method: str = "drop",fill_value=None)
         DataFrame with missing values handled.
     """
 
-    df_clean = df.copy()
-
-    if method == "drop":
-        print("Dropping rows with missing values...")
-        return df_clean.dropna()
+    if method not in MISSING_METHODS:
+        raise ValueError(
+            "Invalid method. Choose from: drop, mean, median, mode, constant, ffill, bfill"
+        )
 
+    null_counts = df.isna().sum()
+    methods = column_methods_for(null_counts.index[null_counts.to_numpy() > 0],
+                                 method, column_methods)
+    if "constant" in methods.values() and fill_value is None:
+        raise ValueError("You must specify fill_value when using method='constant'")
+
+    _log_methods(method, column_methods, fill_values, fill_value)
+
+    # shallow copy: only the filled columns get new data
+    df_clean = df if inplace else df.copy(deep=False)
+    numeric = set(numeric_columns(df)) if fill_values is None else ()
+    drop = []
+    for col, col_method in methods.items():
+        values = df_clean[col]
+        if col_method == "drop":
+            drop.append(col)
+            continue
+        if col_method in STAT_METHODS:
+            value = (fill_values.get(col) if fill_values is not None
+                     else fill_statistic(values, col_method, col in numeric))
+            if value is None:
+                continue
+            filled = fill_with(values, value)
+        elif col_method == "constant":
+            filled = fill_with(values, fill_value)
+        elif col_method == "ffill":
+            filled = values.ffill()
+        else:
+            filled = values.bfill()
+        df_clean[col] = filled
+
+    if drop:
+        if inplace:
+            df_clean.dropna(subset=drop, inplace=True)
+        else:
+            df_clean = df_clean.dropna(subset=drop)
+    return df_clean
+
+
+def _log_methods(method, column_methods, fill_values, fill_value):
+    if fill_values is not None and method in STAT_METHODS:
+        logger.info(f"Filling missing values with fitted {method} values...")
+    elif method == "drop":
+        logger.info("Dropping rows with missing values...")
     elif method == "mean":
-        print("Filling missing numeric values with mean...")
-        return df_clean.fillna(df_clean.mean(numeric_only=True))
-
+        logger.info("Filling missing numeric values with mean...")
     elif method == "median":
-        print("Filling missing numeric values with median...")
-        return df_clean.fillna(df_clean.median(numeric_only=True))
-
+        logger.info("Filling missing numeric values with median...")
     elif method == "mode":
-        print("Filling missing values with mode...")
-        for col in df_clean.columns:
-            if not df_clean[col].isna().sum():
-                continue
-            mode_value = df_clean[col].mode(dropna=True)
-            if not mode_value.empty:
-                df_clean[col] = df_clean[col].fillna(mode_value.iloc[0])
-        return df_clean
-
+        logger.info("Filling missing values with mode...")
     elif method == "constant":
-        if fill_value is None:
-            raise ValueError("You must specify fill_value when using method='constant'")
-        print(f"Filling missing values with constant value: {fill_value}")
-        return df_clean.fillna(fill_value)
-
+        logger.info(f"Filling missing values with constant value: {fill_value}")
     elif method == "ffill":
-        print("Forward-filling missing values...")
-        return df_clean.ffill()
-
-    elif method == "bfill":
-        print("Backward-filling missing values...")
-        return df_clean.bfill()
-
+        logger.info("Forward-filling missing values...")
     else:
-        raise ValueError(
-            "Invalid method. Choose from: drop, mean, median, mode, constant, ffill, bfill"
-        )
-
-
-def transform_data(df: pd.DataFrame, method: str = "drop", fill_value=None) -> pd.DataFrame:
+        logger.info("Backward-filling missing values...")
+    if column_methods:
+        overrides = ", ".join(f"{col}={col_method}" for col, col_method in column_methods.items())
+        logger.info(f"Per-column methods: {overrides}")
+
+
+def fill_with(values: pd.Series, value) -> pd.Series:
+    """``values.fillna(value)``, widening the dtype where ``value`` does not fit."""
+    return _allow_value(values, value).fillna(value)
+
+
+def _allow_value(values: pd.Series, value) -> pd.Series:
+    """Let a ``category`` / ``boolean`` / nullable integer / Arrow string column hold ``value``."""
+    if isinstance(values.dtype, pd.CategoricalDtype) and value not in values.cat.categories:
+        return values.cat.add_categories([value])
+    if isinstance(values.dtype, pd.BooleanDtype) and not isinstance(value, bool):
+        return values.astype(object)
+    if (isinstance(values.dtype, pd.api.extensions.ExtensionDtype)
+            and pd.api.types.is_integer_dtype(values.dtype)
+            and isinstance(value, (float, np.floating)) and not float(value).is_integer()
+            and values.isna().any()):
+        # Int64 rejects a fractional mean, int64[pyarrow] would truncate it
+        return values.astype("double[pyarrow]" if isinstance(values.dtype, pd.ArrowDtype)
+                             else "Float64")
+    if (isinstance(values.dtype, pd.ArrowDtype) and pd.api.types.is_string_dtype(values.dtype)
+            and not isinstance(value, str)):
+        # string[pyarrow] rejects it; the other string dtypes fall back to object
+        return values.astype(object)
+    return values
+
+
+def transform_data(df: pd.DataFrame, method: str = "drop", fill_value=None,
+                   fill_values=None, inplace: bool = False,
+                   column_methods=None) -> pd.DataFrame:
     """
     Apply transformations including missing value handling.
 
@@ -82,6 +210,12 @@ def transform_data(df: pd.DataFrame, method: str = "drop", fill_value=None) -> p
         Missing-value handling strategy.
     fill_value : Any
         Used only for constant fill method.
+    fill_values : dict, optional
+        Fitted per-column fill values, see ``handle_missing_values``.
+    inplace : bool
+        Fill ``df`` itself instead of a copy.
+    column_methods : dict, optional
+        Per-column method overrides, see ``handle_missing_values``.
 
     Returns
     -------
@@ -89,10 +223,11 @@ def transform_data(df: pd.DataFrame, method: str = "drop", fill_value=None) -> p
         Transformed dataframe.
     """
 
-    print("Running transform step...")
+    logger.info("Running transform step...")
 
-    df = handle_missing_values(df, method=method, fill_value=fill_value)
+    df = handle_missing_values(df, method=method, fill_value=fill_value,
+                               fill_values=fill_values, inplace=inplace,
+                               column_methods=column_methods)
 
-    print("✔ Missing value handling done")
+    logger.info("✔ Missing value handling done")
     return df
-
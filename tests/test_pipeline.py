@@ -1,8 +1,33 @@
 import pandas as pd
-from my_pipeline.extract import extract_data
-from my_pipeline.transform import transform_data
-from my_pipeline.load import load_data
+from my_pipeline.extract import extract_data, extract_chunks
+from my_pipeline.transform import transform_data, handle_missing_values
+from my_pipeline.load import ChunkWriter, save_data
+from my_pipeline.stream import stream_pipeline
+from my_pipeline.fit import apply_step, fit_pipeline, fit_frame, read_columns
+from my_pipeline.artifact import save_artifact, load_artifact
+from my_pipeline.progress import StepProgress
+from my_pipeline.profiler import profile_step, profile_session
+from my_pipeline.cache import StepCache, input_key, step_key
+from my_pipeline.cli import cli, merge_params, execute_steps
+from my_pipeline.plan import build_plan
+from click.testing import CliRunner
+import os
+import io
+import json
+import pytest
+from my_pipeline.stats import RunningStats, QuantileSketch, sketch_k_for_error
+from my_pipeline.outliers import remove_outliers
+from my_pipeline.normalize import normalize_data
+from my_pipeline.parallel import column_pool
 from pathlib import Path
+import numpy as np
+import subprocess
+import sys
+from my_pipeline.encode import encode_categorical, encode_label, encode_onehot
+import threading
+import logging
+from my_pipeline.logger import JsonFormatter, configure_logging, flush_logs, step_logger
+from my_pipeline.server import JobRunner, QueueFull, make_server, request
 
 def test_transform_data():
     data = {
@@ -18,3 +43,954 @@ def test_transform_data():
     assert result.isnull().sum().sum() == 0
     return result
 
+
+def test_stream_pipeline_appends_chunks(tmp_path):
+    input_path = tmp_path / "input.csv"
+    output_path = tmp_path / "output.csv"
+    pd.DataFrame({
+        "a": range(10),
+        "b": [None, 1, 2, 3, 4, 5, 6, 7, 8, None],
+    }).to_csv(input_path, index=False)
+
+    params = {
+        "input_path": str(input_path),
+        "output_path": str(output_path),
+        "missing_method": "drop",
+        "fill_value": None,
+    }
+    stats = stream_pipeline(params, ["extract", "transform", "load"], chunksize=3)
+
+    assert stats == {"chunks": 4, "rows_in": 10, "rows_out": 8, "scans": 1}
+    result = extract_data(output_path)
+    assert list(result.columns) == ["a", "b"]
+    assert result["a"].tolist() == list(range(1, 9))
+
+
+def test_row_order_fills_refuse_chunks(tmp_path):
+    input_path = tmp_path / "input.csv"
+    output_path = tmp_path / "output.csv"
+    # chunks of 2 split the NaN run after the first row
+    pd.DataFrame({"a": [1, None, None, 4, None, 6, None, 8]}).to_csv(input_path, index=False)
+    runner = CliRunner()
+    args = ["run", str(input_path), str(output_path), "--missing-method", "ffill",
+            "--no-cache", "--steps", "extract", "--steps", "transform", "--steps", "load"]
+
+    result = runner.invoke(cli, args + ["--chunksize", "2"])
+    assert result.exit_code == 2 and "chunk boundaries" in result.output
+    assert not output_path.exists()
+    params = {"input_path": str(input_path), "output_path": str(output_path),
+              "missing_method": "mean", "missing_column_methods": {"a": "bfill"}}
+    with pytest.raises(ValueError, match="chunk boundaries"):
+        stream_pipeline(params, ["extract", "transform", "load"], chunksize=2)
+
+    result = runner.invoke(cli, args)
+    assert result.exit_code == 0, result.output
+    assert extract_data(output_path)["a"].tolist() == [1, 1, 1, 4, 4, 6, 6, 8]
+
+
+def test_running_stats_merge_matches_numpy():
+    values = np.random.default_rng(0).normal(10, 3, size=10_000)
+    stats = RunningStats()
+    for part in np.array_split(values, 7):
+        stats.merge(RunningStats().update(part))
+
+    assert stats.count == values.size
+    assert np.isclose(stats.mean, values.mean())
+    assert np.isclose(stats.std(), values.std(ddof=1))
+    assert (stats.min, stats.max) == (values.min(), values.max())
+
+
+def test_quantile_sketch_rank_error_is_small():
+    values = np.random.default_rng(0).lognormal(size=200_000)
+    sketch = QuantileSketch(k=512)
+    for part in np.array_split(values, 20):
+        sketch.merge(QuantileSketch(k=512).update(part))
+
+    for q in (0.25, 0.5, 0.75):
+        rank = (values <= sketch.quantile(q)).mean()
+        assert abs(rank - q) < 0.01
+
+
+def test_stream_pipeline_uses_global_statistics(tmp_path):
+    input_path = tmp_path / "input.csv"
+    output_path = tmp_path / "output.csv"
+    rng = np.random.default_rng(0)
+    pd.DataFrame({
+        "price": rng.normal(100, 20, size=200),
+        "area": np.where(rng.random(200) < 0.1, np.nan, rng.normal(50, 5, size=200)),
+        "furnished": rng.choice(["yes", "no", "semi"], size=200),
+    }).to_csv(input_path, index=False)
+
+    params = {
+        "input_path": str(input_path),
+        "output_path": str(output_path),
+        "missing_method": "mean",
+        "fill_value": None,
+        "outlier_method": "zscore",
+        "threshold": 2.0,
+        "normalize_method": "zscore",
+        "encode_method": "target",
+        "target_column": "price",
+    }
+    steps = ["extract", "transform", "outliers", "normalize", "encode", "load"]
+    stream_pipeline(params, steps, chunksize=17)
+
+    # same as the eager steps on the whole frame at once
+    expected = transform_data(extract_data(input_path), method="mean")
+    expected = remove_outliers(expected, method="zscore", threshold=2.0)
+    expected = normalize_data(expected, method="zscore")
+    expected = encode_categorical(expected, method="target", target_column="price")
+
+    result = extract_data(output_path)
+    assert len(result) == len(expected)
+    assert np.allclose(result.to_numpy(), expected.to_numpy(dtype="float64"))
+
+
+def test_artifact_round_trip_reproduces_fit(tmp_path):
+    train = pd.DataFrame({
+        "price": [100.0, 120.0, None, 90.0, 300.0, 110.0],
+        "area": [50, 60, 55, None, 58, 52],
+        "furnished": ["yes", "no", "yes", None, "no", "yes"],
+    })
+    params = {
+        "missing_method": "median",
+        "fill_value": None,
+        "outlier_method": "zscore",
+        "threshold": 3.0,
+        "normalize_method": "robust",
+        "encode_method": "label",
+        "target_column": None,
+    }
+    steps = ["extract", "transform", "outliers", "normalize", "encode", "load"]
+    state, fitted = fit_frame(train, steps, params)
+
+    artifact_path = tmp_path / "artifact.json"
+    save_artifact(state, steps, params, artifact_path)
+    artifact = load_artifact(artifact_path)
+
+    assert artifact["steps"] == steps
+    assert {key: artifact["params"][key] for key in params} == params
+
+    result = train
+    for step in steps[1:-1]:
+        result = apply_step(step, result, artifact["params"], artifact["state"])
+    pd.testing.assert_frame_equal(result, fitted, check_dtype=False)
+
+
+def test_step_progress_is_throttled_and_silent_without_tty(capsys):
+    progress = StepProgress(total=1000, unit="rows", enabled=True, min_interval=60)
+    for _ in range(1000):
+        progress.update("encode")
+    # first and final redraw only
+    assert capsys.readouterr().out.count("\r") == 2
+
+    quiet = StepProgress(total=3)  # stdout is captured, i.e. not a TTY
+    for step in ("extract", "transform", "load"):
+        quiet.update(step)
+    quiet.finish()
+    assert quiet.current == 3
+    assert capsys.readouterr().out == ""
+
+
+def test_stream_pipeline_reports_bytes_read(tmp_path):
+    input_path = tmp_path / "input.csv"
+    pd.DataFrame({"a": range(1000)}).to_csv(input_path, index=False)
+    params = {"input_path": str(input_path), "output_path": str(tmp_path / "out.csv")}
+
+    progress = StepProgress(total=0, unit="bytes", enabled=False)
+    stream_pipeline(params, ["extract", "load"], chunksize=100, progress=progress)
+
+    assert progress.total == input_path.stat().st_size
+    assert progress.current == progress.total
+
+
+def test_step_cache_keys_and_lru_eviction(tmp_path):
+    input_path = tmp_path / "input.csv"
+    input_path.write_text("a\n1\n")
+    params = {"missing_method": "mean", "fill_value": None}
+
+    base = input_key(input_path)
+    assert step_key(base, "transform", params) == step_key(base, "transform", dict(params))
+    assert step_key(base, "transform", params) != step_key(base, "transform", {"missing_method": "median"})
+    assert input_key(input_path, "content") == input_key(input_path, "content")
+
+    df = pd.DataFrame({"a": np.arange(1000, dtype="float64")})
+    cache = StepCache(tmp_path / "cache", max_bytes=10**9)
+    for key in ("k1", "k2", "k3"):
+        cache.put(key, df)
+    pd.testing.assert_frame_equal(cache.get("k2"), df)
+
+    # k1 is the least recently used entry; a budget for two entries drops it
+    entry_size = max(p.stat().st_size for p in (tmp_path / "cache").iterdir())
+    os.utime(next((tmp_path / "cache").glob("k1.*")), (0, 0))
+    cache.max_bytes = 2 * entry_size
+    cache.evict()
+    assert "k1" not in cache and "k2" in cache and "k3" in cache
+
+    # concurrent writers of one key (parallel runs on the same input) do not collide
+    errors = []
+
+    def put():
+        try:
+            for _ in range(5):
+                cache.put("k4", df)
+        except Exception as e:
+            errors.append(e)
+
+    writers = [threading.Thread(target=put) for _ in range(4)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+    assert not errors
+    pd.testing.assert_frame_equal(cache.get("k4"), df)
+    assert not list((tmp_path / "cache").glob("*.tmp"))
+    assert cache.get("missing") is None
+
+
+def test_run_all_resumes_from_cached_prefix(tmp_path):
+    input_path = tmp_path / "input.csv"
+    pd.DataFrame({"price": [1.0, 2.0, None, 4.0], "city": ["a", "b", "a", None]}).to_csv(input_path, index=False)
+    config_path = tmp_path / "settings.toml"
+    config_path.write_text(f'''
+[extract]
+input_path = "{input_path}"
+[transform]
+method = "mean"
+[outliers]
+method = "zscore"
+threshold = 3.0
+[load]
+output_path = "{tmp_path / 'out.csv'}"
+[cache]
+dir = "{tmp_path / 'cache'}"
+''')
+
+    runner = CliRunner()
+    first = runner.invoke(cli, ["run-all", "-c", str(config_path)])
+    assert first.exit_code == 0, first.output
+    expected = (tmp_path / "out.csv").read_text()
+
+    second = runner.invoke(cli, ["run-all", "-c", str(config_path)])
+    assert "Resuming from cached 'encode' output" in second.output
+    assert (tmp_path / "out.csv").read_text() == expected
+
+    # normalize and label encoding ran as one fused node, so the last cached prefix is outliers
+    changed = runner.invoke(cli, ["run-all", "-c", str(config_path), "--encode-method", "onehot"])
+    assert "Resuming from cached 'outliers' output" in changed.output
+
+    cleared = runner.invoke(cli, ["cache", "clear", "-c", str(config_path)])
+    assert cleared.exit_code == 0
+    assert not (tmp_path / "cache").exists()
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet", ".feather", ".arrow"])
+def test_columnar_round_trip_with_projection_and_filters(tmp_path, suffix):
+    if suffix != ".csv":
+        pytest.importorskip("pyarrow")
+    df = pd.DataFrame({
+        "price": [10.0, 20.0, 30.0, 40.0],
+        "area": [1, 2, 3, 4],
+        "city": ["a", "b", "a", "c"],
+    })
+    path = tmp_path / f"data{suffix}"
+    save_data(df, path, compression="zstd" if suffix != ".csv" else None)
+
+    result = extract_data(path, columns=["price", "city"], filters=[("price", ">", 15.0)])
+    assert list(result.columns) == ["price", "city"]
+    assert result["price"].tolist() == [20.0, 30.0, 40.0]
+    # a filter may refer to a column outside the projection
+    result = extract_data(path, columns=["area"], filters=[("price", ">", 15.0)])
+    assert list(result.columns) == ["area"] and result["area"].tolist() == [2, 3, 4]
+
+    chunks = list(extract_chunks(path, chunksize=3, columns=["area"]))
+    assert [len(chunk) for chunk in chunks] == [3, 1]
+    assert pd.concat(chunks)["area"].tolist() == [1, 2, 3, 4]
+
+
+def test_remove_outliers_single_mask_and_threshold():
+    df = pd.DataFrame({
+        "a": [1.0, 2.0, 3.0, 4.0, 100.0, 5.0, 6.0, 3.0],
+        "b": [10.0, 11.0, 12.0, 13.0, 14.0, 15.0, 16.0, -50.0],
+        "c": ["x"] * 8,
+    })
+
+    joint = remove_outliers(df, method="iqr")
+    assert joint.index.tolist() == [0, 1, 2, 3, 5, 6]
+
+    # bounds are computed on the full frame, so column order doesn't matter
+    swapped = remove_outliers(df[["b", "a", "c"]], method="iqr")
+    assert swapped.index.tolist() == joint.index.tolist()
+
+    # the IQR multiplier is configurable (was hardcoded to 1.5)
+    assert len(remove_outliers(df, method="iqr", threshold=100)) == len(df)
+    # --threshold 0 overrides the config instead of falling back to it
+    config = {"outliers": {"threshold": 2.0}}
+    assert merge_params({"threshold": 0.0}, config)["threshold"] == 0.0
+    assert merge_params({}, config)["threshold"] == 2.0
+
+    sequential = remove_outliers(df, method="zscore", threshold=1.5, sequential=True)
+    assert sequential.index.tolist() == [0, 1, 2, 3, 5, 6]
+
+
+def test_normalize_data_all_numeric_dtypes_and_constant_columns():
+    df = pd.DataFrame({
+        "small": np.array([1, 2, 3, 5], dtype="int16"),
+        "const": [7.0, 7.0, 7.0, 7.0],
+        "count": np.array([0, 0, 1, 0], dtype="uint8"),
+        "city": ["a", "b", "c", "d"],
+    })
+    original = df.copy()
+
+    for method in ("minmax", "zscore", "robust"):
+        result = normalize_data(df, method=method)
+        assert np.isfinite(result[["small", "const", "count"]].to_numpy()).all()
+        assert (result["const"] == 0).all()
+    pd.testing.assert_frame_equal(df, original)
+
+    result = normalize_data(df, method="minmax", dtype="float32")
+    assert result["small"].dtype == np.float32
+    assert result["small"].tolist() == [0.0, 0.25, 0.5, 1.0]
+
+    same = normalize_data(df, method="minmax", inplace=True)
+    assert same is df
+    assert df["small"].tolist() == [0.0, 0.25, 0.5, 1.0]
+
+
+def test_onehot_sparse_capped_and_hashing():
+    df = pd.DataFrame({
+        "city": ["a", "a", "a", "b", "b", "c", "d", None],
+        "price": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0],
+    })
+    params = {"encode_method": "onehot", "target_column": None,
+              "encode_sparse": True, "encode_max_categories": 2}
+
+    state, dense = fit_frame(df, ["encode"], {**params, "encode_sparse": False})
+    assert state["encode"]["mappings"]["city"] == ["a", "b", "__other__"]
+    assert dense.columns.tolist() == ["price", "city_a", "city_b", "city___other__"]
+    assert dense["city___other__"].tolist() == [0, 0, 0, 0, 0, 1, 1, 0]
+
+    # a real "other" level is kept apart from the cap bucket
+    real = encode_onehot(pd.DataFrame({"c": ["other"] * 5 + ["a"] * 3 + ["b", "d"]}),
+                         max_categories=2)
+    assert real.columns.tolist() == ["c_a", "c_other", "c___other__"]
+    assert real["c___other__"].sum() == 2 and real["c_other"].sum() == 5
+    # uncapped, a value unseen at fit time is not folded into "other"
+    fitted = encode_onehot(pd.DataFrame({"c": ["other", "e"]}), categories={"c": ["a", "other"]})
+    assert fitted["c_other"].tolist() == [1, 0]
+
+    sparse = apply_step("encode", df, params, state)
+    assert isinstance(sparse["city_a"].dtype, pd.SparseDtype)
+    for col in dense.columns[1:]:
+        assert sparse[col].sparse.to_dense().tolist() == dense[col].tolist()
+
+    hashed = apply_step("encode", df, {"encode_method": "hashing", "target_column": None,
+                                       "encode_n_features": 4}, None)
+    assert [c for c in hashed.columns if c.startswith("city_")] == [f"city_h{i}" for i in range(4)]
+    rows = hashed.filter(like="city_").to_numpy()
+    assert rows[:7].sum(axis=1).tolist() == [1] * 7 and rows[7].sum() == 0
+    assert (rows[0] == rows[1]).all()
+
+
+def test_column_parallel_fit_matches_serial():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "a": rng.normal(size=500),
+        "b": rng.integers(0, 50, size=500),
+        "c": rng.exponential(size=500).astype("float32"),
+        "city": rng.choice(["x", "y", "z"], size=500),
+        "kind": rng.choice(["p", "q"], size=500),
+        "price": rng.normal(100, 10, size=500),
+    })
+    df.loc[::7, "a"] = np.nan
+    params = {"missing_method": "median", "fill_value": None,
+              "outlier_method": "iqr", "threshold": 1.5,
+              "normalize_method": "robust",
+              "encode_method": "target", "target_column": "price"}
+    steps = ["transform", "outliers", "normalize", "encode"]
+
+    serial, expected = fit_frame(df, steps, params)
+    with column_pool(2) as pool:
+        assert pool.workers == 2
+        parallel, result = fit_frame(df, steps, params, executor=pool)
+        chunked = fit_pipeline(lambda: iter([df]), steps, params, sketch_k=None,
+                               executor=pool)
+
+    assert parallel == serial == chunked
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_directory_input_runs_partitioned(tmp_path):
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({
+        "price": rng.normal(100, 20, size=300).round(2),
+        "area": rng.integers(500, 5000, size=300),
+        "city": rng.choice(["x", "y", "z"], size=300),
+    })
+    df.loc[::11, "area"] = np.nan
+    shards = tmp_path / "raw"
+    shards.mkdir()
+    for i in range(3):
+        df.iloc[i * 100:(i + 1) * 100].to_csv(shards / f"day-{i}.csv", index=False)
+    df.to_csv(tmp_path / "all.csv", index=False)
+
+    pd.testing.assert_frame_equal(extract_data(shards), pd.read_csv(tmp_path / "all.csv"))
+    assert len(list(extract_chunks(str(shards / "day-*.csv"), 40))) == 9
+
+    runner = CliRunner()
+    base = ["--missing-method", "mean", "--outlier-method", "zscore",
+            "--encode-method", "onehot", "--no-cache", "--workers", "1"]
+    for source, target in ((str(shards / "*.csv"), tmp_path / "merged.csv"),
+                           (str(tmp_path / "all.csv"), tmp_path / "single.csv"),
+                           (str(shards), tmp_path / "parts")):
+        result = runner.invoke(cli, ["run-all", source, str(target)] + base)
+        assert result.exit_code == 0, result.output
+
+    expected = pd.read_csv(tmp_path / "single.csv")
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / "merged.csv"), expected)
+    parts = sorted(p.name for p in (tmp_path / "parts").iterdir())
+    assert parts == ["part-00000-day-0.csv", "part-00001-day-1.csv", "part-00002-day-2.csv"]
+    pd.testing.assert_frame_equal(extract_data(tmp_path / "parts"), expected)
+
+    # shards are submitted at most a window ahead of the one being written
+    from concurrent.futures import ThreadPoolExecutor
+    from my_pipeline.partition import _map_bounded
+    submitted = []
+    with ThreadPoolExecutor(2) as executor:
+        submit = executor.submit
+        executor.submit = lambda *args: submitted.append(args) or submit(*args)
+        for i, square in enumerate(_map_bounded(executor, 4, lambda x: x * x, range(10))):
+            assert square == i * i and len(submitted) <= i + 4
+
+
+def test_profile_session_writes_chrome_trace(tmp_path):
+    df = pd.DataFrame({"a": [1.0, 2.0, None, 4.0], "b": ["x", "y", "z", "w"]})
+    trace_path = tmp_path / "trace.json"
+
+    with profile_session(trace_path, tmp_path / "prof"):
+        out = profile_step("Transform data", transform_data, df)
+        profile_step("Load data", save_data, out, tmp_path / "out.csv")
+
+    trace = json.loads(trace_path.read_text())
+    first, load = trace["steps"]
+    assert [e["name"] for e in trace["traceEvents"]] == ["Transform data", "Load data"]
+    assert trace["traceEvents"][0]["ph"] == "X"
+    assert (first["rows_in"], first["rows_out"], first["cols_in"]) == (4, 3, 2)
+    assert first["wall_s"] > 0 and first["rows_per_s"] > 0
+    assert "alloc_peak_mb" in first and "peak_rss_mb" in first
+    assert load["rows_in"] == 3 and load["rows_out"] is None
+    assert sorted(p.name for p in (tmp_path / "prof").iterdir()) == \
+        ["00-transform-data.prof", "01-load-data.prof"]
+
+
+def test_optimize_dtypes_shrinks_frame_and_steps_still_apply(tmp_path):
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame({
+        "price": rng.integers(1_000_000, 9_000_000, size=400),
+        "area": rng.integers(1500, 9000, size=400).astype(float),
+        "stories": rng.integers(1, 5, size=400),
+        "mainroad": rng.choice(["yes", "no"], size=400),
+        "status": rng.choice(["furnished", "unfurnished"], size=400),
+    })
+    df.loc[::13, "area"] = np.nan
+    df.loc[::17, "status"] = None
+    input_path = tmp_path / "input.csv"
+    df.to_csv(input_path, index=False)
+
+    raw = extract_data(input_path)
+    small = extract_data(input_path, optimize=True)
+    assert str(small["price"].dtype) == "uint32"
+    assert str(small["stories"].dtype) == "uint8"
+    assert str(small["area"].dtype) == "float32"
+    assert str(small["mainroad"].dtype) == "boolean"
+    assert isinstance(small["status"].dtype, pd.CategoricalDtype)
+    assert raw.memory_usage(deep=True).sum() > 3 * small.memory_usage(deep=True).sum()
+
+    # every step still finds the downcast / category / boolean columns
+    params = merge_params({"missing_method": "mean", "outlier_method": "iqr",
+                           "normalize_method": "zscore", "encode_method": "target",
+                           "target_column": "price"}, {})
+    outputs = []
+    for frame in (raw, small):
+        for step in ("transform", "outliers", "normalize", "encode"):
+            frame = apply_step(step, frame, params)
+        outputs.append(frame)
+    expected, result = outputs
+    assert result.dtypes.map(lambda dtype: dtype.kind).eq("f").all()
+    np.testing.assert_allclose(result.to_numpy(float), expected.to_numpy(float),
+                               rtol=1e-4, atol=1e-6)
+
+    chunks = list(extract_chunks(input_path, 150, optimize=True))
+    assert [str(chunk["mainroad"].dtype) for chunk in chunks] == ["boolean"] * 3
+    assert all(isinstance(chunk["status"].dtype, pd.CategoricalDtype) for chunk in chunks)
+
+
+def test_plan_fuses_pushes_down_and_matches_eager_steps(tmp_path):
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame({
+        "price": rng.normal(100, 20, size=300),
+        "area": rng.normal(50, 10, size=300),
+        "city": rng.choice(["x", "y", "z"], size=300),
+    })
+    df.loc[::9, "area"] = np.nan
+    df.loc[::11, "city"] = None
+    input_path = tmp_path / "input.csv"
+    df.to_csv(input_path, index=False)
+
+    steps = ["transform", "encode", "outliers", "normalize", "load", "normalize"]
+    params = merge_params({"input_path": str(input_path), "output_path": str(tmp_path / "out.csv"),
+                           "missing_method": "median", "normalize_method": "zscore",
+                           "outlier_method": "iqr", "encode_method": "onehot",
+                           "no_cache": True}, {})
+    plan = build_plan(params, steps)
+    assert [(node.op, node.steps) for node in plan.nodes] == [
+        ("scan", ["extract"]), ("step", ["transform"]), ("step", ["outliers"]),
+        ("step", ["encode"]), ("step", ["normalize"]), ("load", ["load"])]
+    assert plan.nodes[2].prefit == ["encode"]
+    assert plan.dropped == [(5, "runs after the last load")]
+
+    # bounds on raw values round differently: a filter stays after normalize
+    rescaled = build_plan(params, ["normalize", "outliers"])
+    assert [node.steps for node in rescaled.nodes] == [["extract"], ["normalize"], ["outliers"]]
+    edges = tmp_path / "edges.csv"
+    pd.DataFrame({"a": [10, 19, 8, 0, 4, 2, 15, 9, 3, 19, 4, 2, 1, 6, 5, 3]}).to_csv(edges, index=False)
+    for method in ("minmax", "zscore"):
+        edge_params = {**params, "input_path": str(edges), "normalize_method": method}
+        expected = pd.read_csv(edges)
+        for step in ("normalize", "outliers"):
+            expected = apply_step(step, expected, edge_params)
+        assert len(execute_steps(edge_params, ["normalize", "outliers"])) == len(expected) == 14
+
+    params["encode_method"] = "label"
+    fused = build_plan(params, ["transform", "normalize", "encode"])
+    assert [node.op for node in fused.nodes] == ["scan", "fused"]
+
+    for method in ("onehot", "label"):
+        params["encode_method"] = method
+        expected = pd.read_csv(input_path)
+        for step in steps[:4]:
+            expected = apply_step(step, expected, params)
+        result = execute_steps(params, steps)
+        pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=1e-9)
+
+    result = CliRunner().invoke(cli, ["explain", str(input_path), "--missing-method", "mean",
+                                      "--steps", "transform",
+                                      "--steps", "normalize", "--steps", "encode"])
+    assert result.exit_code == 0, result.output
+    assert "fused    transform[" in result.output
+    # approximate quantiles are fitted with sketches, outside the fused pass
+    result = CliRunner().invoke(cli, ["explain", str(input_path), "--missing-method", "median",
+                                      "--quantile-error", "0.01", "--steps", "transform",
+                                      "--steps", "normalize"])
+    assert result.exit_code == 0, result.output
+    assert "fused" not in result.output and "step     transform[median]" in result.output
+
+
+def test_incremental_run_appends_only_new_rows(tmp_path):
+    rng = np.random.default_rng(4)
+
+    def rows(n, shift=0.0):
+        return pd.DataFrame({"price": rng.normal(100 + shift, 10, size=n).round(2),
+                             "city": rng.choice(["x", "y"], size=n)})
+
+    input_path, output_path = tmp_path / "input.csv", tmp_path / "out.csv"
+    rows(100).to_csv(input_path, index=False)
+    args = ["run-all", str(input_path), str(output_path), "--incremental", "--no-cache",
+            "--missing-method", "mean", "--outlier-method", "zscore", "--threshold", "3"]
+    runner = CliRunner()
+
+    first = runner.invoke(cli, args)
+    assert first.exit_code == 0, first.output
+    assert "Full run (no previous run)" in first.output
+    state = load_artifact(tmp_path / "out.csv.state.json")
+    assert state["watermark"]["offset"] == os.path.getsize(input_path)
+    assert "No new rows" in runner.invoke(cli, args).output
+
+    # new rows are transformed with the stored state; a partial last line waits
+    before = pd.read_csv(output_path)
+    rows(20).to_csv(input_path, mode="a", header=False, index=False)
+    with open(input_path, "a") as f:
+        f.write("101.0,x\n99.")
+    appended = runner.invoke(cli, args)
+    assert "Appended" in appended.output and "21 new rows" in appended.output
+    out = pd.read_csv(output_path)
+    assert len(out) > len(before)
+    pd.testing.assert_frame_equal(out.iloc[:len(before)], before)
+    scaling = state["state"]["normalize"]["scaling"]["price"]
+    assert out["price"].iloc[-1] == pytest.approx((101.0 - scaling[0]) / scaling[1])
+
+    with open(input_path, "a") as f:
+        f.write("5,y\n")
+    rows(40, shift=50).to_csv(input_path, mode="a", header=False, index=False)
+    drifted = runner.invoke(cli, args)
+    assert "Full run (drift: price mean moved" in drifted.output
+    assert "Full run (refit requested)" in runner.invoke(cli, args + ["--refit"]).output
+
+    # rows read with other [extract] settings would not fit under the output header
+    config = tmp_path / "columns.toml"
+    config.write_text('[extract]\ncolumns = ["price"]\n')
+    rows(5).to_csv(input_path, mode="a", header=False, index=False)
+    narrowed = runner.invoke(cli, args + ["--config", str(config)])
+    assert "Full run (read settings changed)" in narrowed.output, narrowed.output
+    assert list(pd.read_csv(output_path).columns) == ["price"]
+
+
+def test_cli_import_is_lazy_and_label_encoding_needs_no_sklearn(tmp_path):
+    code = ("import sys, my_pipeline, my_pipeline.cli; "
+            "print(' '.join(m for m in ('pandas', 'numpy', 'sklearn') if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, check=True,
+                         capture_output=True, text=True).stdout
+    assert out.split() == []
+    assert not (tmp_path / "logs").exists()
+
+    # codes follow the sorted labels with missing values last, as LabelEncoder did
+    df = pd.DataFrame({"city": ["b", "a", None, "c", "a"],
+                       "size": pd.Series(["m", "s", None, "m", "l"], dtype="category")})
+    encoded = encode_label(df)
+    assert encoded["city"].tolist() == [1, 0, 3, 2, 0]
+    assert encoded["size"].tolist() == [1, 2, 3, 1, 0]
+    # also after texts sorting behind "nan", or the text "nan" itself
+    assert encode_label(pd.DataFrame({"c": ["z", "a", None, "nan"]}))["c"].tolist() == [2, 0, 3, 1]
+
+
+def test_server_runs_jobs_with_status_and_backpressure(tmp_path):
+    pd.DataFrame({"price": [1.0, None, 3.0, 4.0], "city": ["a", "b", "a", None]}).to_csv(
+        tmp_path / "in.csv", index=False)
+    runner = JobRunner(jobs=1, queue_size=4).start()
+    server = make_server(runner, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    address = {"port": server.server_address[1]}
+    try:
+        job = {"input_path": str(tmp_path / "in.csv"), "output_path": str(tmp_path / "out.csv"),
+               "steps": ["extract", "transform", "encode", "load"],
+               "params": {"missing_method": "mean", "no_cache": True}}
+        code, body = request("POST", "/jobs", job, **address)
+        assert code == 202 and body["status"] in ("queued", "running", "done")
+        for wait in ("abc", "-1", "nan"):
+            code, error = request("GET", f"/jobs/{body['id']}?wait={wait}", **address)
+            assert code == 400 and "invalid wait" in error["error"]
+        code, body = request("GET", f"/jobs/{body['id']}?wait=30", **address)
+        assert body["status"] == "done" and body["run_s"] >= 0
+        out = pd.read_csv(tmp_path / "out.csv")
+        assert out["price"].tolist() == [1.0, 8 / 3, 3.0, 4.0]
+        assert out["city"].tolist() == [0, 1, 0, 2]
+
+        code, body = request("POST", "/jobs", {**job, "params": {"bogus": 1}}, **address)
+        assert code == 400
+        code, body = request("POST", "/jobs", {**job, "input_path": str(tmp_path / "missing.csv")},
+                             **address)
+        code, body = request("GET", f"/jobs/{body['id']}?wait=30", **address)
+        assert body["status"] == "failed" and "missing.csv" in body["error"]
+        code, body = request("GET", "/status", **address)
+        assert body["jobs"] == {"done": 1, "failed": 1}
+    finally:
+        server.shutdown()
+        server.server_close()
+        runner.shutdown()
+
+    # no workers taking jobs: the queue fills up and submissions are refused
+    idle = JobRunner(queue_size=1)
+    idle.submit(job)
+    with pytest.raises(QueueFull):
+        idle.submit(job)
+
+
+def test_server_runs_duplicate_jobs_concurrently_with_the_cache(tmp_path):
+    rng = np.random.default_rng(6)
+    pd.DataFrame({"price": rng.normal(100, 10, size=20_000),
+                  "city": rng.choice(["a", "b", "c"], size=20_000)}).to_csv(
+        tmp_path / "in.csv", index=False)
+    config_path = tmp_path / "settings.toml"
+    config_path.write_text(f'''
+[transform]
+method = "mean"
+[outliers]
+method = "iqr"
+[cache]
+dir = "{tmp_path / 'cache'}"
+''')
+    runner = JobRunner(config_path=str(config_path), jobs=4, queue_size=16).start()
+    try:
+        job = {"input_path": str(tmp_path / "in.csv"), "output_path": str(tmp_path / "out.csv"),
+               "steps": ["extract", "transform", "outliers", "normalize", "encode", "load"]}
+        for _ in range(3):
+            jobs = [runner.submit(job) for _ in range(4)]
+            for submitted in jobs:
+                assert submitted.done.wait(60)
+            assert [j.status for j in jobs] == ["done"] * 4, [j.error for j in jobs]
+    finally:
+        runner.shutdown()
+    assert len(pd.read_csv(tmp_path / "out.csv")) > 19_000
+    assert not list((tmp_path / "cache").glob("*.tmp"))
+
+
+def test_quantile_error_bounds_sketches_and_approximate_runs(tmp_path):
+    rng = np.random.default_rng(3)
+    values = rng.lognormal(size=200_000)
+    k = sketch_k_for_error(0.01)
+
+    # two partitions sketched apart, shipped as JSON and merged
+    halves = [QuantileSketch(k, seed=i).update(part) for i, part in enumerate(np.split(values, 2))]
+    merged = QuantileSketch.from_dict(json.loads(json.dumps(halves[0].to_dict())))
+    merged.merge(QuantileSketch.from_dict(json.loads(json.dumps(halves[1].to_dict()))))
+    assert merged.count == values.size and 0 < merged.error_bound <= 0.01
+    assert sum(level.size for level in merged.levels) < 3 * k
+    ordered = np.sort(values)
+    for q in (0.1, 0.25, 0.5, 0.75, 0.9):
+        rank = np.searchsorted(ordered, merged.quantile(q), side="right") / values.size
+        assert abs(rank - q) <= 0.01
+
+    pd.DataFrame({"x": values, "y": rng.normal(size=values.size)}).to_csv(
+        tmp_path / "in.csv", index=False)
+    steps = ["extract", "outliers", "normalize"]
+    runs = {}
+    for error in (None, 0.001):
+        params = merge_params({"input_path": str(tmp_path / "in.csv"), "no_cache": True,
+                               "outlier_method": "iqr", "normalize_method": "robust",
+                               "quantile_error": error}, {})
+        runs[error] = execute_steps(params, steps)
+    # sketched quantiles are fitted per step, so median imputation and robust scaling no longer fuse
+    fill_then_scale = ["extract", "transform", "normalize"]
+    for error, fused in ((None, True), (0.001, False)):
+        plan_params = {**params, "missing_method": "median", "quantile_error": error}
+        assert ("fused" in build_plan(plan_params, fill_then_scale).explain(plan_params)) == fused
+    assert abs(len(runs[0.001]) - len(runs[None])) < 0.005 * values.size
+    assert abs(runs[0.001]["y"].median()) < 0.02
+
+
+def test_step_logs_are_queued_structured_and_leveled():
+    logger = step_logger("normalize")
+    backend = logger.logger.handlers[0]
+    assert isinstance(backend, logging.handlers.QueueHandler) and not logger.logger.propagate
+
+    record = logger.logger.makeRecord("Steps", logging.INFO, __file__, 1, "scaled %d columns",
+                                      (3,), None, extra={"step": "normalize", "duration_s": 0.5})
+    line = json.loads(JsonFormatter().format(backend.prepare(record)))
+    assert line["message"] == "scaled 3 columns"
+    assert (line["level"], line["logger"], line["step"], line["duration_s"]) == (
+        "INFO", "Steps", "normalize", 0.5)
+
+    try:
+        configure_logging("WARNING")
+        assert not logger.isEnabledFor(logging.INFO) and logger.isEnabledFor(logging.WARNING)
+    finally:
+        configure_logging("INFO")
+    logger.info("queued")
+    flush_logs()
+    assert backend.queue.empty()
+
+
+def test_missing_values_only_touch_null_columns_with_overrides():
+    df = pd.DataFrame({
+        "a": [1.0, None, 3.0, 10.0],
+        "b": [1, 2, 3, 4],
+        "c": pd.Series(["x", None, "y", "y"], dtype="category"),
+        "d": ["p", "q", None, "q"],
+        "e": [5.0, 6.0, None, 8.0],
+    })
+    original = df.copy()
+
+    mode = handle_missing_values(df, method="mode")
+    assert mode["c"].tolist() == ["x", "y", "y", "y"] and mode["d"].tolist() == ["p", "q", "q", "q"]
+    # the input is untouched and columns without nulls keep sharing their data
+    pd.testing.assert_frame_equal(df, original)
+    assert np.shares_memory(mode["b"].to_numpy(), df["b"].to_numpy())
+
+    overrides = {"a": "median", "c": "mode", "e": "drop"}
+    result = handle_missing_values(df, method="constant", fill_value="z", column_methods=overrides)
+    assert result.index.tolist() == [0, 1, 3]
+    assert result["a"].tolist() == [1.0, 3.0, 10.0] and result["d"].tolist() == ["p", "q", "q"]
+
+    # fitted fill values follow the same per-column methods
+    params = {"missing_method": "constant", "fill_value": "z", "missing_column_methods": overrides}
+    state, fitted = fit_frame(df, ["transform"], params)
+    assert state["transform"]["fill_values"] == {"a": 3.0, "c": "y"}
+    pd.testing.assert_frame_equal(fitted, result)
+
+    inplace = df.copy()
+    assert handle_missing_values(inplace, method="mean", inplace=True) is inplace
+    assert inplace["a"].tolist()[1] == pytest.approx(14 / 3) and inplace["d"].hasnans
+    with pytest.raises(ValueError):
+        handle_missing_values(df, method="mean", column_methods={"a": "average"})
+
+
+def test_csv_reader_engines_window_and_projection(tmp_path):
+    body = "id,price,city\n1,10.5,a\n2,,b\n3,30.0,a\n4,40.0,c\n"
+    path = tmp_path / "report.csv"
+    path.write_text(body + "TOTAL,80.5,\nrows,4,\n")
+    expected = pd.read_csv(io.StringIO(body))
+
+    for engine in ("c", "pyarrow", "python"):
+        for memory_map in (False, True):
+            df = extract_data(path, csv_options={"engine": engine, "memory_map": memory_map,
+                                                 "skipfooter": 2})
+            pd.testing.assert_frame_equal(df, expected, check_dtype=engine != "pyarrow")
+    # the footer never reaches the parser, so the columns keep their types
+    assert extract_data(path, csv_options={"skipfooter": 2})["id"].dtype == np.int64
+
+    head = extract_data(path, csv_options={"engine": "pyarrow", "nrows": 2})
+    assert head["id"].tolist() == [1, 2]
+    arrow = extract_data(path, csv_options={"engine": "pyarrow", "dtype_backend": "pyarrow",
+                                            "skipfooter": 2})
+    assert all(isinstance(dtype, pd.ArrowDtype) for dtype in arrow.dtypes)
+    assert arrow["id"].dtype == "int64[pyarrow]" and arrow["price"].isna().sum() == 1
+
+    chunks = list(extract_chunks(path, 3, csv_options={"skipfooter": 2, "engine": "pyarrow"},
+                                 columns=["price"], filters=[("city", "==", "a")]))
+    assert pd.concat(chunks).columns.tolist() == ["price"]
+    assert pd.concat(chunks)["price"].tolist() == [10.5, 30.0]
+
+    # a projection keeps the columns the steps refer to by name
+    params = {"columns": ["price"], "encode_method": "target", "target_column": "id"}
+    assert read_columns(["transform", "encode"], params) == ["price", "id"]
+    assert read_columns(["transform"], params) == ["price"]
+    assert read_columns(["encode"], {**params, "columns": None}) is None
+    with pytest.raises(ValueError):
+        extract_data(path, csv_options={"engine": "fast"})
+
+    # every backend runs the steps on integer columns with missing values
+    data = tmp_path / "gaps.csv"
+    pd.DataFrame({"area": [1, None, 2, 4, None, 50, 3],
+                  "city": ["a", "b", None, "a", "b", "a", "c"]}).to_csv(data, index=False)
+    results = {}
+    for backend in ("numpy", "numpy_nullable", "pyarrow"):
+        for method in ("mean", "constant"):
+            params = merge_params({"input_path": str(data), "missing_method": method,
+                                   "fill_value": 0.5, "outlier_method": "iqr",
+                                   "normalize_method": "minmax", "no_cache": True},
+                                  {"extract": {"dtype_backend": backend}})
+            df = execute_steps(params, ["transform", "outliers", "normalize"])
+            results[backend, method] = df["area"].astype("float64").tolist()
+    for method in ("mean", "constant"):
+        assert results["numpy_nullable", method] == results["pyarrow", method] \
+            == pytest.approx(results["numpy", method])
+
+
+def test_chunk_writer_is_atomic_and_streams_parquet(tmp_path):
+    input_path = tmp_path / "input.csv"
+    pd.DataFrame({"a": range(10), "b": [0.123456] * 9 + [None]}).to_csv(input_path, index=False)
+    params = {"input_path": str(input_path), "output_path": str(tmp_path / "out.parquet"),
+              "missing_method": "drop", "fill_value": None}
+
+    # streaming runs write every chunk as a row group of one Parquet file
+    stream_pipeline(params, ["extract", "transform", "load"], chunksize=3)
+    import pyarrow.parquet as pq
+    assert pq.ParquetFile(tmp_path / "out.parquet").num_row_groups == 4
+    assert pd.read_parquet(tmp_path / "out.parquet")["a"].tolist() == list(range(9))
+
+    # a failed write leaves the old output in place and no temporary file
+    output = tmp_path / "out.csv"
+    output.write_text("old\n")
+    with pytest.raises(RuntimeError):
+        with ChunkWriter(output) as writer:
+            writer.write(pd.DataFrame({"a": [1]}))
+            raise RuntimeError("crash")
+    assert output.read_text() == "old\n" and sorted(os.listdir(tmp_path)) == [
+        "input.csv", "out.csv", "out.parquet"]
+
+    df = pd.DataFrame({"a": [1, 2, 3], "b": [0.123456, 2.5, None]})
+    save_data(df, output, compression="gzip", float_precision=2, chunk_rows=2)
+    import gzip
+    assert gzip.open(output).read().decode() == "a,b\n1,0.12\n2,2.5\n3,\n"
+    save_data(df.iloc[:1], output, append=True, compression="gzip")
+    assert pd.read_csv(output, compression="gzip")["a"].tolist() == [1, 2, 3, 1]
+
+    save_data(df, output, csv_engine="pyarrow")
+    assert output.read_text().splitlines()[:2] == ['"a","b"', "1,0.123456"]
+    with pytest.raises(ValueError):
+        save_data(df, output, compression="zip")
+
+
+def test_target_encoding_smoothing_out_of_fold_and_reuse(tmp_path):
+    from my_pipeline.encode import encode_target, row_folds
+
+    rng = np.random.default_rng(4)
+    df = pd.DataFrame({
+        "city": rng.choice(["x", "y", "z"], size=400),
+        "kind": pd.Series(rng.choice(["p", "q"], size=400)).astype("category"),
+        "price": rng.normal(100, 10, size=400),
+    })
+    df.loc[::9, "city"] = None
+    df.loc[::13, "price"] = np.nan
+
+    # plain means match a groupby; missing categories stay NaN
+    plain = encode_target(df, "price")
+    means = df.groupby("city")["price"].mean()
+    assert np.allclose(plain["city"].dropna(), df["city"].dropna().map(means))
+    assert plain["city"].isna().sum() == df["city"].isna().sum()
+
+    # smoothed out-of-fold values: statistics of the other folds only
+    fold = row_folds(len(df), 5)
+    encoded = encode_target(df, "price", smoothing=10, folds=5)
+    for i in (0, 1, 2, 50):
+        other = df[fold != fold[i]]
+        prior = other["price"].mean()
+        if pd.isna(df.loc[i, "city"]):
+            expected = prior
+        else:
+            same = other.loc[other["city"] == df.loc[i, "city"], "price"].dropna()
+            expected = (same.sum() + 10 * prior) / (len(same) + 10)
+        assert encoded.loc[i, "city"] == pytest.approx(expected)
+
+    # fitted and applied in two passes, the encoding is the same
+    params = {"encode_method": "target", "target_column": "price",
+              "encode_smoothing": 10.0, "encode_folds": 5}
+    state = fit_pipeline(lambda: iter([df]), ["encode"], params)
+    applied = apply_step("encode", df, params, state)
+    assert np.allclose(applied[["city", "kind"]], encoded[["city", "kind"]])
+
+    # the artifact keeps the smoothed means; unseen categories get the prior
+    save_artifact(state, ["encode"], params, tmp_path / "a.json")
+    stored = load_artifact(tmp_path / "a.json")["state"]
+    assert "fold_stats" not in stored["encode"]
+    new = apply_step("encode", pd.DataFrame({"city": ["x", "w"], "kind": ["p", "p"],
+                                             "price": [1.0, 2.0]}), params, stored)
+    assert new.loc[0, "city"] == pytest.approx(state["encode"]["mappings"]["city"]["x"])
+    assert new.loc[1, "city"] == pytest.approx(df["price"].mean())
+
+
+def test_sample_reads_random_rows_and_estimates_the_run(tmp_path, monkeypatch):
+    from my_pipeline import sample as sampling
+
+    rng = np.random.default_rng(5)
+    df = pd.DataFrame({
+        "id": np.arange(20_000),
+        "price": rng.normal(100, 20, size=20_000).round(2),
+        "city": rng.choice(["x", "y", "z"], size=20_000),
+    })
+    path = tmp_path / "big.csv"
+    df.to_csv(path, index=False)
+    # a small probe, so this file is sampled by seeking rather than read whole
+    monkeypatch.setattr(sampling, "PROBE_BYTES", 4096)
+
+    assert sampling.parse_sample("1%") == 0.01 and sampling.parse_sample("500") == 500
+    with pytest.raises(ValueError):
+        sampling.parse_sample("1.5")
+
+    sample = sampling.InputSample(300, seed=3)
+    rows = sample.read(path, columns=["id", "price"])
+    assert len(rows) == sample.rows == 300
+    assert rows["id"].is_unique and rows["id"].is_monotonic_increasing
+    pd.testing.assert_frame_equal(rows, df.loc[rows["id"], ["id", "price"]].reset_index(drop=True))
+    assert abs(sample.rows_total - len(df)) < 0.05 * len(df) and sample.read_s > 0
+
+    # fixed costs are not scaled up with the rows
+    assert sampling.scaled_time((100, 1.1), (200, 1.2), 10_000) == pytest.approx(11.0)
+    # one slow repeat moves the range, not the median
+    record = lambda step, wall_s: {"step": step, "wall_s": wall_s, "rows_out": 100,
+                                   "bytes_out": sampling.MB}
+    small = (100, [[record("read", 0.01), record("step", 0.1)]] * 3)
+    large = (1000, [[record("read", 0.02), record("step", wall_s)] for wall_s in (1.0, 1.0, 1.9)])
+    estimate = sampling.estimate_run(small, large, 100_000, 5.0, "read")
+    assert [step["wall_s"] for step in estimate["steps"]] == pytest.approx([5.0, 100.0])
+    assert estimate["wall_s"] == pytest.approx(105.0)
+    assert estimate["wall_range"] == pytest.approx((105.0, 205.0))
+    assert estimate["frame_mb"] == pytest.approx(100.0)
+
+    output = tmp_path / "out.csv"
+    result = CliRunner().invoke(cli, ["run", str(path), str(output), "--steps", "extract",
+                                      "--steps", "normalize", "--steps", "load",
+                                      "--sample", "0.05", "--no-cache"])
+    assert result.exit_code == 0, result.output
+    assert "Full run" in result.output and "Normalize data" in result.output
+    assert not output.exists()